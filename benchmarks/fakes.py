@@ -0,0 +1,395 @@
+"""
+Offline stand-ins for OpenAI and Tavily used by the benchmark suite.
+
+`ScriptedChatModel` walks the real ReAct graph through the same tool sequence a
+production run takes (database lookup, web search, extract, per-supplier
+validation, finalize), with configurable latency. `FakeTavilySearch` and
+`FakeTavilyExtract` return payloads shaped like Tavily's, sized to match what
+the agent normally pulls in.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import time
+from typing import Any, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pymongo import ReplaceOne, UpdateOne
+
+CITIES = [
+    "Shenzhen, China", "Ho Chi Minh City, Vietnam", "Gujarat, India", "Monterrey, Mexico",
+    "Istanbul, Turkey", "Stuttgart, Germany", "Toronto, Canada", "Penang, Malaysia",
+]
+SPECIALTIES = [
+    "Microcontrollers", "Sensors", "PCB Assembly", "Organic Cotton", "Injection Molding",
+    "Corrugated Packaging", "CNC Machining", "Lithium Batteries", "Denim", "Silicone Molding",
+]
+CERTIFICATIONS = ["ISO 9001", "ISO 14001", "RoHS", "CE", "UL", "GOTS", "FDA", "IATF 16949"]
+
+
+def _rng(*parts: Any) -> random.Random:
+    # Deterministic per query so repeated runs are comparable
+    seed = hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def fake_supplier(query: str, index: int) -> dict:
+    rng = _rng(query, index)
+    name = f"{rng.choice(['Apex', 'Summit', 'Harbor', 'Nova', 'Vertex', 'Lotus'])} {rng.choice(SPECIALTIES).split()[0]} {index}"
+    domain = name.lower().replace(" ", "") + ".example.com"
+    low = rng.randint(1, 40)
+    weeks = rng.randint(1, 6)
+    return {
+        "company_name": f"{name} Co., Ltd.",
+        "location": rng.choice(CITIES),
+        "rating": round(rng.uniform(3.5, 5.0), 1),
+        "price_range": f"${low}-{low + rng.randint(2, 30)} USD",
+        "lead_time": f"{weeks}-{weeks + 2} weeks",
+        "moq": f"{rng.choice([100, 250, 500, 1000, 5000])} units",
+        "certifications": rng.sample(CERTIFICATIONS, 2),
+        "specialties": rng.sample(SPECIALTIES, 2),
+        "response_time": f"{rng.randint(2, 12)}-{rng.randint(13, 24)} hours",
+        "stock": f"{rng.randint(100, 50000)} units available",
+        "time_zone": "GMT+8 (China Standard Time)",
+        "contact": {
+            "website": f"https://www.{domain}",
+            "phone": f"+86 755 {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+            "email": f"sales@{domain}",
+        },
+    }
+
+
+def _filler(rng: random.Random, chars: int) -> str:
+    words = ["factory", "quality", "export", "production", "capacity", "global", "customers",
+             "engineering", "certified", "delivery", "solutions", "materials", "process"]
+    text, size = [], 0
+    while size < chars:
+        sentence = " ".join(rng.choice(words) for _ in range(12)).capitalize() + "."
+        text.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(text)
+
+
+def _tool_content(message: ToolMessage) -> Any:
+    try:
+        return json.loads(message.content)
+    except (TypeError, ValueError):
+        return message.content
+
+
+def _approx_tokens(messages: list[BaseMessage]) -> int:
+    return sum(len(str(message.content)) for message in messages) // 4
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Fake chat model that emits the production tool-call sequence.
+
+    Each step is chosen from how many AI turns the conversation already has,
+    so the same instance can serve any number of concurrent runs.
+    """
+
+    model_name: str = "scripted-fake"
+    latency: float = 0.5
+    suppliers_per_run: int = 5
+    extract_urls: int = 5
+    # Above 1, the search step is a single web_search_many call with this many query variants
+    search_queries: int = 1
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools: list, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> RunnableLambda:
+        def respond(messages: Any) -> Any:
+            return schema(suppliers=self._final_suppliers(self._as_messages(messages)))
+
+        async def arespond(messages: Any) -> Any:
+            await asyncio.sleep(self.latency)
+            return respond(messages)
+
+        return RunnableLambda(respond, afunc=arespond)
+
+    @staticmethod
+    def _as_messages(value: Any) -> list[BaseMessage]:
+        if isinstance(value, dict):
+            return list(value.get("messages", []))
+        if hasattr(value, "to_messages"):
+            return value.to_messages()
+        return list(value)
+
+    @staticmethod
+    def _query(messages: list[BaseMessage]) -> str:
+        for message in messages:
+            if message.type == "human":
+                return str(message.content)
+        return "suppliers"
+
+    @staticmethod
+    def _final_suppliers(messages: list[BaseMessage]) -> list[dict]:
+        for message in reversed(messages):
+            for call in getattr(message, "tool_calls", None) or []:
+                if call["name"] == "finalize_supplier_search":
+                    return call["args"]["suppliers"]
+        return []
+
+    def _last_tool_result(self, messages: list[BaseMessage], name: str) -> Any:
+        for message in reversed(messages):
+            if isinstance(message, ToolMessage) and message.name == name:
+                return _tool_content(message)
+        return {}
+
+    def _next_message(self, messages: list[BaseMessage]) -> AIMessage:
+        query = self._query(messages)
+        step = sum(1 for message in messages if message.type == "ai")
+        suppliers = [fake_supplier(query, index) for index in range(self.suppliers_per_run)]
+
+        if step == 0:
+            calls = [("query_mongodb", {"query": " ".join(query.split()[:4]), "limit": 10})]
+        elif step == 1 and self.search_queries > 1:
+            variants = ["manufacturers", "suppliers", "factory", "wholesale", "exporters", "OEM"]
+            queries = [f"{query[:80]} {variant}" for variant in variants[: self.search_queries]]
+            calls = [("web_search_many", {"queries": queries})]
+        elif step == 1:
+            calls = [("web_search", {"query": f"{query[:80]} manufacturers"})]
+        elif step == 2:
+            search_tool = "web_search_many" if self.search_queries > 1 else "web_search"
+            results = self._last_tool_result(messages, search_tool)
+            hits = results.get("results") or [] if isinstance(results, dict) else []
+            urls = [item["url"] for item in hits][: self.extract_urls]
+            calls = [("web_extract", {"urls": urls})] if urls else []
+        elif step == 3:
+            calls = [("validate_suppliers_batch", {"suppliers": suppliers})]
+        elif step == 4:
+            calls = [("finalize_supplier_search", {"suppliers": suppliers})]
+        else:
+            calls = []
+
+        if not calls:
+            return AIMessage(content=f"Found {len(suppliers)} suppliers matching the requirements.")
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {"name": name, "args": args, "id": f"call_{step}_{index}", "type": "tool_call"}
+                for index, (name, args) in enumerate(calls)
+            ],
+        )
+
+    def _result(self, messages: list[BaseMessage]) -> ChatResult:
+        message = self._next_message(messages)
+        prompt_tokens = _approx_tokens(messages)
+        completion_tokens = len(json.dumps([call["args"] for call in message.tool_calls])) // 4 + 10
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+
+class FakeTavilySearch:
+    """
+    Stand-in for TavilySearch: `results` hits of `content_chars` each after `latency` seconds.
+    """
+
+    def __init__(self, latency: float = 0.8, results: int = 8, content_chars: int = 800):
+        self.latency = latency
+        self.results = results
+        self.content_chars = content_chars
+
+    def _response(self, payload: dict) -> dict:
+        query = payload["query"]
+        rng = _rng("search", query)
+        return {
+            "query": query,
+            "answer": None,
+            "images": [],
+            "results": [
+                {
+                    "title": f"{fake_supplier(query, index)['company_name']} - Manufacturer",
+                    "url": fake_supplier(query, index)["contact"]["website"] + f"/about-{index}",
+                    "content": _filler(rng, self.content_chars),
+                    "score": round(1 - index / (self.results + 1), 3),
+                    "raw_content": None,
+                }
+                for index in range(self.results)
+            ],
+            "response_time": self.latency,
+        }
+
+    def invoke(self, payload: dict) -> dict:
+        time.sleep(self.latency)
+        return self._response(payload)
+
+    async def ainvoke(self, payload: dict) -> dict:
+        await asyncio.sleep(self.latency)
+        return self._response(payload)
+
+
+class FakeTavilyExtract:
+    """
+    Stand-in for TavilyExtract: one page of `page_chars` per URL, `latency` seconds per call.
+    """
+
+    def __init__(self, latency: float = 1.5, page_chars: int = 20000):
+        self.latency = latency
+        self.page_chars = page_chars
+
+    def _response(self, payload: dict) -> dict:
+        results = []
+        for url in payload["urls"]:
+            rng = _rng("extract", url)
+            facts = (
+                f"\n\nPricing: ${rng.randint(1, 40)}-{rng.randint(41, 90)} USD per unit, FOB.\n\n"
+                f"MOQ: {rng.choice([100, 500, 1000])} pcs. Lead time {rng.randint(2, 6)} weeks.\n\n"
+                f"Certified ISO 9001. Contact: sales@{url.split('/')[2]}\n\n"
+            )
+            body = _filler(rng, self.page_chars)
+            middle = len(body) // 2
+            results.append({"url": url, "raw_content": body[:middle] + facts + body[middle:], "images": []})
+        return {"results": results, "failed_results": [], "response_time": self.latency}
+
+    def invoke(self, payload: dict) -> dict:
+        time.sleep(self.latency)
+        return self._response(payload)
+
+    async def ainvoke(self, payload: dict) -> dict:
+        await asyncio.sleep(self.latency)
+        return self._response(payload)
+
+
+class _BulkWriteResult:
+    def __init__(self):
+        self.matched_count = 0
+        self.modified_count = 0
+        self.upserted_count = 0
+
+
+class _Collection:
+    """
+    mongomock collection whose bulk_write applies UpdateOne/ReplaceOne one at a time;
+    mongomock's own bulk_write lags behind pymongo's operation signatures.
+    """
+
+    def __init__(self, collection: Any):
+        self._collection = collection
+
+    def bulk_write(self, operations: list, ordered: bool = True, **kwargs: Any) -> _BulkWriteResult:
+        summary = _BulkWriteResult()
+        for operation in operations:
+            if isinstance(operation, ReplaceOne):
+                result = self._collection.replace_one(operation._filter, operation._doc, upsert=operation._upsert)
+            elif isinstance(operation, UpdateOne):
+                result = self._collection.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+            else:
+                raise TypeError(f"Unsupported bulk operation: {type(operation).__name__}")
+            summary.matched_count += result.matched_count
+            summary.modified_count += result.modified_count
+            summary.upserted_count += int(result.upserted_id is not None)
+        return summary
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._collection, name)
+
+
+class _Database:
+    def __init__(self, database: Any):
+        self._database = database
+
+    def __getitem__(self, name: str) -> _Collection:
+        return _Collection(self._database[name])
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._database, name)
+
+
+class _Client:
+    def __init__(self, client: Any):
+        self._client = client
+
+    def __getitem__(self, name: str) -> _Database:
+        return _Database(self._client[name])
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+class _AsyncCursor:
+    def __init__(self, cursor: Any):
+        self._cursor = cursor
+        self._iterator = None
+
+    def sort(self, *args: Any, **kwargs: Any) -> "_AsyncCursor":
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, count: int) -> "_AsyncCursor":
+        self._cursor = self._cursor.skip(count)
+        return self
+
+    def limit(self, count: int) -> "_AsyncCursor":
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> list:
+        docs = list(self._cursor)
+        return docs[:length] if length else docs
+
+    def __aiter__(self) -> "_AsyncCursor":
+        self._iterator = iter(self._cursor)
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _AsyncWrapper:
+    """
+    Exposes a mongomock object with motor's awaitable method signatures.
+    """
+
+    def __init__(self, target: Any):
+        self._target = target
+
+    def __getitem__(self, name: str) -> "_AsyncWrapper":
+        return _AsyncWrapper(self._target[name])
+
+    def find(self, *args: Any, **kwargs: Any) -> _AsyncCursor:
+        return _AsyncCursor(self._target.find(*args, **kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return attribute(*args, **kwargs)
+
+        return call
+
+
+def mongomock_clients() -> tuple[Any, Any]:
+    """
+    A mongomock client and a motor-style async view of the same in-memory data.
+    """
+    import mongomock
+
+    client = _Client(mongomock.MongoClient())
+    return client, _AsyncWrapper(client)
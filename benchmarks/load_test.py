@@ -0,0 +1,289 @@
+"""
+Offline load test for the recommendations API.
+
+Drives POST /api/v1/supply-chain/recommendations through the real FastAPI app
+and compiled ReAct graph, with OpenAI, Tavily and MongoDB replaced by the
+stand-ins in `benchmarks.fakes` (or a real local MongoDB via --mongo-uri).
+
+    python -m benchmarks.load_test --requests 200 --concurrency 20
+    python -m benchmarks.load_test --save-baseline default
+    python -m benchmarks.load_test --compare benchmarks/baselines/default.json
+
+Reports p50/p95/p99 latency, requests per second, peak RSS and event-loop lag.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+ENDPOINT = "/api/v1/supply-chain/recommendations"
+
+QUERY_TEMPLATES = [
+    "ISO 9001 certified microcontroller suppliers in Shenzhen with MOQ under 1000 units",
+    "Organic cotton fabric manufacturers in India, GOTS certified, lead time under 4 weeks",
+    "Corrugated packaging suppliers in Canada for e-commerce boxes",
+    "CNC machining shops in Germany for aluminium prototypes",
+    "Lithium battery pack manufacturers with UL and CE certification",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="total requests to send")
+    parser.add_argument("--concurrency", type=int, default=10, help="requests in flight at once")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.8, help="seconds per fake Tavily search")
+    parser.add_argument("--extract-latency", type=float, default=1.5, help="seconds per fake Tavily extract call")
+    parser.add_argument("--search-results", type=int, default=8, help="results per fake search")
+    parser.add_argument("--page-chars", type=int, default=20000, help="characters per extracted page")
+    parser.add_argument("--suppliers", type=int, default=5, help="suppliers the fake agent returns")
+    parser.add_argument("--seed-suppliers", type=int, default=200, help="suppliers preloaded into MongoDB")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0, help="fraction of requests repeating an earlier query (result cache hits)")
+    parser.add_argument("--search-queries", type=int, default=1, help="query variants per search step; above 1 the fake agent uses web_search_many")
+    parser.add_argument("--fast-path", action="store_true", help="allow the database-only fast path to skip the agent")
+    parser.add_argument("--sync-agent", action="store_true", help="run with AGENT_ASYNC_MODE=false")
+    parser.add_argument("--log-level", help="LOG_LEVEL for the app (default: the environment's, else INFO)")
+    parser.add_argument("--mongo-uri", help="use a real MongoDB instead of mongomock")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--save-baseline", metavar="NAME", help=f"save results as {BASELINE_DIR}/NAME.json")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression for --compare")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    # Must run before anything under src is imported: config is read at import time
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+    os.environ["AGENT_ASYNC_MODE"] = "false" if args.sync_agent else "true"
+    os.environ["FAST_PATH_ENABLED"] = "true" if args.fast_path else "false"
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    if args.log_level:
+        os.environ["LOG_LEVEL"] = args.log_level.upper()
+
+
+def install_fakes(args: argparse.Namespace):
+    """
+    Swap the client getters in src.utils before the modules that bind them are imported.
+    """
+    from benchmarks.fakes import (
+        ScriptedChatModel,
+        FakeTavilySearch,
+        FakeTavilyExtract,
+        fake_supplier,
+        mongomock_clients,
+    )
+    import src.utils as utils
+
+    llm = ScriptedChatModel(
+        latency=args.llm_latency, suppliers_per_run=args.suppliers, search_queries=args.search_queries
+    )
+    search = FakeTavilySearch(args.search_latency, args.search_results)
+    extract = FakeTavilyExtract(args.extract_latency, args.page_chars)
+    utils.get_llm = lambda: llm
+    utils.get_tavily_search = lambda: search
+    utils.get_tavily_extract = lambda: extract
+
+    if not args.mongo_uri:
+        client, async_client = mongomock_clients()
+        utils.get_mongo_client = lambda: client
+        utils.get_async_mongo_client = lambda: async_client
+
+    if args.seed_suppliers:
+        db, collection = utils.get_supplier_db_and_collection()
+        seeds = [fake_supplier(f"seed {index}", index) for index in range(args.seed_suppliers)]
+        collection.bulk_write(utils.build_supplier_upserts(seeds), ordered=False)
+
+
+class LoopLagMonitor:
+    """
+    Measures how late a periodic wake-up fires; a blocked event loop shows up as lag.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def build_queries(args: argparse.Namespace) -> list[str]:
+    queries = []
+    for index in range(args.requests):
+        repeat = queries and (index * args.repeat_ratio) % 1 + args.repeat_ratio >= 1
+        if repeat:
+            queries.append(queries[index % len(queries)])
+        else:
+            queries.append(f"{QUERY_TEMPLATES[index % len(QUERY_TEMPLATES)]} (run {index})")
+    return queries
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    import httpx
+    from src.main import app, lifespan
+
+    queries = build_queries(args)
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    supplier_counts: list[int] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+
+            async def send(query: str) -> None:
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post(ENDPOINT, json={"query": query})
+                        latencies.append(time.perf_counter() - started)
+                        if response.status_code != 200:
+                            errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                        else:
+                            supplier_counts.append(len(response.json().get("suppliers", [])))
+                    except Exception as e:
+                        errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+            monitor = LoopLagMonitor()
+            monitor.start()
+            wall_started = time.perf_counter()
+            await asyncio.gather(*(send(query) for query in queries))
+            wall_seconds = time.perf_counter() - wall_started
+            await monitor.stop()
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "save_baseline", "compare", "tolerance")
+        },
+        "results": {
+            "requests": len(queries),
+            "completed": len(latencies),
+            "errors": errors,
+            "empty_responses": sum(1 for count in supplier_counts if count == 0),
+            "wall_seconds": round(wall_seconds, 3),
+            "requests_per_second": round(len(latencies) / wall_seconds, 3) if wall_seconds else 0.0,
+            "latency_seconds": {
+                "mean": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+                "p50": round(percentile(latencies, 50), 4),
+                "p95": round(percentile(latencies, 95), 4),
+                "p99": round(percentile(latencies, 99), 4),
+                "max": round(max(latencies, default=0.0), 4),
+            },
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "loop_lag_ms": {
+                "p99": round(percentile(monitor.samples, 99) * 1000, 2),
+                "max": round(max(monitor.samples, default=0.0) * 1000, 2),
+            },
+        },
+    }
+
+
+# Metric path -> True when larger is better
+COMPARED_METRICS = {
+    ("latency_seconds", "p50"): False,
+    ("latency_seconds", "p95"): False,
+    ("latency_seconds", "p99"): False,
+    ("requests_per_second",): True,
+    ("peak_rss_mb",): False,
+    ("loop_lag_ms", "p99"): False,
+}
+
+
+def _lookup(results: dict, path: tuple) -> float:
+    for key in path:
+        results = results[key]
+    return results
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Print metric deltas against a baseline; returns False on any regression beyond tolerance.
+    """
+    ok = True
+    print(f"\nComparison with baseline from {baseline.get('timestamp', '?')} (tolerance {tolerance:.0%}):")
+    for path, higher_is_better in COMPARED_METRICS.items():
+        before = _lookup(baseline["results"], path)
+        after = _lookup(current["results"], path)
+        change = (after - before) / before if before else 0.0
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        ok = ok and not regressed
+        marker = "REGRESSION" if regressed else "ok"
+        print(f"  {'.'.join(path):24} {before:>10} -> {after:>10} ({change:+.1%}) {marker}")
+    return ok
+
+
+def print_report(report: dict) -> None:
+    results = report["results"]
+    latency = results["latency_seconds"]
+    print(f"\nRequests:      {results['completed']}/{results['requests']} completed, errors: {results['errors'] or 'none'}")
+    print(f"Throughput:    {results['requests_per_second']} req/s over {results['wall_seconds']}s")
+    print(f"Latency (s):   p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"Peak RSS:      {results['peak_rss_mb']} MB")
+    print(f"Loop lag (ms): p99 {results['loop_lag_ms']['p99']}  max {results['loop_lag_ms']['max']}")
+
+
+def main() -> int:
+    args = parse_args()
+    configure_environment(args)
+    install_fakes(args)
+
+    report = asyncio.run(run_load(args))
+    print_report(report)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        path.write_text(json.dumps(report, indent=2))
+        print(f"\nBaseline saved to {path}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if not compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
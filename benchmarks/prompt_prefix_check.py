@@ -0,0 +1,123 @@
+"""
+Offline check that agent prompts share a cacheable prefix.
+
+OpenAI caches prompt prefixes of 1024 tokens or more. A request can only reuse
+the cache if its tool definitions and system prompt start with exactly the same
+bytes as earlier requests. This script renders the agent prompt for a set of
+different requests (fresh, follow-up, compacted history, long query) and checks
+that:
+
+- the byte-identical prefix they share covers all of the static instructions;
+- that prefix is at least --min-prefix-tokens long.
+
+    python -m benchmarks.prompt_prefix_check
+    python -m benchmarks.prompt_prefix_check --min-prefix-tokens 1024
+
+Exits with status 1 when a check fails. No network access is needed.
+tests/test_prompt_prefix.py runs the same checks under pytest.
+"""
+import argparse
+import json
+import os
+import sys
+
+REQUESTS = [
+    {"query": "ISO 9001 certified microcontroller suppliers in Shenzhen", "chat_history": None},
+    {"query": "Organic cotton fabric manufacturers in India, GOTS certified", "chat_history": []},
+    {
+        "query": "Which of those can ship within 3 weeks?",
+        "chat_history": [
+            {"role": "user", "content": "Find corrugated packaging suppliers in Canada"},
+            {"role": "assistant", "content": "Here are 5 suppliers based in Ontario and Quebec..."},
+        ],
+    },
+    {
+        "query": "Any cheaper options?",
+        "chat_history": [
+            {"role": "summary", "content": "- Sourcing CNC aluminium prototypes in Germany\n- Budget $40/unit"},
+            {"role": "user", "content": "Drop the supplier in Munich"},
+        ],
+    },
+    {"query": "Lithium battery pack manufacturers with UL and CE certification " * 20, "chat_history": None},
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-prefix-tokens", type=int, default=1024, help="smallest prefix the provider caches")
+    return parser.parse_args()
+
+
+def common_prefix_length(values: list[bytes]) -> int:
+    shortest = min(values, key=len)
+    for index, byte in enumerate(shortest):
+        if any(value[index] != byte for value in values):
+            return index
+    return len(shortest)
+
+
+def render_request(tools: list[dict], state: dict) -> bytes:
+    """
+    A request as the provider reads it: tool definitions, then the prompt messages in order.
+    """
+    from langchain_core.messages import HumanMessage
+    from src.prompts import build_supply_chain_agent_messages
+
+    messages = build_supply_chain_agent_messages(
+        {**state, "messages": [HumanMessage(content=state["query"])]}
+    )
+    rendered = json.dumps(tools, sort_keys=True)
+    for message in messages:
+        rendered += f"\n<{message.type}>\n{message.content}"
+    return rendered.encode()
+
+
+def measure_prefix() -> dict:
+    """
+    Render REQUESTS and measure the prefix they share against the static instructions.
+    """
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+    from src.agents import AGENT_TOOLS
+    from src.distill import count_tokens
+    from src.prompts import SUPPLY_CHAIN_AGENT_INSTRUCTIONS
+
+    tools = [convert_to_openai_tool(tool) for tool in AGENT_TOOLS]
+    rendered = [render_request(tools, state) for state in REQUESTS]
+    shared = common_prefix_length(rendered)
+    # Where the static instructions end in the rendered request
+    instructions = SUPPLY_CHAIN_AGENT_INSTRUCTIONS.encode()
+    static = rendered[0].index(instructions) + len(instructions)
+    return {
+        "requests": len(rendered),
+        "static_bytes": static,
+        "shared_bytes": shared,
+        "shared_tokens": count_tokens(rendered[0][:shared].decode(errors="ignore")),
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    # Config is read at import time; the checks never call the APIs
+    os.environ.setdefault("OPENAI_API_KEY", "sk-prefix-check")
+    os.environ.setdefault("TAVILY_API_KEY", "tvly-prefix-check")
+    measured = measure_prefix()
+    static, shared, shared_tokens = measured["static_bytes"], measured["shared_bytes"], measured["shared_tokens"]
+
+    print(f"Requests rendered:      {measured['requests']}")
+    print(f"Static prefix:          {static} bytes")
+    print(f"Byte-identical prefix:  {shared} bytes (~{shared_tokens} tokens)")
+
+    failures = []
+    if shared < static:
+        failures.append(f"requests diverge at byte {shared}, inside the static instructions (ends at {static})")
+    if shared_tokens < args.min_prefix_tokens:
+        failures.append(f"shared prefix is ~{shared_tokens} tokens, below the {args.min_prefix_tokens} cache minimum")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK: every request starts with the full static prefix")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
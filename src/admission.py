@@ -0,0 +1,174 @@
+"""
+Admission control for agent runs.
+
+At most ADMISSION_MAX_CONCURRENT_RUNS agents run at once. Further runs wait
+in a bounded FIFO queue. When the queue is full, callers are turned away
+immediately with 429. If a slot does not free up within
+ADMISSION_QUEUE_TIMEOUT, they get 503. Both carry a Retry-After estimated
+from recent run durations. Admitted runs therefore keep predictable latency
+under overload instead of all slowing down together.
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator
+from .telemetry import ADMISSION_WAIT_SECONDS, ADMISSION_REJECTED, register_collector
+from .utils import get_logger
+from .config import (
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_CONCURRENT_RUNS,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_RETRY_AFTER_MAX,
+)
+
+logger = get_logger()
+
+
+class AdmissionRejected(Exception):
+    """
+    No agent slot is available; `status_code` is 429 (queue full) or 503 (wait timed out).
+    """
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency cap plus bounded wait queue for agent runs.
+
+    Background work (job workers, batch items) passes `wait=True`: it queues
+    without a bound or timeout and is never rejected, but still takes a slot,
+    so it cannot push interactive requests past the cap.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT_RUNS,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.background_waiting = 0
+        self.stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+        # Smoothed agent run time, for Retry-After estimates
+        self._average_run_seconds = 60.0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    @property
+    def saturated(self) -> bool:
+        return self._semaphore.locked() or self.waiting + self.background_waiting > 0
+
+    def retry_after(self) -> int:
+        # Time for the runs ahead of a new request to drain through the available slots
+        ahead = self.in_flight + self.waiting + self.background_waiting
+        estimate = self._average_run_seconds * ahead / max(self.max_concurrent, 1)
+        return max(1, min(ADMISSION_RETRY_AFTER_MAX, math.ceil(estimate)))
+
+    def _reject(self, status_code: int, reason: str, stat: str) -> AdmissionRejected:
+        self.stats[stat] += 1
+        ADMISSION_REJECTED.inc(reason=stat.removeprefix("rejected_"))
+        logger.warning(
+            f"Admission rejected ({reason}): {self.in_flight} running, {self.waiting} waiting"
+        )
+        return AdmissionRejected(status_code, reason, self.retry_after())
+
+    def check_capacity(self) -> None:
+        """
+        Raise right away if a new interactive run would be rejected for a full queue.
+        """
+        if self.saturated and self.waiting >= self.max_queue:
+            raise self._reject(429, "Too many queued agent runs", "rejected_queue_full")
+
+    async def acquire(self, wait: bool = False) -> None:
+        started = time.monotonic()
+        if not self.saturated:
+            await self._semaphore.acquire()
+        elif wait:
+            self.stats["queued"] += 1
+            self.background_waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.background_waiting -= 1
+        else:
+            self.check_capacity()
+            self.stats["queued"] += 1
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started, outcome="timeout")
+                raise self._reject(
+                    503, f"No agent slot within {self.queue_timeout:g}s", "rejected_timeout"
+                ) from None
+            finally:
+                self.waiting -= 1
+        self.in_flight += 1
+        self.stats["admitted"] += 1
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started, outcome="admitted")
+
+    def release(self, run_seconds: float) -> None:
+        self.in_flight -= 1
+        self._average_run_seconds = 0.8 * self._average_run_seconds + 0.2 * run_seconds
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self, wait: bool = False) -> AsyncIterator[None]:
+        """
+        Hold an agent slot for the enclosed block; raises AdmissionRejected when none is available.
+        """
+        if not ADMISSION_ENABLED:
+            yield
+            return
+        await self.acquire(wait=wait)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "background_waiting": self.background_waiting,
+            "average_run_seconds": round(self._average_run_seconds, 2),
+            **self.stats,
+        }
+
+
+@lru_cache
+def get_admission_controller() -> AdmissionController:
+    return AdmissionController()
+
+
+def _admission_metric_samples() -> list[tuple]:
+    snapshot = get_admission_controller().snapshot()
+    return [
+        ("supply_chain_admission_in_flight", "gauge", "Agent runs currently holding a slot.", {}, snapshot["in_flight"]),
+        (
+            "supply_chain_admission_queue_depth",
+            "gauge",
+            "Agent runs waiting for a slot.",
+            {},
+            snapshot["waiting"] + snapshot["background_waiting"],
+        ),
+    ]
+
+
+register_collector(_admission_metric_samples)
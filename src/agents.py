@@ -1,41 +1,55 @@
+from functools import lru_cache
+from langchain_core.runnables import Runnable
 from langgraph.prebuilt import create_react_agent
 from .utils import get_logger, get_llm
-from .models import SupplierExplorationAgentResponse
+from .logs import debug_enabled
+from .models import SupplierExplorationAgentResponse, SupplyChainGraphState
 from langgraph.graph.state import CompiledStateGraph
-from .config import AGENT_MAX_SUPPLIERS
+from .config import AGENT_MAX_SUPPLIERS, AGENT_RECURSION_LIMIT
 from .tools import (
     web_extract,
     web_search,
+    web_search_many,
     query_mongodb,
     finalize_supplier_search,
     validate_supplier_data,
+    validate_suppliers_batch,
 )
-from .prompts import get_supply_chain_agent_prompt
+from .prompts import build_supply_chain_agent_messages
 
 logger = get_logger()
 
+# Fixed order: tool definitions are sent ahead of the prompt, so they are part of the cached prefix
+AGENT_TOOLS = [
+    web_extract,
+    web_search,
+    web_search_many,
+    query_mongodb,
+    finalize_supplier_search,
+    validate_supplier_data,
+    validate_suppliers_batch,
+]
+
 
-def supply_chain_agent(chat_history=None) -> CompiledStateGraph:
+def supply_chain_agent() -> CompiledStateGraph:
     f"""
     Comprehensive supply chain agent that handles requirement analysis and supplier exploration.
     Designed to find EXACTLY {AGENT_MAX_SUPPLIERS} high-quality suppliers through thorough research.
+
+    The graph holds no per-request data: chat history is read from graph state by the
+    prompt callable, so one compiled graph can serve concurrent requests.
     """
     logger.info("Creating supply chain agent")
     logger.debug(
-        "Initializing tools: web_extract, web_search, query_mongodb, finalize_supplier_search, validate_supplier_data"
+        "Initializing tools: web_extract, web_search, web_search_many, query_mongodb, finalize_supplier_search, validate_supplier_data, validate_suppliers_batch"
     )
 
-    tools = [
-        web_extract,
-        web_search,
-        query_mongodb,
-        finalize_supplier_search,
-        validate_supplier_data,
-    ]
+    tools = AGENT_TOOLS
 
     logger.info(f"Loaded {len(tools)} tools for supply chain agent")
-    for tool in tools:
-        logger.debug(f"  - Tool: {tool.name} - {tool.description}")
+    if debug_enabled():
+        for tool in tools:
+            logger.debug(f"  - Tool: {tool.name} - {tool.description}")
 
     try:
         logger.info("Initializing LLM model...")
@@ -47,7 +61,8 @@ def supply_chain_agent(chat_history=None) -> CompiledStateGraph:
         agent = create_react_agent(
             model=model,
             tools=tools,
-            prompt=get_supply_chain_agent_prompt(chat_history),
+            prompt=build_supply_chain_agent_messages,
+            state_schema=SupplyChainGraphState,
             response_format=SupplierExplorationAgentResponse,
         )
         logger.info("Successfully created supply chain agent with ReAct framework")
@@ -59,3 +74,13 @@ def supply_chain_agent(chat_history=None) -> CompiledStateGraph:
         logger.error(f"Failed to create supply chain agent: {str(e)}", exc_info=True)
         logger.error(f"Error details: {type(e).__name__}")
         raise
+
+
+@lru_cache
+def get_supply_chain_agent() -> Runnable:
+    """
+    Process-wide supply chain agent, compiled once and configured with the recursion limit.
+    """
+    agent = supply_chain_agent()
+    logger.info(f"Agent configured with recursion limit: {AGENT_RECURSION_LIMIT}")
+    return agent.with_config(recursion_limit=AGENT_RECURSION_LIMIT)
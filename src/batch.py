@@ -0,0 +1,116 @@
+"""
+Batch recommendations: many queries in one request, sharing their tool calls.
+
+Items run concurrently up to a limit inside one `batch_scope`, so Tavily and
+MongoDB lookups repeated across items are made once. Each item's result is
+streamed as a server-sent event as soon as it finishes, in completion order.
+"""
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable
+from .models import AgentConfig, BatchRecommendationRequest, SupplierExplorationAgentResponse
+from .cache import batch_scope
+from .streaming import format_sse
+from .logs import current_request_id, new_log_context, bind_log_context
+from .telemetry import track_request
+from .utils import get_logger
+from .config import BATCH_DEFAULT_CONCURRENCY, BATCH_MAX_CONCURRENCY
+
+logger = get_logger()
+
+# Answers one item; returns the response and the path that served it
+ItemRunner = Callable[[AgentConfig], Awaitable[tuple[SupplierExplorationAgentResponse, str]]]
+
+
+def batch_concurrency(batch: BatchRecommendationRequest) -> int:
+    requested = batch.concurrency or BATCH_DEFAULT_CONCURRENCY
+    return max(1, min(requested, BATCH_MAX_CONCURRENCY, len(batch.items)))
+
+
+async def _run_item(index: int, item: AgentConfig, run_item: ItemRunner, semaphore: asyncio.Semaphore) -> tuple[str, dict]:
+    # Item tasks run in a copy of the request's context: "<request id>-<index>" only applies to this item
+    bind_log_context(new_log_context(f"{current_request_id() or 'batch'}-{index}"))
+    async with semaphore:
+        with track_request("batch_item") as telemetry:
+            try:
+                response, served_by = await run_item(item)
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {str(e)}", exc_info=True)
+                telemetry.outcome = "error"
+                return "item_error", {
+                    "index": index,
+                    "query": item.query[:100],
+                    "message": str(e),
+                    "type": type(e).__name__,
+                    "usage": telemetry.summary(),
+                }
+    logger.info(f"Batch item {index} timing summary: {telemetry.summary()}")
+    return "item", {
+        "index": index,
+        "query": item.query[:100],
+        "served_by": served_by,
+        **response.model_dump(),
+        "usage": telemetry.summary(),
+    }
+
+
+def _usage_totals(usages: list[dict]) -> dict:
+    return {
+        "item_seconds": round(sum(usage["elapsed_seconds"] for usage in usages), 3),
+        "llm_calls": sum(usage["llm_calls"] for usage in usages),
+        "prompt_tokens": sum(usage["prompt_tokens"] for usage in usages),
+        "completion_tokens": sum(usage["completion_tokens"] for usage in usages),
+        "cached_prompt_tokens": sum(usage["cached_prompt_tokens"] for usage in usages),
+        # Tavily/MongoDB/result calls answered by a cache or by another item's call
+        "cache_hits": sum(usage["cache_hits"] for usage in usages),
+    }
+
+
+async def stream_batch_recommendations(batch: BatchRecommendationRequest, run_item: ItemRunner) -> AsyncIterator[str]:
+    """
+    Run every item of the batch and yield SSE frames.
+
+    Events: `started`, then `item` (or `item_error`) per item as it completes, then
+    `final` with wall time, summed per-item time, tokens and cache hits, and the calls
+    saved by the batch memo.
+    """
+    started_at = time.monotonic()
+    concurrency = batch_concurrency(batch)
+    logger.info(f"=== NEW BATCH REQUEST: {len(batch.items)} items, concurrency {concurrency} ===")
+    yield format_sse("started", {"items": len(batch.items), "concurrency": concurrency})
+
+    usages, served_by, failed = [], {}, 0
+    with batch_scope() as memo:
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = [
+            asyncio.create_task(_run_item(index, item, run_item, semaphore))
+            for index, item in enumerate(batch.items)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                event, data = await next_done
+                usages.append(data["usage"])
+                if event == "item_error":
+                    failed += 1
+                else:
+                    served_by[data["served_by"]] = served_by.get(data["served_by"], 0) + 1
+                yield format_sse(event, data)
+        finally:
+            # Client went away: stop the items that have not finished
+            for task in tasks:
+                task.cancel()
+        shared = {name: stats["calls_saved"] for name, stats in memo.snapshot().items()}
+
+    wall_seconds = round(time.monotonic() - started_at, 3)
+    logger.info(f"Batch of {len(batch.items)} items completed in {wall_seconds}s ({failed} failed)")
+    yield format_sse(
+        "final",
+        {
+            "items": len(batch.items),
+            "failed": failed,
+            "served_by": served_by,
+            "wall_seconds": wall_seconds,
+            **_usage_totals(usages),
+            "calls_saved": shared,
+        },
+    )
@@ -0,0 +1,658 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+from pymongo import ReplaceOne
+from .utils import (
+    get_logger,
+    get_supplier_db_and_collection,
+    get_async_supplier_db_and_collection,
+    canonicalize_url,
+)
+from .telemetry import timed, record_cache_hits, MONGO_SECONDS
+from .config import (
+    RESULT_CACHE_TTL_SECONDS,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_MONGO_ENABLED,
+    RESULT_CACHE_COLLECTION,
+    TAVILY_CACHE_MONGO_ENABLED,
+    TAVILY_CACHE_MAX_ENTRIES,
+    TAVILY_CACHE_COLLECTION,
+    TAVILY_SEARCH_CACHE_TTL_SECONDS,
+    TAVILY_EXTRACT_CACHE_TTL_SECONDS,
+    BATCH_MEMO_MAX_ENTRIES,
+    BATCH_MEMO_TTL_SECONDS,
+)
+
+logger = get_logger()
+
+_MISSING = object()
+
+
+def make_cache_key(*parts: Any) -> str:
+    """
+    Build a stable sha256 key from JSON-serialisable parts.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lowercase and collapse whitespace so trivially different queries share a key.
+    """
+    return " ".join(query.lower().split())
+
+
+def recommendation_cache_key(requirements) -> str:
+    """
+    Cache key for an AgentConfig: normalized query plus a hash of the chat history.
+    """
+    history_hash = make_cache_key(requirements.chat_history or [])
+    return make_cache_key("recommendations", normalize_query(requirements.query), history_hash)
+
+
+def tavily_search_cache_key(query: str) -> str:
+    return make_cache_key("tavily_search", normalize_query(query))
+
+
+def tavily_extract_cache_key(url: str) -> str:
+    return make_cache_key("tavily_extract", canonicalize_url(url))
+
+
+def is_cache_bypass(header_value: Optional[str]) -> bool:
+    if not header_value:
+        return False
+    return header_value.strip().lower() in ("1", "true", "yes", "no-cache")
+
+
+class LRUTTLCache:
+    """
+    Thread-safe in-memory LRU cache with per-entry expiry.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MongoCacheStore:
+    """
+    Persistent cache tier stored in a MongoDB collection.
+    Expired documents are removed by a TTL index on `expires_at`.
+    """
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+        self._index_ready = False
+
+    @staticmethod
+    def _live_filter(keys: list[str]) -> dict:
+        return {"_id": {"$in": keys}, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+
+    @staticmethod
+    def _document(key: str, value: Any, ttl_seconds: int) -> dict:
+        now = datetime.now(timezone.utc)
+        return {
+            "_id": key,
+            "value": value,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+        }
+
+    def _collection(self):
+        db, _ = get_supplier_db_and_collection()
+        collection = db[self.collection_name]
+        if not self._index_ready:
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._index_ready = True
+        return collection
+
+    async def _acollection(self):
+        db, _ = get_async_supplier_db_and_collection()
+        collection = db[self.collection_name]
+        if not self._index_ready:
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            self._index_ready = True
+        return collection
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        with timed("mongo.cache_get", MONGO_SECONDS, operation="cache_get"):
+            docs = list(self._collection().find(self._live_filter(keys)))
+        return {doc["_id"]: doc["value"] for doc in docs}
+
+    def set_many(self, items: dict[str, Any], ttl_seconds: int) -> None:
+        operations = [
+            ReplaceOne({"_id": key}, self._document(key, value, ttl_seconds), upsert=True)
+            for key, value in items.items()
+        ]
+        if operations:
+            with timed("mongo.cache_set", MONGO_SECONDS, operation="cache_set"):
+                self._collection().bulk_write(operations, ordered=False)
+
+    async def aget_many(self, keys: list[str]) -> dict[str, Any]:
+        collection = await self._acollection()
+        with timed("mongo.cache_get", MONGO_SECONDS, operation="cache_get"):
+            docs = await collection.find(self._live_filter(keys)).to_list(length=None)
+        return {doc["_id"]: doc["value"] for doc in docs}
+
+    async def aset_many(self, items: dict[str, Any], ttl_seconds: int) -> None:
+        operations = [
+            ReplaceOne({"_id": key}, self._document(key, value, ttl_seconds), upsert=True)
+            for key, value in items.items()
+        ]
+        if operations:
+            collection = await self._acollection()
+            with timed("mongo.cache_set", MONGO_SECONDS, operation="cache_set"):
+                await collection.bulk_write(operations, ordered=False)
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+class _Flight:
+    """
+    A computation in progress on another thread that callers can block on.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._value = None
+        self._error: Optional[BaseException] = None
+
+    def resolve(self, value: Any = None, error: Optional[BaseException] = None) -> None:
+        self._value = value
+        self._error = error
+        self._event.set()
+
+    def wait(self) -> Any:
+        self._event.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+# Stats that count a call answered without computing
+SERVED_STATS = ("hits", "store_hits", "coalesced")
+
+
+class TieredCache:
+    """
+    In-memory LRU front with an optional MongoDB tier behind it.
+
+    Concurrent callers asking for the same missing key share a single
+    computation (singleflight) instead of each running their own. Both
+    asyncio callers (`a*` methods) and threaded callers are supported.
+    `None` is never cached and is used to signal a miss.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        ttl_seconds: int,
+        store: Optional[MongoCacheStore] = None,
+    ):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUTTLCache(max_entries, ttl_seconds)
+        self.store = store
+        self.stats = {
+            "hits": 0,
+            "store_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "computed": 0,
+            "compute_seconds": 0.0,
+        }
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, stat: str, amount: float = 1) -> None:
+        with self._lock:
+            self.stats[stat] += amount
+        if stat in SERVED_STATS:
+            record_cache_hits(int(amount))
+
+    def _memory_lookup(self, keys: list[str]) -> tuple[dict[str, Any], list[str]]:
+        found, missing = {}, []
+        for key in keys:
+            value = self.memory.get(key)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        self._count("hits", len(found))
+        return found, missing
+
+    def _record_store_hits(self, found: dict[str, Any], requested: int) -> None:
+        for key, value in found.items():
+            self.memory.set(key, value)
+        self._count("store_hits", len(found))
+        self._count("misses", requested - len(found))
+
+    # --- Sync interface -------------------------------------------------
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        found, missing = self._memory_lookup(keys)
+        if missing and self.store is not None:
+            try:
+                stored = self.store.get_many(missing)
+            except Exception as e:
+                logger.warning(f"[{self.name}] cache store read failed: {str(e)}")
+                stored = {}
+            self._record_store_hits(stored, len(missing))
+            found.update(stored)
+        elif missing:
+            self._count("misses", len(missing))
+        return found
+
+    def set_many(self, items: dict[str, Any]) -> None:
+        for key, value in items.items():
+            self.memory.set(key, value)
+        if items and self.store is not None:
+            try:
+                self.store.set_many(items, self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"[{self.name}] cache store write failed: {str(e)}")
+
+    def get_or_compute_many(
+        self,
+        keys: list[str],
+        compute_many: Callable[[list[str]], dict[str, Any]],
+        should_cache: Callable[[Any], bool] = lambda value: True,
+    ) -> dict[str, Any]:
+        """
+        Resolve many keys at once for threaded callers.
+
+        Cached keys are returned directly, keys another thread is already computing
+        are waited on, and the rest are passed to a single `compute_many` call which
+        returns a value per key it could produce. Keys it could not produce map to None.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        results = self.get_many(unique_keys)
+
+        waiting: dict[str, _Flight] = {}
+        mine: list[str] = []
+        with self._lock:
+            for key in unique_keys:
+                if key in results:
+                    continue
+                flight = self._flights.get(key)
+                if flight is not None:
+                    waiting[key] = flight
+                else:
+                    self._flights[key] = _Flight()
+                    mine.append(key)
+        # Outside the lock: _count takes it and reports to the request telemetry
+        self._count("coalesced", len(waiting))
+
+        if mine:
+            flights_to_resolve = set(mine)
+            started = time.monotonic()
+            computed: Optional[dict[str, Any]] = None
+            error: Optional[BaseException] = None
+            try:
+                computed = compute_many(mine)
+                self._count("computed", len(mine))
+                self._count("compute_seconds", time.monotonic() - started)
+
+                self.set_many(
+                    {
+                        key: value
+                        for key, value in computed.items()
+                        if key in flights_to_resolve and value is not None and should_cache(value)
+                    }
+                )
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                with self._lock:
+                    flights = {key: self._flights.pop(key) for key in mine}
+                for key, flight in flights.items():
+                    if computed is not None:
+                        results[key] = computed.get(key)
+                        flight.resolve(results[key])
+                    else:
+                        flight.resolve(error=error)
+
+        for key, flight in waiting.items():
+            results[key] = flight.wait()
+        return results
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        should_cache: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        return self.get_or_compute_many(
+            [key], lambda keys: {key: compute()}, should_cache=should_cache
+        )[key]
+
+    # --- Async interface ------------------------------------------------
+
+    async def aget_many(self, keys: list[str]) -> dict[str, Any]:
+        found, missing = self._memory_lookup(keys)
+        if missing and self.store is not None:
+            try:
+                stored = await self.store.aget_many(missing)
+            except Exception as e:
+                logger.warning(f"[{self.name}] cache store read failed: {str(e)}")
+                stored = {}
+            self._record_store_hits(stored, len(missing))
+            found.update(stored)
+        elif missing:
+            self._count("misses", len(missing))
+        return found
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """
+        Look `key` up in memory, then in the store. Returns None on a miss.
+        """
+        return (await self.aget_many([key])).get(key)
+
+    async def aget_first(self, keys: list[str]) -> tuple[Optional[str], Any]:
+        """
+        The first of `keys`, in order, that has a value, with that value; (None, None) if none has.
+        Memory is checked first, then the store once for the keys ahead of any memory hit.
+        This is a probe, not a lookup that serves a request, so the hit and miss stats are left alone.
+        """
+        position, value = len(keys), _MISSING
+        for index, key in enumerate(keys):
+            value = self.memory.get(key)
+            if value is not _MISSING:
+                position = index
+                break
+        if position and self.store is not None:
+            try:
+                stored = await self.store.aget_many(keys[:position])
+            except Exception as e:
+                logger.warning(f"[{self.name}] cache store read failed: {str(e)}")
+                stored = {}
+            for key in keys[:position]:
+                if key in stored:
+                    self.memory.set(key, stored[key])
+                    return key, stored[key]
+        if value is _MISSING:
+            return None, None
+        return keys[position], value
+
+    async def aset_many(self, items: dict[str, Any]) -> None:
+        for key, value in items.items():
+            self.memory.set(key, value)
+        if items and self.store is not None:
+            try:
+                await self.store.aset_many(items, self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"[{self.name}] cache store write failed: {str(e)}")
+
+    async def aset(self, key: str, value: Any) -> None:
+        await self.aset_many({key: value})
+
+    async def aget_or_compute_many(
+        self,
+        keys: list[str],
+        compute_many: Callable[[list[str]], Awaitable[dict[str, Any]]],
+        bypass: bool = False,
+        should_cache: Callable[[Any], bool] = lambda value: True,
+    ) -> dict[str, Any]:
+        """
+        Async counterpart of get_or_compute_many.
+
+        With `bypass` cached values are ignored and refreshed, but keys that are
+        already being computed are still joined rather than fetched twice.
+        """
+        results, _ = await self._aresolve_many(keys, compute_many, bypass, should_cache)
+        return results
+
+    async def _aresolve_many(
+        self,
+        keys: list[str],
+        compute_many: Callable[[list[str]], Awaitable[dict[str, Any]]],
+        bypass: bool,
+        should_cache: Callable[[Any], bool],
+    ) -> tuple[dict[str, Any], dict[str, str]]:
+        # Values per key, and how each was resolved: "cache", "coalesced" or "computed"
+        unique_keys = list(dict.fromkeys(keys))
+        results = {} if bypass else await self.aget_many(unique_keys)
+        sources = dict.fromkeys(results, "cache")
+
+        waiting: dict[str, asyncio.Future] = {}
+        mine: list[str] = []
+        loop = asyncio.get_running_loop()
+        for key in unique_keys:
+            if key in results:
+                continue
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                waiting[key] = inflight
+                sources[key] = "coalesced"
+                self._count("coalesced")
+            else:
+                self._inflight[key] = loop.create_future()
+                sources[key] = "computed"
+                mine.append(key)
+
+        if mine:
+            # Run the computation as its own task so a caller that goes away
+            # does not cancel the work other callers are waiting on
+            task = asyncio.create_task(self._compute_many_and_store(mine, compute_many, should_cache))
+            # Nobody awaits the task once its caller is cancelled; retrieve its error so it is not logged as unhandled
+            task.add_done_callback(_retrieve_exception)
+            for key in mine:
+                waiting[key] = self._inflight[key]
+            await asyncio.shield(task)
+
+        for key, future in waiting.items():
+            results[key] = await asyncio.shield(future)
+        return results, sources
+
+    async def _compute_many_and_store(
+        self,
+        keys: list[str],
+        compute_many: Callable[[list[str]], Awaitable[dict[str, Any]]],
+        should_cache: Callable[[Any], bool],
+    ) -> None:
+        started = time.monotonic()
+        computed: Optional[dict[str, Any]] = None
+        error: Optional[BaseException] = None
+        try:
+            computed = await compute_many(keys)
+            self._count("computed", len(keys))
+            self._count("compute_seconds", time.monotonic() - started)
+
+            await self.aset_many(
+                {
+                    key: value
+                    for key, value in computed.items()
+                    if key in keys and value is not None and should_cache(value)
+                }
+            )
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # Always release the keys, even when cancelled while storing, so waiters never hang
+            for key in keys:
+                future = self._inflight.pop(key, None)
+                if future is None or future.done():
+                    continue
+                if computed is not None:
+                    future.set_result(computed.get(key))
+                elif error is None or isinstance(error, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(error)
+                    # Mark retrieved so an unobserved failure does not log a warning
+                    future.exception()
+
+    async def aget_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        bypass: bool = False,
+        should_cache: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """
+        Return the cached value for `key`, or run `compute` once for all concurrent callers.
+
+        With `bypass` the cached value is ignored and refreshed, but the call still
+        joins a computation that is already in flight.
+        """
+
+        value, _ = await self.aget_or_compute_with_source(key, compute, bypass, should_cache)
+        return value
+
+    async def aget_or_compute_with_source(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        bypass: bool = False,
+        should_cache: Callable[[Any], bool] = lambda value: True,
+    ) -> tuple[Any, str]:
+        """
+        Like aget_or_compute, but also report how the value was obtained: "cache",
+        "coalesced" (joined another caller's computation) or "computed".
+        """
+
+        async def compute_one(keys: list[str]) -> dict[str, Any]:
+            return {key: await compute()}
+
+        results, sources = await self._aresolve_many([key], compute_one, bypass, should_cache)
+        return results[key], sources[key]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        served = sum(stats[stat] for stat in SERVED_STATS)
+        average_compute = stats["compute_seconds"] / stats["computed"] if stats["computed"] else 0.0
+        return {
+            "name": self.name,
+            "entries": len(self.memory),
+            "inflight": len(self._inflight) + len(self._flights),
+            **stats,
+            "compute_seconds": round(stats["compute_seconds"], 3),
+            # Calls (and their latency) avoided thanks to the cache and coalescing
+            "calls_saved": served,
+            "estimated_seconds_saved": round(served * average_compute, 3),
+        }
+
+
+@lru_cache
+def get_recommendation_cache() -> TieredCache:
+    store = MongoCacheStore(RESULT_CACHE_COLLECTION) if RESULT_CACHE_MONGO_ENABLED else None
+    return TieredCache(
+        "recommendations",
+        max_entries=RESULT_CACHE_MAX_ENTRIES,
+        ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+        store=store,
+    )
+
+
+@lru_cache
+def get_tavily_search_cache() -> TieredCache:
+    store = MongoCacheStore(TAVILY_CACHE_COLLECTION) if TAVILY_CACHE_MONGO_ENABLED else None
+    return TieredCache(
+        "tavily_search",
+        max_entries=TAVILY_CACHE_MAX_ENTRIES,
+        ttl_seconds=TAVILY_SEARCH_CACHE_TTL_SECONDS,
+        store=store,
+    )
+
+
+@lru_cache
+def get_tavily_extract_cache() -> TieredCache:
+    store = MongoCacheStore(TAVILY_CACHE_COLLECTION) if TAVILY_CACHE_MONGO_ENABLED else None
+    return TieredCache(
+        "tavily_extract",
+        max_entries=TAVILY_CACHE_MAX_ENTRIES,
+        ttl_seconds=TAVILY_EXTRACT_CACHE_TTL_SECONDS,
+        store=store,
+    )
+
+
+class BatchMemo:
+    """
+    Tavily and MongoDB results shared by the items of one batch request.
+
+    In-memory only and dropped with the batch. Tavily results go through
+    the process-wide caches instead when those are enabled.
+    """
+
+    def __init__(self):
+        self.search = TieredCache("batch_tavily_search", BATCH_MEMO_MAX_ENTRIES, BATCH_MEMO_TTL_SECONDS)
+        self.extract = TieredCache("batch_tavily_extract", BATCH_MEMO_MAX_ENTRIES, BATCH_MEMO_TTL_SECONDS)
+        self.mongo = TieredCache("batch_mongo", BATCH_MEMO_MAX_ENTRIES, BATCH_MEMO_TTL_SECONDS)
+
+    def snapshot(self) -> dict:
+        return {cache.name: cache.snapshot() for cache in (self.search, self.extract, self.mongo)}
+
+
+_current_batch: ContextVar[Optional[BatchMemo]] = ContextVar("batch_memo", default=None)
+
+
+def current_batch() -> Optional[BatchMemo]:
+    return _current_batch.get()
+
+
+@contextmanager
+def batch_scope() -> Iterator[BatchMemo]:
+    """
+    Share one BatchMemo with everything run in the enclosed block, including tasks it starts.
+    """
+    memo = BatchMemo()
+    token = _current_batch.set(memo)
+    try:
+        yield memo
+    finally:
+        try:
+            _current_batch.reset(token)
+        except ValueError:
+            # Exited from another context, e.g. a streaming generator finalized by the server
+            _current_batch.set(None)
@@ -13,17 +13,138 @@ MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o")
 LLM_TEMPERATURE = 0.1
 
 # MongoDB Configuration
-SEARCH_INDEX_NAME = "supplier_search_index"
-SEARCH_INDEX_SPEC = [("$**", TEXT)]
+SEARCH_INDEX_NAME = "supplier_text_index"
+SEARCH_INDEX_SPEC = [
+    ("company_name", TEXT),
+    ("specialties", TEXT),
+    ("certifications", TEXT),
+    ("location", TEXT),
+]
+SEARCH_INDEX_WEIGHTS = {"company_name": 10, "specialties": 8, "certifications": 5, "location": 3}
+# Wildcard text index used by earlier versions; dropped during index bootstrap
+LEGACY_SEARCH_INDEX_NAMES = ["supplier_search_index"]
+# Log an explain() report for the common query shapes at startup
+INDEX_EXPLAIN_ON_STARTUP = os.getenv("INDEX_EXPLAIN_ON_STARTUP", "false").lower() == "true"
 
 # Agent Configuration - ADD THESE MISSING CONSTANTS
 MAX_QUERY_LENGTH = 2000
 MAX_EXTRACT_URLS = 15
+# web_extract splits URL lists into chunks that are fetched concurrently
+EXTRACT_CHUNK_SIZE = 3
+EXTRACT_MAX_WORKERS = 4
+EXTRACT_CHUNK_TIMEOUT = 30  # seconds per chunk once it starts; a slow URL fails its whole chunk
 DEFAULT_REMAINING_STEPS = 25
 AGENT_MAX_SUPPLIERS = 10
 AGENT_RECURSION_LIMIT = 200
+# query_mongodb page size; results beyond the cap are reachable through next_cursor
+MONGO_QUERY_DEFAULT_LIMIT = 10
+MONGO_QUERY_MAX_LIMIT = 25
+# Run the agent graph and its tools natively on the event loop (ainvoke + motor + async HTTP)
+AGENT_ASYNC_MODE = os.getenv("AGENT_ASYNC_MODE", "true").lower() == "true"
 
 # LLM Performance Configuration  
 MAX_TOKENS = 4096  # Further reduced to prevent context overflow
 REQUEST_TIMEOUT = 300
 MAX_RETRIES = 3 
+
+# Recommendation Result Cache
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_MONGO_ENABLED = os.getenv("RESULT_CACHE_MONGO_ENABLED", "true").lower() == "true"
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "21600"))
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_COLLECTION = "recommendation_cache"
+CACHE_BYPASS_HEADER = "X-Cache-Bypass"
+
+# Tavily Search/Extract Cache
+TAVILY_CACHE_ENABLED = os.getenv("TAVILY_CACHE_ENABLED", "true").lower() == "true"
+TAVILY_CACHE_MONGO_ENABLED = os.getenv("TAVILY_CACHE_MONGO_ENABLED", "true").lower() == "true"
+TAVILY_SEARCH_CACHE_TTL_SECONDS = int(os.getenv("TAVILY_SEARCH_CACHE_TTL_SECONDS", "86400"))
+TAVILY_EXTRACT_CACHE_TTL_SECONDS = int(os.getenv("TAVILY_EXTRACT_CACHE_TTL_SECONDS", "604800"))
+TAVILY_CACHE_MAX_ENTRIES = 2048
+TAVILY_CACHE_COLLECTION = "tavily_cache"
+
+# Write-behind Supplier Persistence
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "true").lower() == "true"
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100"))  # suppliers per bulk write
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "2.0"))  # seconds
+WRITE_BEHIND_MAX_QUEUE = 1000  # pending requests before callers fall back to direct writes
+WRITE_BEHIND_MAX_RETRIES = 5
+WRITE_BEHIND_RETRY_BACKOFF = 0.5  # seconds, doubled per attempt
+WRITE_BEHIND_DRAIN_TIMEOUT = 30  # seconds allowed to flush on shutdown
+
+# In-process Supplier Retrieval Index
+RETRIEVAL_INDEX_ENABLED = os.getenv("RETRIEVAL_INDEX_ENABLED", "true").lower() == "true"
+RETRIEVAL_BM25_K1 = 1.2
+RETRIEVAL_BM25_B = 0.75
+RETRIEVAL_PREFIX_MIN_LENGTH = 4  # shorter query terms only match exactly
+RETRIEVAL_PREFIX_EXPANSIONS = 20  # vocabulary terms a query term may expand to
+RETRIEVAL_PREFIX_WEIGHT = 0.6  # score multiplier for prefix (non-exact) matches
+# Pull suppliers written by other processes (job workers, other replicas) into the index
+RETRIEVAL_INDEX_REFRESH_SECONDS = float(os.getenv("RETRIEVAL_INDEX_REFRESH_SECONDS", "60"))
+# query_mongodb skips an index not refreshed for this long; 0 disables the check
+RETRIEVAL_INDEX_MAX_STALENESS_SECONDS = float(os.getenv("RETRIEVAL_INDEX_MAX_STALENESS_SECONDS", "300"))
+RETRIEVAL_INDEX_REFRESH_OVERLAP_SECONDS = 120  # re-read window, covers clock skew between writers
+
+# Tool Output Distillation (token budgets per tool result)
+DISTILL_ENABLED = os.getenv("DISTILL_ENABLED", "true").lower() == "true"
+SEARCH_RESULT_TOKEN_BUDGET = int(os.getenv("SEARCH_RESULT_TOKEN_BUDGET", "1500"))
+EXTRACT_RESULT_TOKEN_BUDGET = int(os.getenv("EXTRACT_RESULT_TOKEN_BUDGET", "6000"))
+EXTRACT_PAGE_MIN_TOKENS = 300  # per-page floor when many URLs share the budget
+
+# Database-only Fast Path (skip the agent when enough complete suppliers are already stored)
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_MIN_SUPPLIERS = int(os.getenv("FAST_PATH_MIN_SUPPLIERS", str(AGENT_MAX_SUPPLIERS)))
+FAST_PATH_MIN_COMPLETENESS = float(os.getenv("FAST_PATH_MIN_COMPLETENESS", "100"))  # percent
+FAST_PATH_MAX_PAGES = 3  # query_mongodb pages scanned for candidates
+FAST_PATH_MIN_TERM_COVERAGE = 0.5  # share of subject terms a supplier's specialties/name must cover
+SERVED_BY_HEADER = "X-Served-By"
+
+# Batch Recommendations
+BATCH_MAX_ITEMS = 50
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_MEMO_MAX_ENTRIES = 4096  # shared Tavily/MongoDB results kept for the life of one batch
+BATCH_MEMO_TTL_SECONDS = 3600
+
+# Asynchronous Recommendation Jobs
+JOBS_COLLECTION = "recommendation_jobs"
+JOB_WORKERS_IN_API = os.getenv("JOB_WORKERS_IN_API", "true").lower() == "true"  # false when run via `python -m src.jobs`
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # seconds between claims when idle
+JOB_LEASE_SECONDS = 60  # a running job whose lease lapses is retried by another worker
+JOB_MAX_ATTEMPTS = 3
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "604800"))  # finished jobs kept for 7 days
+
+# Admission Control (caps concurrent agent runs; cache and fast-path answers are not limited)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_CONCURRENT_RUNS = int(os.getenv("ADMISSION_MAX_CONCURRENT_RUNS", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))  # requests waiting for a slot before 429
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))  # seconds waited before 503
+ADMISSION_RETRY_AFTER_MAX = 300  # seconds
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_JSON = os.getenv("LOG_JSON", "false").lower() == "true"  # one JSON object per line
+LOG_ENQUEUE = os.getenv("LOG_ENQUEUE", "true").lower() == "true"  # write from a background thread
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.0"))  # fraction of requests traced at DEBUG
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Chat History Compaction (older turns folded into a cached rolling summary)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))  # history tokens rendered into the prompt
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))  # most recent messages kept verbatim
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "400"))
+HISTORY_MESSAGE_MAX_TOKENS = 2000  # per message sent to the summarizer
+HISTORY_SUMMARY_PROBE_LIMIT = 8  # earlier prefixes checked for a summary to extend
+HISTORY_SUMMARY_CACHE_MAX_ENTRIES = 1024
+HISTORY_SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("HISTORY_SUMMARY_CACHE_TTL_SECONDS", "86400"))
+HISTORY_SUMMARY_CACHE_MONGO_ENABLED = os.getenv("HISTORY_SUMMARY_CACHE_MONGO_ENABLED", "true").lower() == "true"
+HISTORY_SUMMARY_CACHE_COLLECTION = "history_summary_cache"
+
+# Fan-out Web Search (web_search_many: several queries in one tool call)
+WEB_SEARCH_MANY_MAX_QUERIES = 6
+WEB_SEARCH_MANY_CONCURRENCY = int(os.getenv("WEB_SEARCH_MANY_CONCURRENCY", "4"))  # Tavily calls in flight per tool call
+WEB_SEARCH_MANY_QUERY_TIMEOUT = int(os.getenv("WEB_SEARCH_MANY_QUERY_TIMEOUT", "20"))  # seconds per query once it starts
+WEB_SEARCH_MANY_RRF_K = 60  # reciprocal rank fusion constant
+WEB_SEARCH_MANY_PER_DOMAIN = 2  # results kept per site
+WEB_SEARCH_MANY_MAX_RESULTS = int(os.getenv("WEB_SEARCH_MANY_MAX_RESULTS", "15"))
+WEB_SEARCH_MANY_TOKEN_BUDGET = int(os.getenv("WEB_SEARCH_MANY_TOKEN_BUDGET", "3000"))
@@ -0,0 +1,226 @@
+"""
+Distillation of Tavily tool output before it is handed back to the LLM.
+
+Search and extract responses are reduced to the parts the agent uses: page
+boilerplate (navigation, cookie banners, image and link lists) is stripped,
+passages mentioning pricing, MOQ, lead time, certifications or contact details
+are ranked first, and each tool result is capped at a token budget. Inputs are
+never modified, since they may be shared with the Tavily cache.
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Any
+from .utils import get_logger
+from .config import (
+    MODEL_NAME,
+    SEARCH_RESULT_TOKEN_BUDGET,
+    EXTRACT_RESULT_TOKEN_BUDGET,
+    EXTRACT_PAGE_MIN_TOKENS,
+)
+
+logger = get_logger()
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken ships with langchain-openai
+    tiktoken = None
+
+# Search result fields the agent reads; images, raw_content and the like are dropped
+SEARCH_RESPONSE_FIELDS = ("query", "answer")
+SEARCH_RESULT_FIELDS = ("title", "url", "content", "score")
+
+_BOILERPLATE_PATTERN = re.compile(
+    r"cookie|privacy policy|terms of (use|service)|all rights reserved|©|copyright|"
+    r"subscribe|newsletter|sign in|log ?in|sign up|create an account|shopping cart|"
+    r"skip to (main )?content|javascript|accept all|back to top",
+    re.IGNORECASE,
+)
+_MARKDOWN_LINK_PATTERN = re.compile(r"!?\[[^\[\]]*\]\([^()]*\)")
+_ALPHANUMERIC_PATTERN = re.compile(r"[A-Za-z0-9]")
+_WHITESPACE_PATTERN = re.compile(r"[ \t ]+")
+
+# Signals that a passage carries supplier facts, with their weights
+PASSAGE_SIGNALS = [
+    (re.compile(r"\$\s?\d|\busd\b|\bprice|\bpricing|\bquote|\bfob\b|\bper (unit|piece|pc)", re.IGNORECASE), 3.0),
+    (re.compile(r"\bmoq\b|minimum order|min\.? order", re.IGNORECASE), 3.0),
+    (re.compile(r"lead[ -]?time|delivery|ship(ping|s)? (in|within)|\b\d+\s*(-\s*\d+\s*)?(days|weeks)\b", re.IGNORECASE), 2.0),
+    (re.compile(r"\biso\s?\d{3,5}|\bce\b|\brohs\b|\bfda\b|\bul\b|\bgots\b|\breach\b|certifi", re.IGNORECASE), 2.5),
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|\+?\d[\d\s().-]{7,}\d|\bcontact\b|\btel\b|\bphone\b|\baddress\b", re.IGNORECASE), 2.5),
+    (re.compile(r"manufactur|factory|capacity|production|oem|odm|wholesale|supplier|export", re.IGNORECASE), 1.0),
+]
+
+
+@lru_cache
+def _get_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(MODEL_NAME)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Encodings are downloaded on first use; fall back if that is not possible
+            return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count for the configured model, or a chars/4 estimate without tiktoken.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, token_budget: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        # The longest prefix count_tokens still estimates within the budget
+        return text[: max(token_budget * 4 - 1, 0)]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:token_budget])
+
+
+def _json_tokens(value: Any) -> int:
+    return count_tokens(json.dumps(value, default=str))
+
+
+def _is_markup_only(line: str) -> bool:
+    # Lines made only of (possibly nested) links and images, rules or table borders
+    residual, previous = line, None
+    while residual != previous:
+        previous, residual = residual, _MARKDOWN_LINK_PATTERN.sub("", residual)
+    return not _ALPHANUMERIC_PATTERN.search(residual)
+
+
+def strip_boilerplate(text: str) -> str:
+    """
+    Drop navigation, banner and markup-only lines, and repeated lines.
+    """
+    lines, seen = [], set()
+    for line in text.splitlines():
+        line = _WHITESPACE_PATTERN.sub(" ", line).strip()
+        if not line:
+            # Keep paragraph breaks for passage splitting
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        if _is_markup_only(line):
+            continue
+        if len(line) < 120 and _BOILERPLATE_PATTERN.search(line):
+            continue
+        # Short, punctuation-free lines without digits are almost always menu items
+        if len(line.split()) <= 3 and not re.search(r"[\d@.:$]", line):
+            continue
+        key = line.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def _split_passages(text: str, max_chars: int = 600) -> list[str]:
+    passages = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            # Break long paragraphs at the last sentence or line end inside the window
+            cut = max(paragraph.rfind(". ", 0, max_chars), paragraph.rfind("\n", 0, max_chars))
+            cut = cut + 1 if cut > max_chars // 3 else max_chars
+            passages.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            passages.append(paragraph)
+    return passages
+
+
+def score_passage(passage: str, position: int) -> float:
+    score = sum(weight for pattern, weight in PASSAGE_SIGNALS if pattern.search(passage))
+    # The opening passages usually introduce the company
+    if position < 2:
+        score += 1.0
+    return score
+
+
+def distill_text(text: str, token_budget: int) -> tuple[str, bool]:
+    """
+    Keep the highest-signal passages of `text` within `token_budget`, in page order.
+    Returns the distilled text and whether anything was dropped.
+    """
+    if not text:
+        return "", False
+    if count_tokens(text) <= token_budget:
+        return text, False
+
+    passages = _split_passages(strip_boilerplate(text))
+    ranked = sorted(
+        enumerate(passages), key=lambda item: (-score_passage(item[1], item[0]), item[0])
+    )
+    selected, used = [], 0
+    for position, passage in ranked:
+        tokens = count_tokens(passage)
+        if used + tokens > token_budget:
+            continue
+        selected.append(position)
+        used += tokens
+    if not selected and ranked:
+        # Even the best passage is over budget: keep its head rather than nothing
+        return truncate_to_tokens(ranked[0][1], token_budget), True
+    return "\n\n".join(passages[position] for position in sorted(selected)), True
+
+
+def _with_report(result: dict, original: Any) -> dict:
+    original_tokens = _json_tokens(original)
+    distilled_tokens = _json_tokens(result)
+    result["distillation"] = {
+        "original_tokens": original_tokens,
+        "distilled_tokens": distilled_tokens,
+    }
+    logger.info(f"Distilled tool output from {original_tokens} to {distilled_tokens} tokens")
+    return result
+
+
+def _per_item_budget(total: int, count: int, floor: int) -> int:
+    return max(floor, total // max(count, 1))
+
+
+def distill_search_response(response: dict, token_budget: int = SEARCH_RESULT_TOKEN_BUDGET) -> dict:
+    """
+    Trim a Tavily search response to titles, URLs, scores and budgeted snippets.
+    """
+    results = response.get("results") or []
+    budget = _per_item_budget(token_budget, len(results), floor=60)
+    distilled = {field: response[field] for field in SEARCH_RESPONSE_FIELDS if response.get(field)}
+    distilled["results"] = []
+    for item in results:
+        entry = {field: item[field] for field in SEARCH_RESULT_FIELDS if field in item}
+        entry["content"], truncated = distill_text(item.get("content") or "", budget)
+        if truncated:
+            entry["truncated"] = True
+        distilled["results"].append(entry)
+    if "error" in response:
+        distilled["error"] = response["error"]
+    return _with_report(distilled, response)
+
+
+def distill_extract_results(results: list[dict], token_budget: int = EXTRACT_RESULT_TOKEN_BUDGET) -> tuple[list[dict], dict]:
+    """
+    Distill extracted pages so together they fit `token_budget`.
+    Returns the new result list and the token report.
+    """
+    budget = _per_item_budget(token_budget, len(results), floor=EXTRACT_PAGE_MIN_TOKENS)
+    distilled = []
+    for page in results:
+        entry = {"url": page.get("url")}
+        entry["raw_content"], truncated = distill_text(page.get("raw_content") or "", budget)
+        if truncated:
+            entry["truncated"] = True
+        distilled.append(entry)
+    report = _with_report({"results": distilled}, {"results": results})["distillation"]
+    return distilled, report
+
@@ -0,0 +1,59 @@
+"""
+Merging of fan-out web searches.
+
+`web_search_many` runs several query variants at once. Their result lists are
+fused with reciprocal rank fusion: a page scores 1 / (k + rank) for every
+query that returned it, so pages several variants agree on rise to the top,
+and Tavily scores from different queries never need to be compared. Duplicate
+spellings of a URL are merged, and at most WEB_SEARCH_MANY_PER_DOMAIN pages
+per site are kept so one directory cannot fill the list.
+"""
+from typing import Any
+from .utils import canonicalize_url, url_domain
+from .config import (
+    WEB_SEARCH_MANY_RRF_K,
+    WEB_SEARCH_MANY_PER_DOMAIN,
+    WEB_SEARCH_MANY_MAX_RESULTS,
+)
+
+
+def merge_search_responses(
+    responses: list[tuple[str, Any]],
+    max_results: int = WEB_SEARCH_MANY_MAX_RESULTS,
+    per_domain: int = WEB_SEARCH_MANY_PER_DOMAIN,
+) -> list[dict]:
+    """
+    Fuse (query, Tavily response) pairs into one ranked, deduplicated result list.
+
+    Each result keeps the fields of its best-ranked occurrence, its fused `score`
+    and the `queries` that found it.
+    """
+    merged: dict[str, dict] = {}
+    for query, response in responses:
+        results = response.get("results") or [] if isinstance(response, dict) else []
+        for rank, item in enumerate(results, start=1):
+            url = item.get("url")
+            if not url:
+                continue
+            key = canonicalize_url(url)
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {"item": item, "best_rank": rank, "fused": 0.0, "queries": []}
+            elif rank < entry["best_rank"]:
+                entry["item"], entry["best_rank"] = item, rank
+            entry["fused"] += 1.0 / (WEB_SEARCH_MANY_RRF_K + rank)
+            if query not in entry["queries"]:
+                entry["queries"].append(query)
+
+    ranked = sorted(merged.values(), key=lambda entry: (-entry["fused"], entry["best_rank"]))
+    per_site: dict[str, int] = {}
+    fused = []
+    for entry in ranked:
+        domain = url_domain(entry["item"]["url"])
+        if per_site.get(domain, 0) >= per_domain:
+            continue
+        per_site[domain] = per_site.get(domain, 0) + 1
+        fused.append({**entry["item"], "score": round(entry["fused"], 4), "queries": entry["queries"]})
+        if len(fused) == max_results:
+            break
+    return fused
@@ -0,0 +1,268 @@
+"""
+Database-only fast path for recommendation requests.
+
+Before the agent runs, the query is parsed with regular expressions into the
+filters a model would typically pass to `query_mongodb` (location,
+certifications, budget, lead time, MOQ). Known suppliers are then looked up
+and scored with the same completeness rules as `validate_supplier_data`. If
+enough complete, relevant suppliers exist they are returned directly;
+otherwise the caller falls back to the agent.
+"""
+import asyncio
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+from pydantic import ValidationError
+from .models import AgentConfig, Supplier, SupplierExplorationAgentResponse
+from .normalization import parse_lead_time_days, parse_moq_units
+from .retrieval import tokenize
+from .tools import query_mongodb
+from .telemetry import timed
+from .utils import get_logger, score_supplier_completeness, supplier_key
+from .config import (
+    AGENT_ASYNC_MODE,
+    AGENT_MAX_SUPPLIERS,
+    FAST_PATH_MIN_SUPPLIERS,
+    FAST_PATH_MIN_COMPLETENESS,
+    FAST_PATH_MAX_PAGES,
+    FAST_PATH_MIN_TERM_COVERAGE,
+    MONGO_QUERY_MAX_LIMIT,
+    RETRIEVAL_PREFIX_MIN_LENGTH,
+)
+
+logger = get_logger()
+
+# Standards written in mixed case; CE/UL/FDA and friends only count when upper-case
+_CERTIFICATION_PATTERN = re.compile(
+    r"\b(?:(?i:ISO)\s?\d{4,5}(?:-\d)?|(?i:IATF)\s?16949|(?i:AS)\s?9100|(?i:RoHS|GOTS|OEKO-TEX|BSCI|HACCP|SEDEX)"
+    r"|CE|UL|FDA|GMP|FSC|REACH|WRAP|BRC)\b"
+)
+# "in India", "in the United States", "from The Netherlands"
+_LOCATION_PATTERN = re.compile(
+    r"\b(?:based in|located in|in|from|near)\s+(?:[Tt]he\s+)?([A-Z][\w.'-]*(?:\s+[A-Z][\w.'-]*)*)"
+)
+# Spellings of one country that supplier locations use interchangeably
+LOCATION_ALIASES = [
+    ("united states", "united states of america", "usa", "us", "u.s.", "u.s.a."),
+    ("united kingdom", "uk", "u.k.", "great britain", "britain"),
+    ("united arab emirates", "uae", "u.a.e."),
+    ("netherlands", "holland"),
+    ("south korea", "korea", "republic of korea"),
+    ("czech republic", "czechia"),
+]
+_PRICE_PATTERN = re.compile(
+    r"(?:under|below|less than|at most|up to|max(?:imum)?|budget(?: of)?|<=?)\s*"
+    r"\$\s?(\d[\d,]*(?:\.\d+)?)(?:\s*(?:usd|dollars?))?(?:\s*(?:per|/|a)\s*(?:unit|piece|pc))?",
+    re.IGNORECASE,
+)
+_LEAD_TIME_PATTERN = re.compile(
+    r"(?:lead[ -]?times?|deliver\w*|ship\w*|within|turnaround)\b[^.,;\d]{0,20}?"
+    r"(\d+(?:\s*(?:-|to)\s*\d+)?\s*(?:business\s+|working\s+)?(?:days?|weeks?|wks?|months?))",
+    re.IGNORECASE,
+)
+_MOQ_PATTERN = re.compile(
+    r"(?:\bmoq\b|minimum order(?: quantity)?|min\.? order)[^.,;\d]{0,20}?(\d[\d,]*\s*k?)\b"
+    r"(?:\s*(?:units?|pcs|pieces))?"
+    r"|(?:under|below|less than|up to|at most)\s+(\d[\d,]*\s*k?)\s*(?:units?|pcs|pieces)\b",
+    re.IGNORECASE,
+)
+# Request phrasing that says nothing about what is being sourced
+FILLER_TERMS = {
+    "find", "need", "needs", "want", "looking", "search", "source", "sourcing", "get", "show",
+    "list", "top", "best", "good", "reliable", "certified", "certification", "compliant",
+    "vendor", "company", "factory", "producer", "maker", "wholesaler", "exporter",
+    "under", "below", "less", "than", "within", "lead", "time", "moq", "price", "cost",
+    "unit", "piece", "pc", "day", "week", "month", "who", "can", "that", "me", "i", "we",
+    "is", "be", "per", "any", "some", "please", "budget", "usd", "order", "minimum", "quantity",
+}
+
+
+@dataclass
+class FastPathQuery:
+    """
+    Filters pulled out of a free-text request, plus the remaining subject terms.
+    """
+
+    subject: list[str] = field(default_factory=list)
+    location: Optional[str] = None
+    certifications: list[str] = field(default_factory=list)
+    max_price_usd: Optional[float] = None
+    max_lead_time_days: Optional[float] = None
+    max_moq_units: Optional[int] = None
+
+    def tool_args(self, cursor: Optional[str] = None) -> dict:
+        # Location and certifications rank the lookup; they are enforced case-insensitively afterwards
+        terms = self.subject + self.certifications + ([self.location] if self.location else [])
+        return {
+            "query": " ".join(terms),
+            "max_price_usd": self.max_price_usd,
+            "max_lead_time_days": self.max_lead_time_days,
+            "max_moq_units": self.max_moq_units,
+            "limit": MONGO_QUERY_MAX_LIMIT,
+            "cursor": cursor,
+        }
+
+
+def _canonical_certification(text: str) -> str:
+    compact = re.sub(r"\s+", " ", text.strip())
+    match = re.match(r"(?i)(iso|iatf|as)\s?(\d.*)", compact)
+    if match:
+        return f"{match.group(1).upper()} {match.group(2)}"
+    return compact.upper() if compact.lower() != "rohs" else "RoHS"
+
+
+def extract_query_filters(query: str) -> FastPathQuery:
+    """
+    Cheap, regex-only extraction of query_mongodb filters from a request.
+    """
+    extracted = FastPathQuery()
+    remainder = query
+
+    def consume(match: re.Match) -> None:
+        nonlocal remainder
+        remainder = remainder.replace(match.group(0), " ", 1)
+
+    for match in _CERTIFICATION_PATTERN.finditer(query):
+        certification = _canonical_certification(match.group(0))
+        if certification not in extracted.certifications:
+            extracted.certifications.append(certification)
+        consume(match)
+
+    match = _PRICE_PATTERN.search(remainder)
+    if match:
+        extracted.max_price_usd = float(match.group(1).replace(",", ""))
+        consume(match)
+
+    match = _LEAD_TIME_PATTERN.search(remainder)
+    if match:
+        extracted.max_lead_time_days = parse_lead_time_days(match.group(1))[1]
+        consume(match)
+
+    match = _MOQ_PATTERN.search(remainder)
+    if match:
+        extracted.max_moq_units = parse_moq_units(match.group(1) or match.group(2))
+        consume(match)
+
+    for match in _LOCATION_PATTERN.finditer(remainder):
+        # "in India, GOTS certified" -> "India"; skip phrases that are only certification codes
+        location = match.group(1).split(",")[0].strip(" .")
+        if location and not _CERTIFICATION_PATTERN.fullmatch(location):
+            extracted.location = location
+            consume(match)
+            break
+
+    extracted.subject = [
+        word for word in re.findall(r"[A-Za-z0-9][\w-]*", remainder)
+        if tokenize(word) and tokenize(word)[0] not in FILLER_TERMS
+    ]
+    return extracted
+
+
+def _compact_location(text: str) -> str:
+    return re.sub(r"[\s.]+", "", text.lower())
+
+
+def location_matches(wanted: str, have: str) -> bool:
+    """
+    Whether a supplier location mentions the wanted place, under any of its aliases.
+    """
+    wanted_key = _compact_location(wanted)
+    spellings = [wanted.lower()]
+    for aliases in LOCATION_ALIASES:
+        if wanted_key in {_compact_location(alias) for alias in aliases}:
+            spellings = list(aliases)
+            break
+    have = have.lower()
+    # Whole words only, so "US" does not match "Houston"
+    return any(re.search(rf"(?<!\w){re.escape(spelling)}(?!\w)", have) for spelling in spellings)
+
+
+def _terms_match(wanted: str, have: str) -> bool:
+    if wanted == have:
+        return True
+    shorter, longer = sorted((wanted, have), key=len)
+    return len(shorter) >= RETRIEVAL_PREFIX_MIN_LENGTH and longer.startswith(shorter)
+
+
+def _is_relevant(supplier: dict, fast_query: FastPathQuery) -> bool:
+    """
+    Enough subject terms appear in the supplier's specialties or name, and the
+    extracted location and certifications match case-insensitively.
+    """
+    if fast_query.location and not location_matches(fast_query.location, str(supplier.get("location", ""))):
+        return False
+    have_certifications = {str(value).replace(" ", "").lower() for value in supplier.get("certifications") or []}
+    for certification in fast_query.certifications:
+        if certification.replace(" ", "").lower() not in have_certifications:
+            return False
+
+    subject = list(dict.fromkeys(term for word in fast_query.subject for term in tokenize(word)))
+    described = tokenize(" ".join(supplier.get("specialties") or []) + " " + str(supplier.get("company_name", "")))
+    covered = sum(1 for term in subject if any(_terms_match(term, have) for have in described))
+    return covered >= math.ceil(len(subject) * FAST_PATH_MIN_TERM_COVERAGE)
+
+
+async def _lookup(args: dict) -> dict:
+    if AGENT_ASYNC_MODE:
+        return await query_mongodb.ainvoke(args)
+    return await asyncio.to_thread(query_mongodb.invoke, args)
+
+
+async def find_stored_suppliers(fast_query: FastPathQuery) -> list[Supplier]:
+    """
+    Complete, relevant stored suppliers for the query, best ranked first, up to AGENT_MAX_SUPPLIERS.
+    """
+    suppliers: list[Supplier] = []
+    seen: set[str] = set()
+    cursor = None
+    for _ in range(FAST_PATH_MAX_PAGES):
+        page = await _lookup(fast_query.tool_args(cursor))
+        for doc in page.get("suppliers", []):
+            key = supplier_key(doc)
+            if key in seen or not _is_relevant(doc, fast_query):
+                continue
+            if score_supplier_completeness(doc)["completeness_score"] < FAST_PATH_MIN_COMPLETENESS:
+                continue
+            try:
+                suppliers.append(Supplier.model_validate(doc))
+            except ValidationError:
+                continue
+            seen.add(key)
+            if len(suppliers) == AGENT_MAX_SUPPLIERS:
+                return suppliers
+        cursor = page.get("next_cursor")
+        if not cursor:
+            break
+    return suppliers
+
+
+async def try_fast_path(requirements: AgentConfig) -> Optional[SupplierExplorationAgentResponse]:
+    """
+    Answer from stored suppliers alone, or return None to run the agent.
+    """
+    if requirements.chat_history:
+        # Follow-up questions depend on context the regex extraction cannot see
+        return None
+
+    fast_query = extract_query_filters(requirements.query)
+    logger.debug("Fast path filters: {}", fast_query)
+    if not fast_query.subject:
+        logger.info("Fast path skipped: no subject terms in query")
+        return None
+
+    try:
+        with timed("fast_path.lookup"):
+            suppliers = await find_stored_suppliers(fast_query)
+    except Exception as e:
+        logger.error(f"Fast path lookup failed: {str(e)}")
+        return None
+
+    if len(suppliers) < FAST_PATH_MIN_SUPPLIERS:
+        logger.info(
+            f"Fast path found {len(suppliers)} complete suppliers (need {FAST_PATH_MIN_SUPPLIERS}), running the agent"
+        )
+        return None
+
+    logger.info(f"Serving {len(suppliers)} stored suppliers without running the agent")
+    return SupplierExplorationAgentResponse(suppliers=suppliers)
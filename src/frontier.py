@@ -0,0 +1,139 @@
+"""
+Per-run crawl frontier.
+
+Within one agent run the ReAct loop tends to repeat itself: the same query is
+searched twice, search results point at pages and supplier sites it has
+already seen, and URLs are extracted again. The frontier records what the run
+has seen, and the tools consult it:
+
+- a query already searched in this run is not sent again, unless the earlier
+  search failed;
+- search results whose page was already returned or extracted are collapsed to
+  a short reference without the snippet. Only the exact page counts: other
+  pages of a site the run extracted (marketplace listings, directory entries)
+  are kept as they are;
+- URLs already extracted in this run are not fetched again, and come back as a
+  reference to the earlier result.
+
+The frontier lives in a context variable for the duration of one run, like the
+request telemetry. The duplicates it avoided are logged when the run ends.
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from .cache import normalize_query
+from .telemetry import FRONTIER_DUPLICATES
+from .utils import get_logger, canonicalize_url
+
+logger = get_logger()
+
+
+class CrawlFrontier:
+    """
+    Queries and pages seen during one agent run.
+    Thread-safe: sync tool calls of one run may execute on several threads.
+    """
+
+    def __init__(self):
+        self.queries: set[str] = set()
+        self.search_urls: set[str] = set()
+        self.extracted_urls: set[str] = set()
+        self.stats = {"searches_skipped": 0, "results_collapsed": 0, "extracts_skipped": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        if amount:
+            self.stats[stat] += amount
+            FRONTIER_DUPLICATES.inc(amount, kind=stat)
+
+    def claim_query(self, query: str) -> bool:
+        """
+        Record `query`; False when this run already searched it.
+        Release the claim with `release_query` if the search then fails.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            if key in self.queries:
+                self._count("searches_skipped")
+                return False
+            self.queries.add(key)
+            return True
+
+    def release_query(self, query: str) -> None:
+        """
+        Forget `query` so a failed search can be retried later in the run.
+        """
+        with self._lock:
+            self.queries.discard(normalize_query(query))
+
+    def collapse_search_results(self, response: dict) -> dict:
+        """
+        Copy of a search response with already-known pages reduced to references.
+        """
+        results = []
+        collapsed = 0
+        with self._lock:
+            for item in response.get("results") or []:
+                url = canonicalize_url(item.get("url", ""))
+                if url in self.search_urls or url in self.extracted_urls:
+                    results.append({"url": item.get("url"), "title": item.get("title"), "already_seen": True})
+                    collapsed += 1
+                else:
+                    results.append(item)
+                self.search_urls.add(url)
+            self._count("results_collapsed", collapsed)
+        return {**response, "results": results}
+
+    def split_extract_urls(self, urls: list[str]) -> tuple[list[str], list[dict]]:
+        """
+        URLs still to fetch, and references for the ones this run already extracted.
+        """
+        fetch, known = [], []
+        with self._lock:
+            for url in urls:
+                if canonicalize_url(url) in self.extracted_urls:
+                    known.append({"url": url, "already_extracted": True})
+                else:
+                    fetch.append(url)
+            self._count("extracts_skipped", len(known))
+        return fetch, known
+
+    def record_extracted(self, results: list[dict]) -> None:
+        with self._lock:
+            for result in results:
+                self.extracted_urls.add(canonicalize_url(result.get("url", "")))
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "queries": len(self.queries),
+                "pages_seen": len(self.search_urls | self.extracted_urls),
+                "pages_extracted": len(self.extracted_urls),
+                **self.stats,
+            }
+
+
+_current_frontier: ContextVar[Optional[CrawlFrontier]] = ContextVar("crawl_frontier", default=None)
+
+
+def current_frontier() -> Optional[CrawlFrontier]:
+    return _current_frontier.get()
+
+
+@contextmanager
+def frontier_scope() -> Iterator[CrawlFrontier]:
+    """
+    Give the enclosed agent run its own frontier and log what it avoided.
+    """
+    frontier = CrawlFrontier()
+    token = _current_frontier.set(frontier)
+    try:
+        yield frontier
+    finally:
+        try:
+            _current_frontier.reset(token)
+        except ValueError:
+            # Exited from another context, e.g. a streaming generator finalized by the server
+            _current_frontier.set(None)
+        logger.info(f"Crawl frontier summary: {frontier.summary()}")
@@ -0,0 +1,163 @@
+"""
+Chat history compaction.
+
+The system prompt is resent on every ReAct iteration, so a long `chat_history`
+costs its full size once per agent turn. Before a run, histories over
+HISTORY_TOKEN_BUDGET are compacted: the last HISTORY_KEEP_TURNS messages stay
+verbatim and everything before them is folded into one LLM-written summary.
+
+Summaries are cached by a chained hash of the history prefix they cover. When
+a conversation grows, the summary of the previous prefix is found and only the
+messages added since are folded into it, rather than re-summarizing the whole
+conversation on every request. Earlier requests stored their summary a few
+messages back, so only the last HISTORY_SUMMARY_PROBE_LIMIT prefixes are
+checked, longest first.
+"""
+import hashlib
+from functools import lru_cache
+from typing import Optional
+from langchain_core.messages import HumanMessage, SystemMessage
+from .cache import TieredCache, MongoCacheStore
+from .distill import count_tokens, truncate_to_tokens
+from .prompts import SUMMARY_ROLE
+from .telemetry import TelemetryCallbackHandler, current_request, timed
+from .utils import get_logger, get_llm
+from .config import (
+    MODEL_NAME,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_KEEP_TURNS,
+    HISTORY_SUMMARY_MAX_TOKENS,
+    HISTORY_MESSAGE_MAX_TOKENS,
+    HISTORY_SUMMARY_PROBE_LIMIT,
+    HISTORY_SUMMARY_CACHE_MAX_ENTRIES,
+    HISTORY_SUMMARY_CACHE_TTL_SECONDS,
+    HISTORY_SUMMARY_CACHE_MONGO_ENABLED,
+    HISTORY_SUMMARY_CACHE_COLLECTION,
+)
+
+logger = get_logger()
+
+SUMMARY_INSTRUCTIONS = """You maintain a running summary of a supplier sourcing conversation.
+Fold the new messages into the existing summary. Keep every fact that matters for finding suppliers:
+products and specifications, quantities and MOQ, budgets and prices (in USD), lead times,
+locations, required certifications, and suppliers the user liked or rejected and why.
+Drop greetings and small talk. Write terse bullet points, at most {max_tokens} tokens."""
+
+
+@lru_cache
+def get_history_summary_cache() -> TieredCache:
+    store = MongoCacheStore(HISTORY_SUMMARY_CACHE_COLLECTION) if HISTORY_SUMMARY_CACHE_MONGO_ENABLED else None
+    return TieredCache(
+        "history_summaries",
+        max_entries=HISTORY_SUMMARY_CACHE_MAX_ENTRIES,
+        ttl_seconds=HISTORY_SUMMARY_CACHE_TTL_SECONDS,
+        store=store,
+    )
+
+
+def render_message(message: dict) -> str:
+    return f"{message.get('role', 'unknown')}: {message.get('content', '')}"
+
+
+def prefix_hashes(messages: list[dict]) -> list[str]:
+    """
+    Hash of each prefix: entry i covers messages[:i + 1], and is computed from entry i - 1.
+    """
+    # Summaries depend on the model and the summary budget as well as the messages
+    digest = hashlib.sha256(f"{MODEL_NAME}:{HISTORY_SUMMARY_MAX_TOKENS}".encode()).hexdigest()
+    hashes = []
+    for message in messages:
+        digest = hashlib.sha256(f"{digest}\n{render_message(message)}".encode()).hexdigest()
+        hashes.append(f"history:{digest}")
+    return hashes
+
+
+def _split_recent(messages: list[dict], token_counts: list[int]) -> int:
+    # Index where the verbatim tail starts: at most HISTORY_KEEP_TURNS messages that fit
+    # next to a full-size summary, but always at least the last message
+    recent_budget = max(HISTORY_TOKEN_BUDGET - HISTORY_SUMMARY_MAX_TOKENS, 0)
+    start, used = len(messages), 0
+    while start > 0 and len(messages) - start < HISTORY_KEEP_TURNS:
+        if used + token_counts[start - 1] > recent_budget and start < len(messages):
+            break
+        start -= 1
+        used += token_counts[start]
+    return start
+
+
+async def _summarize(previous_summary: Optional[str], messages: list[dict]) -> str:
+    new_messages = "\n".join(
+        truncate_to_tokens(render_message(message), HISTORY_MESSAGE_MAX_TOKENS) for message in messages
+    )
+    prompt = (
+        f"Existing summary:\n{previous_summary or '(none)'}\n\n"
+        f"New messages:\n{new_messages}"
+    )
+    llm = get_llm().bind(max_tokens=HISTORY_SUMMARY_MAX_TOKENS)
+    with timed("history.summarize"):
+        result = await llm.ainvoke(
+            [
+                SystemMessage(content=SUMMARY_INSTRUCTIONS.format(max_tokens=HISTORY_SUMMARY_MAX_TOKENS)),
+                HumanMessage(content=prompt),
+            ],
+            config={"callbacks": [TelemetryCallbackHandler(current_request())]},
+        )
+    return str(result.content).strip()
+
+
+async def summarize_prefix(messages: list[dict]) -> str:
+    """
+    Summary of `messages`, extending the longest recently summarized prefix.
+    """
+    cache = get_history_summary_cache()
+    hashes = prefix_hashes(messages)
+
+    async def compute() -> str:
+        # The nearest earlier summary, if one of the last few prefixes has one
+        key, previous_summary = await cache.aget_first(hashes[-2::-1][:HISTORY_SUMMARY_PROBE_LIMIT])
+        covered = hashes.index(key) + 1 if key is not None else 0
+        logger.info(f"Summarizing {len(messages) - covered} history messages ({covered} already summarized)")
+        return await _summarize(previous_summary, messages[covered:])
+
+    # Only the exact prefix counts as a cache hit or miss
+    return await cache.aget_or_compute(hashes[-1], compute, should_cache=bool)
+
+
+async def compact_chat_history(chat_history: Optional[list[dict]]) -> Optional[list[dict]]:
+    """
+    Return the history to render in the prompt, within HISTORY_TOKEN_BUDGET where possible.
+
+    Short histories are returned unchanged. Longer ones become a `summary` message
+    followed by the most recent turns. If summarization fails, the older turns are
+    dropped instead.
+    """
+    if not chat_history:
+        return chat_history
+
+    token_counts = [count_tokens(render_message(message)) for message in chat_history]
+    total_tokens = sum(token_counts)
+    if total_tokens <= HISTORY_TOKEN_BUDGET:
+        return chat_history
+
+    start = _split_recent(chat_history, token_counts)
+    recent = [
+        {**message, "content": truncate_to_tokens(str(message.get("content", "")), HISTORY_TOKEN_BUDGET)}
+        if count > HISTORY_TOKEN_BUDGET else message
+        for message, count in zip(chat_history[start:], token_counts[start:])
+    ]
+    if start == 0:
+        return recent
+
+    try:
+        summary = await summarize_prefix(chat_history[:start])
+    except Exception as e:
+        logger.warning(f"History summarization failed, dropping {start} older messages: {str(e)}")
+        return recent
+
+    compacted = [{"role": SUMMARY_ROLE, "content": summary}] + recent
+    logger.info(
+        f"Compacted chat history from {len(chat_history)} messages (~{total_tokens} tokens) "
+        f"to a summary plus {len(recent)} messages "
+        f"(~{sum(count_tokens(render_message(message)) for message in compacted)} tokens)"
+    )
+    return compacted
@@ -0,0 +1,215 @@
+"""
+Index management for the supplier collection.
+
+Indexes are declared once in `supplier_index_models()`, created at application
+startup and memoized afterwards, so the request path never pays for an
+`index_information()` round trip. `explain_common_queries()` checks that the
+filter shapes produced by `SupplierSearchIndexQuery.build_filter` are served by
+an index; run `python -m src.indexes` to print the report.
+"""
+import sys
+import threading
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from .utils import (
+    get_logger,
+    get_supplier_db_and_collection,
+    get_async_supplier_db_and_collection,
+)
+from .models import SupplierSearchIndexQuery
+from .config import (
+    SEARCH_INDEX_NAME,
+    SEARCH_INDEX_SPEC,
+    SEARCH_INDEX_WEIGHTS,
+    LEGACY_SEARCH_INDEX_NAMES,
+)
+
+logger = get_logger()
+
+_indexes_ready = False
+_indexes_lock = threading.Lock()
+
+# Stages that show the winning plan is served by an index rather than a collection scan
+INDEXED_STAGES = {"IXSCAN", "TEXT", "TEXT_MATCH", "TEXT_OR", "IDHACK", "COUNT_SCAN", "EXPRESS_IXSCAN"}
+
+
+def supplier_index_models() -> list[IndexModel]:
+    """
+    Declared indexes for the supplier collection, shaped after the filters
+    built by SupplierSearchIndexQuery.build_filter.
+    """
+    return [
+        # Weighted text index on the fields that actually describe a supplier
+        IndexModel(
+            SEARCH_INDEX_SPEC,
+            name=SEARCH_INDEX_NAME,
+            weights=SEARCH_INDEX_WEIGHTS,
+            default_language="english",
+        ),
+        # Supplier identity for idempotent upserts; legacy documents without a key are exempt
+        IndexModel(
+            [("supplier_key", ASCENDING)],
+            name="supplier_key_unique",
+            unique=True,
+            partialFilterExpression={"supplier_key": {"$exists": True}},
+        ),
+        # Exact-match location, optionally narrowed by lead time
+        IndexModel([("location", ASCENDING), ("lead_time", ASCENDING)], name="location_lead_time"),
+        IndexModel([("lead_time", ASCENDING)], name="lead_time"),
+        IndexModel([("price_range", ASCENDING)], name="price_range"),
+        # Multikey indexes for the `$in` filters; only one array field per compound index
+        IndexModel([("specialties", ASCENDING), ("location", ASCENDING)], name="specialties_location"),
+        IndexModel([("certifications", ASCENDING), ("location", ASCENDING)], name="certifications_location"),
+        # Range filters on the numeric fields parsed by src/normalization.py
+        IndexModel([("price_min_usd", ASCENDING)], name="price_min_usd"),
+        IndexModel([("lead_time_max_days", ASCENDING)], name="lead_time_max_days"),
+        IndexModel([("moq_units", ASCENDING)], name="moq_units"),
+        # Equality before range, so location narrows the scan first
+        IndexModel([("location", ASCENDING), ("lead_time_max_days", ASCENDING)], name="location_lead_time_days"),
+        # Delta refresh of the in-process retrieval index
+        IndexModel([("last_seen_at", ASCENDING)], name="last_seen_at"),
+    ]
+
+
+def _stale_index_names(index_information: dict) -> list[str]:
+    """
+    Text indexes other than the declared one must be dropped first:
+    MongoDB allows only a single text index per collection.
+    """
+    stale = []
+    for name, info in index_information.items():
+        is_text = any(direction == "text" for _, direction in info.get("key", []))
+        if name in LEGACY_SEARCH_INDEX_NAMES or (is_text and name != SEARCH_INDEX_NAME):
+            stale.append(name)
+        elif name == SEARCH_INDEX_NAME and info.get("weights") not in (None, SEARCH_INDEX_WEIGHTS):
+            # Weights changed; the index has to be rebuilt
+            stale.append(name)
+    return stale
+
+
+def ensure_supplier_indexes(force: bool = False) -> bool:
+    """
+    Create the declared supplier indexes once per process.
+    Returns True when the indexes are known to exist.
+    """
+    global _indexes_ready
+    if _indexes_ready and not force:
+        return True
+
+    with _indexes_lock:
+        if _indexes_ready and not force:
+            return True
+        try:
+            db, collection = get_supplier_db_and_collection()
+            for name in _stale_index_names(collection.index_information()):
+                logger.info(f"Dropping stale supplier index: {name}")
+                collection.drop_index(name)
+            created = collection.create_indexes(supplier_index_models())
+            logger.info(f"Supplier indexes ready: {created}")
+            _indexes_ready = True
+        except OperationFailure as e:
+            logger.error(f"Failed to create supplier indexes: {str(e)}", exc_info=True)
+        except Exception as e:
+            # Don't take the service down if MongoDB is unreachable; retry on next call
+            logger.error(f"Supplier index bootstrap failed: {str(e)}")
+    return _indexes_ready
+
+
+async def aensure_supplier_indexes(force: bool = False) -> bool:
+    """
+    Async variant of ensure_supplier_indexes using the motor client.
+    """
+    global _indexes_ready
+    if _indexes_ready and not force:
+        return True
+
+    try:
+        db, collection = get_async_supplier_db_and_collection()
+        for name in _stale_index_names(await collection.index_information()):
+            logger.info(f"Dropping stale supplier index: {name}")
+            await collection.drop_index(name)
+        created = await collection.create_indexes(supplier_index_models())
+        logger.info(f"Supplier indexes ready: {created}")
+        _indexes_ready = True
+    except OperationFailure as e:
+        logger.error(f"Failed to create supplier indexes: {str(e)}", exc_info=True)
+    except Exception as e:
+        logger.error(f"Supplier index bootstrap failed: {str(e)}")
+    return _indexes_ready
+
+
+def common_query_filters() -> dict[str, dict]:
+    """
+    Representative filters for the queries the agent issues most often.
+    """
+    queries = {
+        "text": SupplierSearchIndexQuery(query="electronic components"),
+        "location": SupplierSearchIndexQuery(location="Shenzhen, China"),
+        "location_lead_time": SupplierSearchIndexQuery(
+            location="Shenzhen, China", lead_time="2-3 weeks"
+        ),
+        "specialties": SupplierSearchIndexQuery(specialties=["Sensors", "Microcontrollers"]),
+        "certifications": SupplierSearchIndexQuery(certifications=["ISO 9001"]),
+        "specialties_location": SupplierSearchIndexQuery(
+            specialties=["Organic Cotton"], location="Gujarat, India"
+        ),
+        "price_range": SupplierSearchIndexQuery(price_range="$10-20 USD"),
+        "text_location": SupplierSearchIndexQuery(query="packaging", location="Toronto, Canada"),
+        "max_price": SupplierSearchIndexQuery(max_price_usd=15),
+        "location_max_lead_time": SupplierSearchIndexQuery(
+            location="Shenzhen, China", max_lead_time_days=21
+        ),
+        "max_moq": SupplierSearchIndexQuery(max_moq_units=500),
+    }
+    return {name: query.build_filter() for name, query in queries.items()}
+
+
+def _plan_stages(plan: dict) -> tuple[set[str], set[str]]:
+    stages, index_names = set(), set()
+    pending = [plan]
+    while pending:
+        node = pending.pop()
+        if not isinstance(node, dict):
+            continue
+        if "stage" in node:
+            stages.add(node["stage"])
+        if "indexName" in node:
+            index_names.add(node["indexName"])
+        for key in ("inputStage", "queryPlan", "innerStage", "outerStage"):
+            if key in node:
+                pending.append(node[key])
+        pending.extend(node.get("inputStages", []))
+    return stages, index_names
+
+
+def explain_common_queries() -> dict[str, dict]:
+    """
+    Run explain() on the common query shapes and report whether each hits an index.
+    """
+    ensure_supplier_indexes()
+    db, collection = get_supplier_db_and_collection()
+    report = {}
+    for name, query_filter in common_query_filters().items():
+        explanation = collection.find(query_filter).explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        stages, index_names = _plan_stages(winning_plan)
+        uses_index = bool(stages & INDEXED_STAGES) and "COLLSCAN" not in stages
+        report[name] = {
+            "filter": query_filter,
+            "uses_index": uses_index,
+            "stages": sorted(stages),
+            "indexes": sorted(index_names),
+        }
+        if uses_index:
+            logger.info(f"Query shape '{name}' uses index(es): {sorted(index_names)}")
+        else:
+            logger.warning(f"Query shape '{name}' is not index-backed: {sorted(stages)}")
+    return report
+
+
+if __name__ == "__main__":
+    results = explain_common_queries()
+    for shape, result in results.items():
+        status = "OK " if result["uses_index"] else "SCAN"
+        print(f"[{status}] {shape}: stages={result['stages']} indexes={result['indexes']}")
+    sys.exit(0 if all(result["uses_index"] for result in results.values()) else 1)
@@ -0,0 +1,376 @@
+"""
+Asynchronous recommendation jobs.
+
+POST enqueues a job document in MongoDB and returns its id right away; a pool
+of workers claims queued jobs atomically with find_one_and_update, runs the
+usual recommendation pipeline and writes progress and the final response back
+to the document, which clients poll by id. Workers hold a lease they renew
+while running, so a job whose worker dies is picked up again by another one.
+
+Workers run inside the API process by default. To scale them separately, set
+JOB_WORKERS_IN_API=false on the API and start dedicated workers with:
+
+    python -m src.jobs
+"""
+import asyncio
+import os
+import signal
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+from pymongo import ASCENDING, ReturnDocument
+from .models import AgentConfig, RecommendationJob
+from .agents import get_supply_chain_agent
+from .indexes import aensure_supplier_indexes
+from .persistence import get_write_behind_queue
+from .retrieval import load_retrieval_index, get_retrieval_index_refresher
+from .runner import AgentRunFailed, recommend
+from .logs import configure_logging, flush_logs, new_log_context, bind_log_context, reset_log_context
+from .telemetry import track_request, RequestTelemetry
+from .utils import get_logger, get_async_supplier_db_and_collection
+from .config import (
+    JOBS_COLLECTION,
+    JOB_WORKER_CONCURRENCY,
+    JOB_POLL_INTERVAL,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RESULT_TTL_SECONDS,
+    WRITE_BEHIND_ENABLED,
+)
+
+logger = get_logger()
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+_job_indexes_ready = False
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def get_jobs_collection():
+    db, _ = get_async_supplier_db_and_collection()
+    return db[JOBS_COLLECTION]
+
+
+async def aensure_job_indexes() -> None:
+    """
+    Index for claiming the oldest queued job, and a TTL index that expires finished jobs.
+    """
+    global _job_indexes_ready
+    if _job_indexes_ready:
+        return
+    collection = get_jobs_collection()
+    await collection.create_index([("status", ASCENDING), ("created_at", ASCENDING)], name="job_claim")
+    await collection.create_index("expires_at", name="job_expiry", expireAfterSeconds=0)
+    _job_indexes_ready = True
+
+
+def to_job_view(document: dict) -> RecommendationJob:
+    return RecommendationJob(
+        job_id=document["_id"],
+        status=document["status"],
+        query=document["request"]["query"],
+        created_at=document["created_at"],
+        updated_at=document["updated_at"],
+        started_at=document.get("started_at"),
+        finished_at=document.get("finished_at"),
+        attempts=document.get("attempts", 0),
+        progress=document.get("progress"),
+        served_by=document.get("served_by"),
+        result=document.get("result"),
+        error=document.get("error"),
+    )
+
+
+async def submit_job(requirements: AgentConfig, bypass_cache: bool = False) -> RecommendationJob:
+    await aensure_job_indexes()
+    now = _now()
+    document = {
+        "_id": uuid.uuid4().hex,
+        "status": JOB_QUEUED,
+        "request": requirements.model_dump(),
+        "bypass_cache": bypass_cache,
+        "created_at": now,
+        "updated_at": now,
+        "attempts": 0,
+    }
+    await get_jobs_collection().insert_one(document)
+    logger.info(f"Queued recommendation job {document['_id']}")
+    return to_job_view(document)
+
+
+async def get_job(job_id: str) -> Optional[RecommendationJob]:
+    document = await get_jobs_collection().find_one({"_id": job_id})
+    return to_job_view(document) if document else None
+
+
+class RecommendationJobWorker:
+    """
+    Pool of asyncio workers that claim and run queued jobs.
+
+    Claims are atomic, so any number of pools (in the API process or in
+    `python -m src.jobs` processes) can share one collection.
+    """
+
+    def __init__(self, concurrency: int = JOB_WORKER_CONCURRENCY, poll_interval: float = JOB_POLL_INTERVAL):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.stats = {"claimed": 0, "succeeded": 0, "failed": 0, "released": 0, "lease_lost": 0}
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(slot), name=f"recommendation-job-worker-{slot}")
+            for slot in range(self.concurrency)
+        ]
+        logger.info(f"Recommendation job worker {self.worker_id} started with {self.concurrency} slots")
+
+    async def stop(self) -> None:
+        """
+        Cancel the workers; jobs they were running go back to the queue.
+        """
+        if not self._tasks:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info(f"Recommendation job worker {self.worker_id} stopped: {self.stats}")
+
+    async def _run(self, slot: int) -> None:
+        while True:
+            try:
+                job = await self.claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job claim failed: {str(e)}")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            # Log lines of the run carry the job id
+            token = bind_log_context(new_log_context(job["_id"]))
+            try:
+                await self._execute(job)
+            finally:
+                reset_log_context(token)
+
+    async def claim(self) -> Optional[dict]:
+        """
+        Atomically take the oldest queued job, or a running one whose lease has lapsed.
+        """
+        await aensure_job_indexes()
+        now = _now()
+        collection = get_jobs_collection()
+        await self._fail_exhausted(now)
+        job = await collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": JOB_QUEUED},
+                    {"status": JOB_RUNNING, "lease_expires_at": {"$lt": now}},
+                ],
+                "attempts": {"$lt": JOB_MAX_ATTEMPTS},
+            },
+            {
+                "$set": {
+                    "status": JOB_RUNNING,
+                    "worker_id": self.worker_id,
+                    "started_at": now,
+                    "updated_at": now,
+                    "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is not None:
+            self.stats["claimed"] += 1
+            logger.info(f"Worker {self.worker_id} claimed job {job['_id']} (attempt {job['attempts']})")
+        return job
+
+    async def _fail_exhausted(self, now: datetime) -> None:
+        # Jobs whose workers kept dying are failed rather than retried forever
+        await get_jobs_collection().update_many(
+            {"status": JOB_RUNNING, "lease_expires_at": {"$lt": now}, "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+            {"$set": {
+                "status": JOB_FAILED,
+                "error": f"Worker lost after {JOB_MAX_ATTEMPTS} attempts",
+                "finished_at": now,
+                "updated_at": now,
+                "expires_at": now + timedelta(seconds=JOB_RESULT_TTL_SECONDS),
+            }},
+        )
+
+    async def _update_owned(self, job_id: str, update: dict) -> bool:
+        # Only the worker holding the lease may write to the job
+        result = await get_jobs_collection().update_one(
+            {"_id": job_id, "worker_id": self.worker_id, "status": JOB_RUNNING}, update
+        )
+        if not result.matched_count:
+            logger.warning(f"Job {job_id} is no longer leased by worker {self.worker_id}")
+        return bool(result.matched_count)
+
+    async def _heartbeat(self, job_id: str, telemetry: RequestTelemetry, run: asyncio.Task) -> None:
+        """
+        Renew the lease and publish progress (LLM calls, tool spans, tokens so far).
+
+        Failed renewals are retried on the next tick. Once the lease is lost,
+        because another worker took the job or the lease lapsed while renewals
+        kept failing, the run is cancelled so the job never runs twice.
+        """
+        lease_expires_at = _now() + timedelta(seconds=JOB_LEASE_SECONDS)
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 4)
+            now = _now()
+            try:
+                owned = await self._update_owned(job_id, {"$set": {
+                    "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    "progress": telemetry.summary(),
+                    "updated_at": now,
+                }})
+            except Exception as e:
+                logger.warning(f"Job {job_id} lease renewal failed: {str(e)}")
+                owned = _now() < lease_expires_at
+            else:
+                if owned:
+                    lease_expires_at = now + timedelta(seconds=JOB_LEASE_SECONDS)
+            if not owned:
+                logger.error(f"Worker {self.worker_id} lost the lease on job {job_id}, stopping its run")
+                run.cancel()
+                return
+
+    async def _execute(self, job: dict) -> None:
+        job_id = job["_id"]
+        requirements = AgentConfig(**job["request"])
+        with track_request("job") as telemetry:
+            # The run is its own task so a lost lease can cancel it without stopping this worker
+            run = asyncio.create_task(
+                recommend(requirements, job.get("bypass_cache", False), wait_for_slot=True)
+            )
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, telemetry, run))
+            try:
+                response, served_by = await run
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    # Shutting down: hand the job back instead of waiting for the lease to lapse
+                    await asyncio.shield(self._release(job_id))
+                    raise
+                # Cancelled by the heartbeat: the job now belongs to another worker
+                telemetry.outcome = "lease_lost"
+                self.stats["lease_lost"] += 1
+                return
+            except AgentRunFailed as e:
+                telemetry.outcome = "error"
+                await self._finish(job_id, telemetry, error=f"Agent run failed: {str(e)}")
+                return
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+                telemetry.outcome = "error"
+                await self._finish(job_id, telemetry, error=str(e))
+                return
+            finally:
+                heartbeat.cancel()
+            if not response.suppliers:
+                # The agent finished without calling finalize_supplier_search
+                telemetry.outcome = "error"
+                await self._finish(job_id, telemetry, error="No suppliers found")
+            else:
+                await self._finish(job_id, telemetry, result=response.model_dump(), served_by=served_by)
+        logger.info(f"Job {job_id} timing summary: {telemetry.summary()}")
+
+    async def _finish(
+        self,
+        job_id: str,
+        telemetry: RequestTelemetry,
+        result: Optional[dict] = None,
+        served_by: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        now = _now()
+        update = {
+            "status": JOB_FAILED if error else JOB_SUCCEEDED,
+            "progress": telemetry.summary(),
+            "finished_at": now,
+            "updated_at": now,
+            "expires_at": now + timedelta(seconds=JOB_RESULT_TTL_SECONDS),
+        }
+        if error:
+            update["error"] = error
+        else:
+            update["result"] = result
+            update["served_by"] = served_by
+        if await self._update_owned(job_id, {"$set": update, "$unset": {"lease_expires_at": ""}}):
+            self.stats["failed" if error else "succeeded"] += 1
+
+    async def _release(self, job_id: str) -> None:
+        try:
+            if await self._update_owned(job_id, {
+                "$set": {"status": JOB_QUEUED, "updated_at": _now()},
+                "$unset": {"lease_expires_at": "", "worker_id": ""},
+                # The interrupted run does not count against the job's attempts
+                "$inc": {"attempts": -1},
+            }):
+                self.stats["released"] += 1
+        except Exception as e:
+            logger.error(f"Could not release job {job_id}: {str(e)}")
+
+    def snapshot(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "running": self.running,
+            "slots": len(self._tasks),
+            **self.stats,
+        }
+
+
+@lru_cache
+def get_job_worker() -> RecommendationJobWorker:
+    return RecommendationJobWorker()
+
+
+async def run_worker() -> None:
+    """
+    Standalone worker process: the startup work of the API lifespan, then the job pool until SIGTERM.
+    """
+    configure_logging()
+    get_supply_chain_agent()
+    await aensure_supplier_indexes()
+    await aensure_job_indexes()
+    await asyncio.to_thread(load_retrieval_index)
+    get_retrieval_index_refresher().start()
+    if WRITE_BEHIND_ENABLED:
+        get_write_behind_queue().start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    worker = get_job_worker()
+    worker.start()
+    await stop.wait()
+    logger.info("Stopping recommendation job worker")
+    await worker.stop()
+    await get_retrieval_index_refresher().stop()
+    await get_write_behind_queue().stop()
+    await flush_logs()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -0,0 +1,192 @@
+"""
+Logging setup for the API and job workers.
+
+`configure_logging()` replaces loguru's default synchronous DEBUG sink with a
+single sink at LOG_LEVEL that is written from a background thread
+(LOG_ENQUEUE), optionally as one JSON object per line (LOG_JSON). Every record
+carries the id of the request it belongs to. A LOG_DEBUG_SAMPLE_RATE fraction
+of requests also keeps its DEBUG records, so verbose traces are available
+without paying for them on every request. The choice is made from the request
+id, so a request traced here is also traced by services it propagates to.
+
+Debug calls on hot paths use loguru's lazy formatting, e.g.
+`logger.opt(lazy=True).debug("Raw output: {}", lambda: raw_output)`, and loops
+that only log are guarded with `debug_enabled()`. When no sink accepts DEBUG,
+loguru drops those calls before building a record.
+"""
+import json
+import sys
+import traceback
+import uuid
+import zlib
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from .utils import get_logger
+from .config import (
+    LOG_LEVEL,
+    LOG_JSON,
+    LOG_ENQUEUE,
+    LOG_DEBUG_SAMPLE_RATE,
+    REQUEST_ID_HEADER,
+)
+
+logger = get_logger()
+
+_TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "<magenta>{extra[request_id]}</magenta> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>\n{exception}"
+)
+
+
+@dataclass
+class LogContext:
+    """
+    Correlation id and trace sampling decision for one request or job.
+    """
+
+    request_id: str
+    debug: bool = False
+
+
+_current_log_context: ContextVar[Optional[LogContext]] = ContextVar("log_context", default=None)
+_configured = False
+_min_level_no = 0
+
+
+def _sampled_for_debug(request_id: str) -> bool:
+    # Same id, same decision: a hash of the id stands in for a random draw
+    return zlib.crc32(request_id.encode("utf-8")) / 2**32 < LOG_DEBUG_SAMPLE_RATE
+
+
+def new_log_context(request_id: Optional[str] = None) -> LogContext:
+    request_id = request_id or uuid.uuid4().hex[:16]
+    return LogContext(request_id=request_id, debug=_sampled_for_debug(request_id))
+
+
+def bind_log_context(context: LogContext):
+    """
+    Attach `context` to the current task and the tasks it starts; returns the reset token.
+    """
+    return _current_log_context.set(context)
+
+
+def reset_log_context(token) -> None:
+    _current_log_context.reset(token)
+
+
+def current_request_id() -> Optional[str]:
+    context = _current_log_context.get()
+    return context.request_id if context else None
+
+
+def debug_enabled() -> bool:
+    """
+    Whether a DEBUG record from the current request would be written.
+    """
+    if LOG_LEVEL == "DEBUG":
+        return True
+    context = _current_log_context.get()
+    return bool(context and context.debug)
+
+
+def _add_request_id(record) -> None:
+    context = _current_log_context.get()
+    record["extra"].setdefault("request_id", context.request_id if context else "-")
+
+
+def _keep_record(record) -> bool:
+    # Records below LOG_LEVEL only pass for requests sampled for a verbose trace
+    if record["level"].no >= _min_level_no:
+        return True
+    context = _current_log_context.get()
+    return bool(context and context.debug)
+
+
+def _json_format(record) -> str:
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "request_id": record["extra"]["request_id"],
+        "logger": f"{record['name']}:{record['function']}:{record['line']}",
+    }
+    if record["exception"] is not None:
+        # Keep the traceback inside the JSON line instead of after it
+        entry["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["_json"] = json.dumps(entry, default=str)
+    return "{extra[_json]}\n"
+
+
+def configure_logging() -> None:
+    """
+    Install the configured sink; safe to call more than once.
+    """
+    global _configured, _min_level_no
+    if _configured:
+        return
+    _min_level_no = logger.level(LOG_LEVEL).no
+    # The sink only sees DEBUG records when some requests are sampled for them
+    sink_level = "DEBUG" if LOG_DEBUG_SAMPLE_RATE > 0 else LOG_LEVEL
+    logger.remove()
+    logger.configure(patcher=_add_request_id)
+    logger.add(
+        sys.stderr,
+        level=sink_level,
+        format=_json_format if LOG_JSON else _TEXT_FORMAT,
+        filter=_keep_record,
+        enqueue=LOG_ENQUEUE,
+        backtrace=False,
+        diagnose=False,
+    )
+    _configured = True
+    logger.info(
+        f"Logging at {LOG_LEVEL} ({'json' if LOG_JSON else 'text'}, enqueue={LOG_ENQUEUE}, "
+        f"debug sample rate {LOG_DEBUG_SAMPLE_RATE:g})"
+    )
+
+
+async def flush_logs() -> None:
+    # Wait for enqueued records to be written before the process exits
+    await logger.complete()
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware that gives each HTTP request a log context.
+
+    A caller-supplied REQUEST_ID_HEADER is reused so logs correlate across
+    services; the id is echoed on the response either way. The context stays
+    bound while a streaming body is produced.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header_name = REQUEST_ID_HEADER.lower().encode()
+        incoming = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == header_name), None
+        )
+        # Untrusted ids are kept short and printable
+        if incoming and not (incoming.isprintable() and len(incoming) <= 64):
+            incoming = None
+        context = new_log_context(incoming)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((header_name, context.request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = bind_log_context(context)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            reset_log_context(token)
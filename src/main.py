@@ -1,22 +1,104 @@
-from fastapi import FastAPI
-from .models import AgentConfig, SupplierExplorationAgentResponse
 import asyncio
-from .agents import supply_chain_agent
-from .utils import get_logger, save_suppliers_to_mongodb
-from langchain_core.messages import HumanMessage
-from langchain_core.runnables import RunnableConfig
-from .config import AGENT_RECURSION_LIMIT
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from typing import Optional
+from .models import (
+    AgentConfig,
+    BatchRecommendationRequest,
+    RecommendationJob,
+    SupplierExplorationAgentResponse,
+)
+from .cache import (
+    get_recommendation_cache,
+    get_tavily_search_cache,
+    get_tavily_extract_cache,
+    is_cache_bypass,
+)
+from .utils import get_logger, abackfill_normalized_fields
+from .agents import get_supply_chain_agent
+from .indexes import aensure_supplier_indexes, explain_common_queries
+from .persistence import get_write_behind_queue
+from .retrieval import load_retrieval_index, get_retrieval_index_refresher
+from .runner import AgentRunFailed, recommend
+from .history import get_history_summary_cache
+from .batch import stream_batch_recommendations
+from .jobs import submit_job, get_job, get_job_worker, aensure_job_indexes
+from .admission import AdmissionRejected, get_admission_controller
+from .logs import configure_logging, flush_logs, RequestIdMiddleware
+from .telemetry import track_request, render_metrics, register_collector, RECOMMENDATIONS_SERVED
+from .streaming import stream_supply_chain_agent, SSE_HEADERS
+from .config import (
+    CACHE_BYPASS_HEADER,
+    SERVED_BY_HEADER,
+    INDEX_EXPLAIN_ON_STARTUP,
+    WRITE_BEHIND_ENABLED,
+    JOB_WORKERS_IN_API,
+    REQUEST_ID_HEADER,
+)
 from fastapi.middleware.cors import CORSMiddleware
 
+configure_logging()
 logger = get_logger()
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile the agent graph once so requests only pay for execution
+    logger.info("Compiling supply chain agent at startup")
+    get_supply_chain_agent()
+    # Create supplier indexes once; the request path only checks a flag afterwards
+    await aensure_supplier_indexes()
+    # Parse numeric price/lead time/MOQ on documents saved before normalization existed
+    try:
+        await abackfill_normalized_fields()
+    except Exception as e:
+        logger.error(f"Normalized field backfill failed: {str(e)}")
+    if INDEX_EXPLAIN_ON_STARTUP:
+        await asyncio.to_thread(explain_common_queries)
+    # Local BM25 index over known suppliers; query_mongodb consults it before MongoDB
+    await asyncio.to_thread(load_retrieval_index)
+    # Picks up suppliers saved by job workers and other replicas
+    get_retrieval_index_refresher().start()
+    # Supplier saves are flushed in the background, off the request path
+    if WRITE_BEHIND_ENABLED:
+        get_write_behind_queue().start()
+    try:
+        await aensure_job_indexes()
+    except Exception as e:
+        # Retried lazily when a job is submitted or claimed
+        logger.error(f"Job index bootstrap failed: {str(e)}")
+    # Job workers can instead run as separate processes (`python -m src.jobs`)
+    if JOB_WORKERS_IN_API:
+        get_job_worker().start()
+    yield
+    # Running jobs are handed back to the queue before supplier writes are drained
+    await get_job_worker().stop()
+    await get_retrieval_index_refresher().stop()
+    await get_write_behind_queue().stop()
+    await flush_logs()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER, SERVED_BY_HEADER],
 )
+# Outermost, so every log line of a request (including CORS preflights) carries its id
+app.add_middleware(RequestIdMiddleware)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.reason, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.get("/")
@@ -29,96 +111,146 @@ async def root():
     "/api/v1/supply-chain/recommendations",
     response_model=SupplierExplorationAgentResponse,
 )
-async def get_recommendations(requirements: AgentConfig):
-    logger.info("=== NEW RECOMMENDATION REQUEST ===")
+async def get_recommendations(
+    requirements: AgentConfig,
+    response: Response,
+    cache_bypass: Optional[str] = Header(default=None, alias=CACHE_BYPASS_HEADER),
+):
+    with track_request("recommendations") as telemetry:
+        try:
+            result, served_by = await recommend(requirements, is_cache_bypass(cache_bypass))
+        except AdmissionRejected:
+            telemetry.outcome = "rejected"
+            raise
+        except AgentRunFailed:
+            # Already logged by the runner; the endpoint answers with no suppliers, as before
+            telemetry.outcome = "error"
+            result, served_by = SupplierExplorationAgentResponse(suppliers=[]), "agent"
+    logger.info(f"Request timing summary: {telemetry.summary()}")
+    RECOMMENDATIONS_SERVED.inc(endpoint="recommendations", path=served_by)
+    response.headers[SERVED_BY_HEADER] = served_by
+    return result
+
+
+@app.post("/api/v1/supply-chain/recommendations/stream")
+async def stream_recommendations(
+    requirements: AgentConfig,
+    cache_bypass: Optional[str] = Header(default=None, alias=CACHE_BYPASS_HEADER),
+):
+    """
+    Stream the agent's progress and suppliers as server-sent events.
+
+    Unlike /recommendations, a stream runs the agent on every result cache miss. It
+    skips the database fast path, and identical concurrent streams are not coalesced,
+    so each one takes its own admission slot: the stream exists to report the agent's
+    own turns and tool calls, which a joined run could not replay.
+    """
+    logger.info("=== NEW STREAMING RECOMMENDATION REQUEST ===")
     logger.info(
-        f"Received recommendation request for query: {requirements.query[:100]}..."
+        f"Received streaming recommendation request for query: {requirements.query[:100]}..."
     )
-    logger.debug(f"Full query: {requirements.query}")
-    logger.debug(
-        f"Chat history length: {len(requirements.chat_history) if requirements.chat_history else 0}"
+    # Turn the request away before the stream starts if the wait queue is already full
+    get_admission_controller().check_capacity()
+    return StreamingResponse(
+        stream_supply_chain_agent(requirements, bypass_cache=is_cache_bypass(cache_bypass)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
     )
 
-    # Build input payload with proper message structure and state tracking
-    input_payload = {
-        "query": requirements.query,
-        "chat_history": requirements.chat_history,
-        "messages": [HumanMessage(content=requirements.query)],
+
+@app.post("/api/v1/supply-chain/recommendations/batch")
+async def batch_recommendations(
+    batch: BatchRecommendationRequest,
+    cache_bypass: Optional[str] = Header(default=None, alias=CACHE_BYPASS_HEADER),
+):
+    bypass_cache = is_cache_bypass(cache_bypass)
+
+    async def run_item(requirements: AgentConfig) -> tuple[SupplierExplorationAgentResponse, str]:
+        # Items queue for agent slots instead of being rejected; the batch bounds its own concurrency
+        return await recommend(requirements, bypass_cache, wait_for_slot=True)
+
+    return StreamingResponse(
+        stream_batch_recommendations(batch, run_item),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@app.post(
+    "/api/v1/supply-chain/jobs",
+    response_model=RecommendationJob,
+    status_code=202,
+)
+async def create_recommendation_job(
+    requirements: AgentConfig,
+    response: Response,
+    cache_bypass: Optional[str] = Header(default=None, alias=CACHE_BYPASS_HEADER),
+):
+    logger.info(f"Received recommendation job for query: {requirements.query[:100]}...")
+    job = await submit_job(requirements, bypass_cache=is_cache_bypass(cache_bypass))
+    response.headers["Location"] = f"/api/v1/supply-chain/jobs/{job.job_id}"
+    return job
+
+
+@app.get("/api/v1/supply-chain/jobs/{job_id}", response_model=RecommendationJob)
+async def get_recommendation_job(job_id: str):
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@app.get("/api/v1/cache/stats")
+async def get_cache_stats():
+    return {
+        "recommendations": get_recommendation_cache().snapshot(),
+        "tavily_search": get_tavily_search_cache().snapshot(),
+        "tavily_extract": get_tavily_extract_cache().snapshot(),
+        "history_summaries": get_history_summary_cache().snapshot(),
     }
-    logger.info("Built input payload for agent")
-    logger.debug(f"Payload keys: {list(input_payload.keys())}")
-    logger.debug(f"Messages count: {len(input_payload['messages'])}")
 
-    try:
-        logger.info("--- CREATING SUPPLY CHAIN AGENT ---")
-        # Create and invoke the supply chain agent with chat history
-        agent = supply_chain_agent(chat_history=requirements.chat_history)
-        logger.info("Supply chain agent created successfully")
-
-        # Configure agent with recursion limit
-        agent = agent.with_config(recursion_limit=AGENT_RECURSION_LIMIT)
-        logger.info(f"Agent configured with recursion limit: {AGENT_RECURSION_LIMIT}")
-
-        # Invoke the agent with configuration
-        logger.info("--- INVOKING SUPPLY CHAIN AGENT ---")
-        logger.info(
-            f"Starting supply chain agent invocation with recursion limit: {AGENT_RECURSION_LIMIT}"
-        )
-
-        # Create runnable config for additional control
-        config = RunnableConfig(recursion_limit=AGENT_RECURSION_LIMIT)
-        raw_output = await asyncio.to_thread(agent.invoke, input_payload, config=config)
-        logger.info("Agent invocation completed")
-        logger.debug(
-            f"Raw output keys: {list(raw_output.keys()) if isinstance(raw_output, dict) else 'Not a dict'}"
-        )
-        logger.debug(f"Raw output type: {type(raw_output)}")
-
-        logger.info("--- PROCESSING AGENT RESPONSE ---")
-        # Check if we have a structured response
-        if isinstance(raw_output, dict) and "structured_response" in raw_output:
-            logger.debug("Found structured_response in raw output")
-            structured_response = raw_output["structured_response"]
-            if (
-                hasattr(structured_response, "suppliers")
-                and structured_response.suppliers
-            ):
-                logger.info(
-                    f"Found response with {len(structured_response.suppliers)} suppliers"
-                )
-                logger.debug("Saving suppliers to MongoDB...")
-                # Save suppliers to MongoDB after getting response
-                save_result = save_suppliers_to_mongodb(structured_response.suppliers)
-                logger.info(f"MongoDB save result: {save_result}")
-                logger.info("=== REQUEST COMPLETED SUCCESSFULLY ===")
-                return structured_response
-            elif (
-                isinstance(structured_response, dict)
-                and "suppliers" in structured_response
-            ):
-                supplier_count = len(structured_response.get("suppliers", []))
-                logger.info(f"Found dict response with {supplier_count} suppliers")
-                logger.debug("Saving suppliers to MongoDB...")
-                # Save suppliers to MongoDB after getting response
-                save_result = save_suppliers_to_mongodb(
-                    structured_response["suppliers"]
-                )
-                logger.info(f"MongoDB save result: {save_result}")
-                logger.info("=== REQUEST COMPLETED SUCCESSFULLY ===")
-                return SupplierExplorationAgentResponse(
-                    suppliers=structured_response["suppliers"]
-                )
-
-        # Return empty response if no results found
-        logger.warning("No supplier results found in agent response")
-        logger.debug(f"Raw output structure: {raw_output}")
-        logger.warning("=== REQUEST COMPLETED WITH NO RESULTS ===")
-        return SupplierExplorationAgentResponse(suppliers=[])
 
-    except Exception as e:
-        logger.error(
-            "Error processing recommendation request: {}", str(e), exc_info=True
-        )
-        logger.error("Error type: {}", type(e).__name__)
-        logger.error("=== REQUEST FAILED ===")
-        return SupplierExplorationAgentResponse(suppliers=[])
+@app.get("/api/v1/persistence/stats")
+async def get_persistence_stats():
+    return get_write_behind_queue().snapshot()
+
+
+@app.get("/api/v1/admission/stats")
+async def get_admission_stats():
+    return get_admission_controller().snapshot()
+
+
+@app.get("/api/v1/jobs/stats")
+async def get_job_stats():
+    return get_job_worker().snapshot()
+
+
+def _cache_metric_samples() -> list[tuple]:
+    samples = []
+    for cache in (get_recommendation_cache(), get_tavily_search_cache(), get_tavily_extract_cache()):
+        stats = cache.snapshot()
+        for event in ("hits", "store_hits", "misses", "coalesced", "computed"):
+            samples.append((
+                "supply_chain_cache_events_total",
+                "counter",
+                "Cache lookups by outcome.",
+                {"cache": cache.name, "event": event},
+                stats[event],
+            ))
+    queue = get_write_behind_queue().snapshot()
+    samples.append((
+        "supply_chain_write_behind_pending",
+        "gauge",
+        "Supplier batches waiting in the write-behind queue.",
+        {},
+        queue["pending"],
+    ))
+    return samples
+
+
+register_collector(_cache_metric_samples)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
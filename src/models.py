@@ -1,11 +1,22 @@
-from typing import List, Union, Optional
+from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel, Field, field_validator
 from typing import Dict, Any, TypedDict
 from langchain_core.messages import BaseMessage
 from typing_extensions import Annotated
 from langgraph.graph.message import add_messages
+from langgraph.prebuilt.chat_agent_executor import AgentStateWithStructuredResponse
 from .utils import get_logger
-from .config import MAX_QUERY_LENGTH, MAX_EXTRACT_URLS, DEFAULT_REMAINING_STEPS
+from .config import (
+    MAX_QUERY_LENGTH,
+    MAX_EXTRACT_URLS,
+    DEFAULT_REMAINING_STEPS,
+    MONGO_QUERY_DEFAULT_LIMIT,
+    MONGO_QUERY_MAX_LIMIT,
+    BATCH_MAX_ITEMS,
+    BATCH_MAX_CONCURRENCY,
+    WEB_SEARCH_MANY_MAX_QUERIES,
+)
 
 logger = get_logger()
 
@@ -48,6 +59,13 @@ class GraphState(TypedDict):
     messages: Optional[list[Dict[str, Any]]]
 
 
+class SupplyChainGraphState(AgentStateWithStructuredResponse):
+    """Graph state for the compiled supply chain agent; carries per-request context."""
+
+    query: str
+    chat_history: Optional[List[Dict[str, Any]]]
+
+
 class SupplierSearchIndexQuery(BaseModel):
     price_range: Optional[str] = Field(
         default=None, description="Price range of the products"
@@ -60,10 +78,48 @@ class SupplierSearchIndexQuery(BaseModel):
         default=None, description="List of certifications"
     )
     lead_time: Optional[str] = Field(default=None, description="Lead time for delivery")
+    # Numeric limits, matched against fields parsed from price_range/lead_time/moq
+    max_price_usd: Optional[float] = Field(
+        default=None,
+        description="Budget per unit in USD; matches suppliers whose lowest price is at or below it",
+    )
+    max_lead_time_days: Optional[float] = Field(
+        default=None,
+        description="Longest acceptable lead time in days (e.g. 21 for 3 weeks)",
+    )
+    max_moq_units: Optional[int] = Field(
+        default=None,
+        description="Largest acceptable minimum order quantity in units",
+    )
     # Add a general query field for free-text search
     query: Optional[str] = Field(default=None, description="General search query")
+    limit: Optional[int] = Field(
+        default=None,
+        description=f"Maximum number of suppliers to return (default {MONGO_QUERY_DEFAULT_LIMIT}, max {MONGO_QUERY_MAX_LIMIT})",
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="The next_cursor value from a previous query_mongodb result, to fetch the next page",
+    )
+
+    def page_size(self) -> int:
+        if not self.limit or self.limit < 1:
+            return MONGO_QUERY_DEFAULT_LIMIT
+        return min(self.limit, MONGO_QUERY_MAX_LIMIT)
+
+    def build_projection(self) -> dict[str, Any]:
+        # Only Supplier fields reach the LLM; `_id` is kept for paging and stripped later
+        projection: dict[str, Any] = {field: 1 for field in Supplier.model_fields}
+        if self.query:
+            projection["score"] = {"$meta": "textScore"}
+        return projection
+
+    def build_sort(self) -> list[tuple[str, Any]]:
+        if self.query:
+            return [("score", {"$meta": "textScore"}), ("_id", 1)]
+        return [("_id", 1)]
 
-    def build_filter(self) -> dict[str, Union[str, List[str]]]:
+    def build_filter(self) -> dict[str, Any]:
         logger.debug("Building MongoDB filter from search query")
         filter = {}
         if self.price_range:
@@ -80,12 +136,19 @@ class SupplierSearchIndexQuery(BaseModel):
             }  # Changed from $all to $in for more flexible matching
         if self.lead_time:
             filter["lead_time"] = self.lead_time
+        if self.max_price_usd is not None:
+            filter["price_min_usd"] = {"$lte": self.max_price_usd}
+        if self.max_lead_time_days is not None:
+            # The whole quoted range has to fit, so compare the upper bound
+            filter["lead_time_max_days"] = {"$lte": self.max_lead_time_days}
+        if self.max_moq_units is not None:
+            filter["moq_units"] = {"$lte": self.max_moq_units}
 
         # If we have a general query, add text search
         if self.query:
             filter["$text"] = {"$search": self.query}
 
-        logger.debug(f"Built filter: {filter}")
+        logger.debug("Built filter: {}", filter)
         return filter
 
 
@@ -105,10 +168,23 @@ class AgentConfig(BaseModel):
         if len(v.strip()) == 0:
             logger.error("Empty query provided")
             raise ValueError("Query cannot be empty")
-        logger.debug(f"Validated query: {v[:50]}...")
+        logger.debug("Validated query: {}...", v[:50])
         return v
 
 
+class BatchRecommendationRequest(BaseModel):
+    items: List[AgentConfig] = Field(
+        description="Recommendation requests to run together.",
+        min_length=1,
+        max_length=BATCH_MAX_ITEMS,
+    )
+    concurrency: Optional[int] = Field(
+        default=None,
+        description=f"Items processed at once (default from BATCH_DEFAULT_CONCURRENCY, max {BATCH_MAX_CONCURRENCY})",
+        ge=1,
+    )
+
+
 class SupplierExplorationAgentResponse(BaseModel):
     suppliers: List[Supplier] = Field(
         description="List of suppliers matching the search criteria."
@@ -120,6 +196,23 @@ class SupplierExplorationAgentResponse(BaseModel):
         return v
 
 
+class RecommendationJob(BaseModel):
+    job_id: str = Field(description="Id to poll the job with")
+    status: str = Field(description="queued, running, succeeded or failed")
+    query: str = Field(description="The query the job is searching for")
+    created_at: datetime
+    updated_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    attempts: int = Field(default=0, description="Times a worker has picked the job up")
+    progress: Optional[Dict[str, Any]] = Field(
+        default=None, description="Timing summary so far: LLM calls, tokens and time per tool"
+    )
+    served_by: Optional[str] = Field(default=None, description="cache, coalesced, database or agent")
+    result: Optional[SupplierExplorationAgentResponse] = None
+    error: Optional[str] = None
+
+
 class WebSearchQuery(BaseModel):
     query: str = Field(
         description="The query string to search for suppliers.",
@@ -128,6 +221,33 @@ class WebSearchQuery(BaseModel):
     )
 
 
+class WebSearchManyQuery(BaseModel):
+    queries: List[str] = Field(
+        description=(
+            f"2-{WEB_SEARCH_MANY_MAX_QUERIES} distinct search queries to run in parallel, "
+            "e.g. keyword variants, synonyms, regions or B2B directories for the same need."
+        ),
+        min_length=1,
+        max_length=WEB_SEARCH_MANY_MAX_QUERIES,
+    )
+
+    @field_validator("queries")
+    def validate_queries(cls, v):
+        # Blank and repeated queries would only cost Tavily calls
+        queries, seen = [], set()
+        for query in v:
+            query = query.strip()
+            if not query or query.lower() in seen:
+                continue
+            if len(query) > MAX_QUERY_LENGTH:
+                raise ValueError(f"Query longer than {MAX_QUERY_LENGTH} characters: {query[:50]}...")
+            seen.add(query.lower())
+            queries.append(query)
+        if not queries:
+            raise ValueError("At least one non-empty query is required")
+        return queries
+
+
 class WebExtractQuery(BaseModel):
     urls: List[str] = Field(
         description="List of URLs to extract supplier information from."
@@ -148,6 +268,12 @@ class SupplierDataValidationQuery(BaseModel):
     )
 
 
+class SupplierBatchValidationQuery(BaseModel):
+    suppliers: List[dict] = Field(
+        description="All candidate suppliers to validate in one call, each a dictionary of supplier information."
+    )
+
+
 class SupplyChainAgentState(BaseModel):
     """Custom state schema for the supply chain agent."""
 
@@ -0,0 +1,170 @@
+"""
+Parsers that turn the free-form supplier strings into numeric fields.
+
+`price_range` ("$10-20 USD"), `lead_time` ("2-4 weeks") and `moq` ("1,000 units")
+are kept as written for display, and the parsed values are stored next to
+them so `SupplierSearchIndexQuery` can compile budget, lead-time and MOQ limits
+into indexed range filters. Values that cannot be parsed are left out rather
+than guessed.
+"""
+import re
+from typing import Optional
+
+# Bump when parsing changes so the startup backfill re-normalizes existing documents
+NORMALIZATION_VERSION = 3
+
+# Source string field -> numeric fields parsed from it
+NORMALIZED_FIELDS = {
+    "price_range": ("price_min_usd", "price_max_usd"),
+    "lead_time": ("lead_time_min_days", "lead_time_max_days"),
+    "moq": ("moq_units",),
+}
+
+# A k/m multiplier only counts when it is not the start of a word ("5k units", not "2 months")
+_NUMBER = r"(\d+(?:,\d{3})*(?:\.\d+)?)\s*(?:([km])(?![a-z]))?"
+_NUMBER_PATTERN = re.compile(_NUMBER, re.IGNORECASE)
+_RANGE_PATTERN = re.compile(
+    rf"\$?\s*{_NUMBER}\s*(?:-|–|—|to)\s*\$?\s*{_NUMBER}", re.IGNORECASE
+)
+_UPPER_BOUND_PATTERN = re.compile(r"\b(?:under|below|less than|up to|max(?:imum)?|within)\b|<=?|≤", re.IGNORECASE)
+_LOWER_BOUND_PATTERN = re.compile(r"\b(?:from|over|above|more than|min(?:imum)?|starting)\b|>=?|≥|\+", re.IGNORECASE)
+_NON_USD_PATTERN = re.compile(
+    r"€|£|¥|₹|₩|₽|\b(?:c|ca|a|au|hk|nz|s|sg|nt|mx)\$"
+    r"|\b(?:eur|gbp|cny|rmb|jpy|inr|cad|aud|hkd|sgd|nzd|twd|krw|chf|mxn|brl)\b",
+    re.IGNORECASE,
+)
+_NO_MOQ_PATTERN = re.compile(r"\b(?:no|none|n/a)\b", re.IGNORECASE)
+
+_MULTIPLIERS = {"k": 1_000, "m": 1_000_000}
+_DAYS_PER_UNIT = [
+    (re.compile(r"\b(?:business|working)\s+days?\b", re.IGNORECASE), 7 / 5),
+    (re.compile(r"\bdays?\b", re.IGNORECASE), 1),
+    (re.compile(r"\b(?:weeks?|wks?)\b", re.IGNORECASE), 7),
+    (re.compile(r"\bmonths?\b", re.IGNORECASE), 30),
+    (re.compile(r"\b(?:hours?|hrs?)\b", re.IGNORECASE), 1 / 24),
+]
+_TIME_UNIT = r"((?:business|working)\s+days?|days?|weeks?|wks?|months?|hours?|hrs?)\b"
+# A range whose endpoints may carry their own unit: "2 weeks - 1 month"
+_LEAD_TIME_RANGE_PATTERN = re.compile(
+    rf"{_NUMBER}\s*(?:{_TIME_UNIT})?\s*(?:-|–|—|to)\s*{_NUMBER}\s*(?:{_TIME_UNIT})?", re.IGNORECASE
+)
+
+
+def _to_number(value: str, suffix: Optional[str]) -> float:
+    number = float(value.replace(",", ""))
+    return number * _MULTIPLIERS.get((suffix or "").lower(), 1)
+
+
+def _parse_bounds(text: str) -> tuple[Optional[float], Optional[float]]:
+    """
+    Extract (min, max) from "10-20", "10 to 20", "under 15" or "15+".
+    A single number without a qualifier is both bounds.
+    """
+    match = _RANGE_PATTERN.search(text)
+    if match:
+        low_suffix = match.group(2)
+        # "10-20k" shares the suffix, "500-1.2k" does not
+        if low_suffix is None and float(match.group(1).replace(",", "")) < float(match.group(3).replace(",", "")):
+            low_suffix = match.group(4)
+        low = _to_number(match.group(1), low_suffix)
+        high = _to_number(match.group(3), match.group(4))
+        return min(low, high), max(low, high)
+
+    match = _NUMBER_PATTERN.search(text)
+    if not match:
+        return None, None
+    value = _to_number(match.group(1), match.group(2))
+    prefix = text[: match.start()]
+    if _UPPER_BOUND_PATTERN.search(prefix):
+        return None, value
+    if _LOWER_BOUND_PATTERN.search(prefix) or text[match.end():].lstrip().startswith("+"):
+        return value, None
+    return value, value
+
+
+def parse_price_range(text: Optional[str]) -> tuple[Optional[float], Optional[float]]:
+    """
+    "$10-20 USD" -> (10.0, 20.0); "under $5" -> (0.0, 5.0). Prices in other currencies are not converted.
+    """
+    if not text or _NON_USD_PATTERN.search(text):
+        return None, None
+    low, high = _parse_bounds(text)
+    # An upper bound alone still starts at zero, so max-price filters on price_min_usd keep it
+    if low is None and high is not None:
+        low = 0.0
+    return low, high
+
+
+def _days_per_unit(text: Optional[str]) -> Optional[float]:
+    for pattern, days in _DAYS_PER_UNIT:
+        if text and pattern.search(text):
+            return days
+    return None
+
+
+def parse_lead_time_days(text: Optional[str]) -> tuple[Optional[float], Optional[float]]:
+    """
+    "2-4 weeks" -> (14, 28); "10-15 business days" -> (14, 21); "48 hours" -> (2, 2);
+    "2 weeks - 1 month" -> (14, 30). Each end of a range uses its own unit when it has one.
+    """
+    if not text:
+        return None, None
+    # A bare number is most often days
+    text_days = _days_per_unit(text) or 1
+
+    match = _LEAD_TIME_RANGE_PATTERN.search(text)
+    if match:
+        low_days = _days_per_unit(match.group(3))
+        high_days = _days_per_unit(match.group(6))
+        low = _to_number(match.group(1), match.group(2)) * (low_days or high_days or text_days)
+        high = _to_number(match.group(4), match.group(5)) * (high_days or low_days or text_days)
+        return round(min(low, high), 1), round(max(low, high), 1)
+
+    low, high = _parse_bounds(text)
+    return (
+        round(low * text_days, 1) if low is not None else None,
+        round(high * text_days, 1) if high is not None else None,
+    )
+
+
+def parse_moq_units(text: Optional[str]) -> Optional[int]:
+    """
+    "1,000 pcs" -> 1000; "5k units" -> 5000; "No MOQ" -> 0. Ranges use the lower bound.
+    """
+    if not text:
+        return None
+    low, high = _parse_bounds(text)
+    value = low if low is not None else high
+    if value is None:
+        return 0 if _NO_MOQ_PATTERN.search(text) else None
+    return int(value)
+
+
+def normalized_supplier_fields(supplier: dict) -> dict:
+    """
+    Numeric fields parsed from a supplier's price_range, lead_time and moq.
+    Only successfully parsed values are returned.
+    """
+    price_min, price_max = parse_price_range(supplier.get("price_range"))
+    lead_min, lead_max = parse_lead_time_days(supplier.get("lead_time"))
+    fields = {
+        "price_min_usd": price_min,
+        "price_max_usd": price_max,
+        "lead_time_min_days": lead_min,
+        "lead_time_max_days": lead_max,
+        "moq_units": parse_moq_units(supplier.get("moq")),
+    }
+    return {field: value for field, value in fields.items() if value is not None}
+
+
+def stale_normalized_fields(supplier: dict, parsed: dict) -> list[str]:
+    """
+    Numeric fields to clear because their source string is being written but no longer parses.
+    """
+    return [
+        field
+        for source, fields in NORMALIZED_FIELDS.items()
+        if supplier.get(source) not in (None, "")
+        for field in fields
+        if field not in parsed
+    ]
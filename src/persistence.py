@@ -0,0 +1,179 @@
+import asyncio
+from functools import lru_cache
+from typing import Optional
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+from .utils import (
+    get_logger,
+    get_async_supplier_db_and_collection,
+    build_supplier_upserts,
+    supplier_to_dict,
+    notify_supplier_writes,
+)
+from .telemetry import timed, MONGO_SECONDS
+from .config import (
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_INTERVAL,
+    WRITE_BEHIND_MAX_QUEUE,
+    WRITE_BEHIND_MAX_RETRIES,
+    WRITE_BEHIND_RETRY_BACKOFF,
+    WRITE_BEHIND_DRAIN_TIMEOUT,
+)
+
+logger = get_logger()
+
+_STOP = object()
+
+
+def _is_transient(error: PyMongoError) -> bool:
+    return isinstance(error, ConnectionFailure) or error.has_error_label("RetryableWriteError")
+
+
+class SupplierWriteBehindQueue:
+    """
+    In-process write-behind queue for supplier saves.
+
+    Requests enqueue their suppliers and return immediately; a background
+    flusher batches suppliers from many requests into a single unordered
+    bulk upsert, flushing when the batch is full or the interval elapses.
+    Transient MongoDB errors are retried with exponential backoff, and
+    stop() drains whatever is still queued before shutdown.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        max_queue: int = WRITE_BEHIND_MAX_QUEUE,
+        max_retries: int = WRITE_BEHIND_MAX_RETRIES,
+        retry_backoff: float = WRITE_BEHIND_RETRY_BACKOFF,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.stats = {"enqueued": 0, "flushed": 0, "batches": 0, "retries": 0, "failed": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="supplier-write-behind")
+        logger.info(
+            f"Supplier write-behind queue started (batch={self.batch_size}, interval={self.flush_interval}s)"
+        )
+
+    def enqueue(self, suppliers: list) -> bool:
+        """
+        Queue suppliers for persistence. Returns False when the queue is not
+        running or full, in which case the caller should write directly.
+        """
+        if not self.running or not suppliers:
+            return False
+        try:
+            # Snapshot as plain dicts so later mutation of the response can't leak in
+            self._queue.put_nowait([supplier_to_dict(supplier) for supplier in suppliers])
+        except asyncio.QueueFull:
+            logger.warning("Supplier write-behind queue is full")
+            return False
+        self.stats["enqueued"] += len(suppliers)
+        return True
+
+    async def stop(self, timeout: float = WRITE_BEHIND_DRAIN_TIMEOUT) -> None:
+        """
+        Stop accepting work and flush everything already queued.
+        """
+        if not self.running:
+            return
+        logger.info(f"Draining supplier write-behind queue ({self._queue.qsize()} pending)")
+        task, self._task = self._task, None
+        # The sentinel goes to the back of the queue, behind all pending work
+        await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(task, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                f"Write-behind drain timed out after {timeout}s; {self._queue.qsize()} batches dropped"
+            )
+        logger.info(f"Supplier write-behind queue stopped: {self.snapshot()}")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = list(item)
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.extend(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[dict]) -> None:
+        attempt = 0
+        while True:
+            try:
+                db, collection = get_async_supplier_db_and_collection()
+                operations = build_supplier_upserts(batch)
+                with timed("mongo.write_behind_flush", MONGO_SECONDS, operation="write_behind_flush"):
+                    result = await collection.bulk_write(operations, ordered=False)
+                notify_supplier_writes(batch)
+                self.stats["flushed"] += len(batch)
+                self.stats["batches"] += 1
+                logger.info(
+                    f"Write-behind flushed {len(batch)} suppliers as {len(operations)} upserts "
+                    f"({result.upserted_count} new, {result.modified_count} updated)"
+                )
+                return
+            except BulkWriteError as e:
+                # Per-document errors are not retried; the rest of the batch was written
+                errors = (e.details or {}).get("writeErrors", [])
+                self.stats["flushed"] += len(batch) - len(errors)
+                self.stats["failed"] += len(errors)
+                logger.error(f"Write-behind flush had {len(errors)} document errors: {str(e)}")
+                return
+            except PyMongoError as e:
+                attempt += 1
+                if not _is_transient(e) or attempt > self.max_retries:
+                    self.stats["failed"] += len(batch)
+                    logger.error(
+                        f"Write-behind flush of {len(batch)} suppliers failed after {attempt} attempts: {str(e)}"
+                    )
+                    return
+                self.stats["retries"] += 1
+                delay = self.retry_backoff * (2 ** (attempt - 1))
+                logger.warning(f"Transient MongoDB error, retrying flush in {delay:.1f}s: {str(e)}")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                self.stats["failed"] += len(batch)
+                logger.error(f"Write-behind flush failed: {str(e)}", exc_info=True)
+                return
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": self._queue.qsize() if self._queue else 0,
+            **self.stats,
+        }
+
+
+@lru_cache
+def get_write_behind_queue() -> SupplierWriteBehindQueue:
+    return SupplierWriteBehindQueue()
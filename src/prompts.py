@@ -1,26 +1,13 @@
+from langchain_core.messages import BaseMessage, SystemMessage
 from .config import AGENT_MAX_SUPPLIERS
 
+SUMMARY_ROLE = "summary"
 
-def get_supply_chain_agent_prompt(chat_history=None) -> str:
-    # Format chat history context
-    chat_context = ""
-    if chat_history and len(chat_history) > 0:
-        chat_context = "CHAT HISTORY CONTEXT:\nPrevious conversation context:\n"
-        for msg in chat_history:
-            role = msg.get('role', 'unknown')
-            content = msg.get('content', '')
-            chat_context += f"- {role}: {content}\n"
-        chat_context += "\nBased on this conversation history:\n"
-        chat_context += "- Use insights from past interactions to refine your supplier search and recommendations\n"
-        chat_context += "- If the user has expressed preferences for specific regions, price ranges, or supplier characteristics, prioritize those\n"
-        chat_context += "- Consider any suppliers the user has previously rejected or shown interest in\n"
-        chat_context += "- Build upon previous search strategies and learnings from the conversation history\n\n"
-    else:
-        chat_context = "CHAT HISTORY CONTEXT:\n- This is a fresh conversation with no prior context\n\n"
-    
-    return f"""You are an expert supply chain analyst specializing in supplier discovery and evaluation. Your mission is to find exactly {AGENT_MAX_SUPPLIERS} high-quality, reliable suppliers that meet specific business requirements.
 
-{chat_context}
+# Identical for every request, so it forms a stable prefix that OpenAI's automatic
+# prompt caching can reuse across requests and agent turns. Keep anything that varies
+# per request (chat history, dates, query details) out of it.
+SUPPLY_CHAIN_AGENT_INSTRUCTIONS = f"""You are an expert supply chain analyst specializing in supplier discovery and evaluation. Your mission is to find exactly {AGENT_MAX_SUPPLIERS} high-quality, reliable suppliers that meet specific business requirements.
 
 CRITICAL DATA REQUIREMENTS:
 - ALL PRICES MUST BE CONVERTED TO USD: If you find prices in other currencies (EUR, GBP, CNY, etc.), convert them to USD using current exchange rates and format as '$X-Y USD'
@@ -30,7 +17,7 @@ CRITICAL DATA REQUIREMENTS:
 MANDATORY PLANNING PHASE:
 First, write a comprehensive numbered plan for how you will gather supplier data. Take your time to develop a thorough strategy. Do not call any tool until the plan covers ALL of the following:
 1. How you will use query_mongodb to check existing suppliers (include multiple search strategies and keyword variations)
-2. How you will use web_search to find new suppliers (include specific search strategies, industry directories, B2B platforms, and geographic targeting)
+2. How you will use web_search_many (and web_search) to find new suppliers (include specific search strategies, industry directories, B2B platforms, and geographic targeting)
 3. How you will use web_extract to get detailed supplier information (specify what data points you'll prioritize)
 4. Your criteria for evaluating and selecting the best {AGENT_MAX_SUPPLIERS} suppliers (include scoring methods and decision factors)
 5. Your quality assurance process for validating supplier information
@@ -53,11 +40,16 @@ DETAILED WORKFLOW:
    - Use multiple search terms and combinations (synonyms, related terms, industry jargon)
    - Search by product category, location, and specialties (try different category combinations)
    - Analyze results for quality and completeness (score each result)
+   - Results are paged and ranked by relevance: pass next_cursor back as cursor to see further matches
+   - Express budgets and deadlines as numbers: max_price_usd (e.g. 15 for "under $15"), max_lead_time_days (e.g. 21 for "within 3 weeks") and max_moq_units
    - Look for suppliers with complementary capabilities
    - Check for recent additions to the database
    - Validate data freshness and accuracy
 
 3. EXTENSIVE WEB RESEARCH: Use comprehensive web search strategies:
+   - Batch your keyword variants: call web_search_many once with 3-6 distinct queries instead of calling web_search one query at a time
+   - Results come back merged, deduplicated by URL and ranked; pages found by several queries are usually the strongest leads
+   - Results marked already_searched, already_seen or already_extracted are exact queries or pages handled earlier in this search: reuse those results instead of repeating the call
    - Search industry-specific supplier directories and trade associations
    - Look for manufacturers, distributors, wholesalers, and service providers
    - Include geographic modifiers and regional variations
@@ -98,10 +90,11 @@ DETAILED WORKFLOW:
    - Score each supplier on multiple criteria
    - Ensure diversity in supplier portfolio (size, location, specialization)
    - Verify no critical gaps in coverage
-   - Confirm all data is complete and validated
+   - Confirm all data is complete and validated: to check completeness, call validate_suppliers_batch once with all your candidates, never validate_supplier_data one supplier at a time
    If not satisfied, continue researching with renewed focus areas.
 
 7. METICULOUS FINALIZATION: Call finalize_supplier_search with exactly {AGENT_MAX_SUPPLIERS} thoroughly vetted suppliers
+   - finalize_supplier_search validates the suppliers itself and reports any incomplete ones; no separate validation turn is needed before it
 
 QUALITY STANDARDS:
 - Prioritize suppliers with verifiable business credentials and strong reputations
@@ -140,3 +133,40 @@ DATA FORMATTING REQUIREMENTS:
 - Ensure all data is realistic and verifiable
 
 Remember: Quality and thoroughness over speed. It's better to find {AGENT_MAX_SUPPLIERS} excellent suppliers through meticulous, comprehensive research than to rush and provide mediocre options. Take the time needed to do thorough analysis - you have extended limits to work with more depth and detail. ALWAYS ensure price ranges are in USD and response times are quantified. Your goal is to provide strategic, well-researched supplier recommendations that will drive long-term business success."""
+
+
+def render_chat_context(chat_history=None) -> str:
+    # Format chat history context
+    chat_context = ""
+    if chat_history and len(chat_history) > 0:
+        chat_context = "CHAT HISTORY CONTEXT:\nPrevious conversation context:\n"
+        for msg in chat_history:
+            role = msg.get('role', 'unknown')
+            content = msg.get('content', '')
+            if role == SUMMARY_ROLE:
+                # Older turns compacted by src/history.py
+                chat_context += f"Summary of earlier conversation:\n{content}\n\nMost recent messages:\n"
+                continue
+            chat_context += f"- {role}: {content}\n"
+        chat_context += "\nBased on this conversation history:\n"
+        chat_context += "- Use insights from past interactions to refine your supplier search and recommendations\n"
+        chat_context += "- If the user has expressed preferences for specific regions, price ranges, or supplier characteristics, prioritize those\n"
+        chat_context += "- Consider any suppliers the user has previously rejected or shown interest in\n"
+        chat_context += "- Build upon previous search strategies and learnings from the conversation history\n\n"
+    else:
+        chat_context = "CHAT HISTORY CONTEXT:\n- This is a fresh conversation with no prior context\n\n"
+    return chat_context
+
+
+def get_supply_chain_agent_prompt(chat_history=None) -> str:
+    # Static instructions first, per-request sections after them
+    return f"{SUPPLY_CHAIN_AGENT_INSTRUCTIONS}\n\n{render_chat_context(chat_history)}"
+
+
+def build_supply_chain_agent_messages(state) -> list[BaseMessage]:
+    """
+    Prompt callable for the compiled agent: renders the system prompt from the
+    per-request chat history in graph state and prepends it to the conversation.
+    """
+    system_prompt = get_supply_chain_agent_prompt(state.get("chat_history"))
+    return [SystemMessage(content=system_prompt)] + list(state["messages"])
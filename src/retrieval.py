@@ -0,0 +1,453 @@
+"""
+In-process retrieval index over the supplier collection.
+
+The index is loaded from MongoDB at startup and kept current through the
+supplier write listener. Suppliers written by other processes are pulled in by
+a periodic delta refresh on `last_seen_at`, and an index that has not been
+refreshed for RETRIEVAL_INDEX_MAX_STALENESS_SECONDS is bypassed. This lets
+`query_mongodb` rank candidates locally with BM25 instead of a `$text` round
+trip. Postings are stored as parallel `array('I')` / `array('f')` columns per
+term. Query terms are lightly stemmed and expanded to vocabulary terms they
+prefix ("micro" -> "microcontroller"), which gives the recall that `$text`
+lacks. Updated suppliers are tombstoned and re-appended; the index is compacted
+once tombstones pile up.
+
+Searches run on the event loop, so the lock is only held for short steps:
+loads and compactions build new postings aside and swap them in, and writes
+take the lock once per supplier.
+"""
+import asyncio
+import math
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterable, Optional
+from .models import Supplier, SupplierSearchIndexQuery
+from .normalization import normalized_supplier_fields
+from .utils import (
+    get_logger,
+    get_supplier_db_and_collection,
+    add_supplier_write_listener,
+    merge_supplier_dicts,
+    supplier_key,
+    supplier_to_dict,
+)
+from .config import (
+    SEARCH_INDEX_WEIGHTS,
+    RETRIEVAL_INDEX_ENABLED,
+    RETRIEVAL_BM25_K1,
+    RETRIEVAL_BM25_B,
+    RETRIEVAL_PREFIX_MIN_LENGTH,
+    RETRIEVAL_PREFIX_EXPANSIONS,
+    RETRIEVAL_PREFIX_WEIGHT,
+    RETRIEVAL_INDEX_REFRESH_SECONDS,
+    RETRIEVAL_INDEX_MAX_STALENESS_SECONDS,
+    RETRIEVAL_INDEX_REFRESH_OVERLAP_SECONDS,
+)
+
+logger = get_logger()
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "at", "by", "for", "from", "in", "of", "on", "or",
+    "the", "to", "with", "supplier", "suppliers", "manufacturer", "manufacturers",
+}
+
+
+def _stem(token: str) -> str:
+    # Plural folding only; anything heavier hurts company names
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ses", "xes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        _stem(token)
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+def _field_text(supplier: dict, field: str) -> str:
+    value = supplier.get(field)
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value)
+    return str(value or "")
+
+
+def _normalized(value) -> str:
+    return str(value or "").strip().lower()
+
+
+# Attributes set by SupplierRetrievalIndex._reset, swapped in as a whole after a rebuild
+_INDEX_STATE = (
+    "_docs", "_doc_lengths", "_numeric", "_doc_ids_by_key", "_postings",
+    "_vocabulary", "_vocabulary_dirty", "_total_length", "_live_count",
+)
+
+
+class SupplierRetrievalIndex:
+    """
+    BM25 index over company_name, specialties, certifications and location,
+    with per-field weights taken from SEARCH_INDEX_WEIGHTS.
+    """
+
+    def __init__(self, field_weights: dict[str, int] = SEARCH_INDEX_WEIGHTS):
+        self.field_weights = field_weights
+        self.ready = False
+        # Monotonic time of the last load or refresh from MongoDB
+        self.refreshed_at = 0.0
+        # Newest `last_seen_at` read from MongoDB; refreshes read from there on
+        self.watermark: Optional[datetime] = None
+        self._lock = threading.RLock()
+        # Serializes full rebuilds (load, compaction), which run without holding _lock
+        self._rebuild_lock = threading.Lock()
+        # Writes made while a rebuild runs, replayed onto the rebuilt index
+        self._pending_writes: Optional[list[dict]] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._docs: list[Optional[dict]] = []
+        self._doc_lengths = array("f")
+        self._numeric: list[dict] = []
+        self._doc_ids_by_key: dict[str, int] = {}
+        self._postings: dict[str, tuple[array, array]] = {}
+        self._vocabulary: list[str] = []
+        self._vocabulary_dirty = False
+        self._total_length = 0.0
+        self._live_count = 0
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    # -- building -------------------------------------------------------
+
+    def load(self, suppliers: Iterable[dict]) -> int:
+        """
+        Replace the index contents with the given suppliers.
+        The new contents are built aside, so searches keep using the old ones until the swap.
+        """
+        with self._rebuild_lock:
+            fresh = self._rebuild(lambda: self._build_from(supplier_to_dict(supplier) for supplier in suppliers))
+            with self._lock:
+                self._swap_in(fresh)
+                self.watermark = fresh.watermark
+                self.ready = True
+                self.refreshed_at = time.monotonic()
+                return self._live_count
+
+    def add(self, suppliers: Iterable[dict]) -> None:
+        """
+        Merge written suppliers into the index the same way the upsert merges them in MongoDB.
+        """
+        for supplier in suppliers:
+            supplier = supplier_to_dict(supplier)
+            # One supplier per hold, so searches interleave with large batches
+            with self._lock:
+                self._upsert(supplier)
+                if self._pending_writes is not None:
+                    self._pending_writes.append(supplier)
+        if len(self._docs) - self._live_count > max(64, self._live_count // 4):
+            self._compact()
+
+    def refresh(self, suppliers: Iterable[dict]) -> int:
+        """
+        Merge suppliers re-read from MongoDB since the watermark. Returns how many were read.
+        """
+        suppliers = [supplier_to_dict(supplier) for supplier in suppliers]
+        with self._lock:
+            for supplier in suppliers:
+                self._advance_watermark(supplier)
+        self.add(suppliers)
+        self.refreshed_at = time.monotonic()
+        return len(suppliers)
+
+    def refresh_filter(self) -> dict:
+        """
+        MongoDB filter for suppliers written since the last read, with some overlap for clock skew.
+        """
+        if self.watermark is None:
+            return {}
+        return {"last_seen_at": {"$gte": self.watermark - timedelta(seconds=RETRIEVAL_INDEX_REFRESH_OVERLAP_SECONDS)}}
+
+    def is_stale(self, max_age: float = RETRIEVAL_INDEX_MAX_STALENESS_SECONDS) -> bool:
+        return max_age > 0 and time.monotonic() - self.refreshed_at > max_age
+
+    def _advance_watermark(self, supplier: dict) -> None:
+        seen_at = supplier.get("last_seen_at")
+        if isinstance(seen_at, datetime):
+            # pymongo returns naive UTC datetimes unless the client is tz-aware
+            if seen_at.tzinfo is None:
+                seen_at = seen_at.replace(tzinfo=timezone.utc)
+            if self.watermark is None or seen_at > self.watermark:
+                self.watermark = seen_at
+
+    def _build_from(self, suppliers: Iterable[dict]) -> "SupplierRetrievalIndex":
+        fresh = SupplierRetrievalIndex(self.field_weights)
+        for supplier in suppliers:
+            fresh._advance_watermark(supplier)
+            fresh._upsert(supplier)
+        return fresh
+
+    def _rebuild(self, build) -> "SupplierRetrievalIndex":
+        # Called with _rebuild_lock held; `build` runs without _lock and returns a private index
+        with self._lock:
+            self._pending_writes = []
+        try:
+            return build()
+        except BaseException:
+            with self._lock:
+                self._pending_writes = None
+            raise
+
+    def _swap_in(self, fresh: "SupplierRetrievalIndex") -> None:
+        # Called with both locks held; writes made during the rebuild are merged again
+        for name in _INDEX_STATE:
+            setattr(self, name, getattr(fresh, name))
+        pending, self._pending_writes = self._pending_writes, None
+        for supplier in pending or []:
+            self._upsert(supplier)
+
+    def _upsert(self, supplier: dict) -> None:
+        key = supplier.get("supplier_key") or supplier_key(supplier)
+        existing_id = self._doc_ids_by_key.get(key)
+        if existing_id is not None:
+            supplier = merge_supplier_dicts(self._docs[existing_id], supplier)
+            self._remove(existing_id)
+        self._append(key, supplier)
+
+    def _append(self, key: str, supplier: dict) -> None:
+        doc_id = len(self._docs)
+        weighted_tf: dict[str, float] = {}
+        doc_length = 0.0
+        for field, weight in self.field_weights.items():
+            for token in tokenize(_field_text(supplier, field)):
+                weighted_tf[token] = weighted_tf.get(token, 0.0) + weight
+                doc_length += weight
+
+        for token, tf in weighted_tf.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = (array("I"), array("f"))
+                self._vocabulary_dirty = True
+            postings[0].append(doc_id)
+            postings[1].append(tf)
+
+        # Only Supplier fields are returned to the agent
+        self._docs.append({field: supplier[field] for field in Supplier.model_fields if field in supplier})
+        self._doc_lengths.append(doc_length)
+        self._numeric.append(normalized_supplier_fields(supplier))
+        self._doc_ids_by_key[key] = doc_id
+        self._total_length += doc_length
+        self._live_count += 1
+
+    def _remove(self, doc_id: int) -> None:
+        # Tombstone: postings keep the id, scoring skips it
+        self._docs[doc_id] = None
+        self._total_length -= self._doc_lengths[doc_id]
+        self._live_count -= 1
+
+    def _compact(self) -> None:
+        # Skipped while another rebuild runs; the next write retries
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                live = [(key, self._docs[doc_id]) for key, doc_id in self._doc_ids_by_key.items()]
+                logger.debug(f"Compacting retrieval index: {len(self._docs)} slots -> {len(live)} suppliers")
+
+            def build() -> "SupplierRetrievalIndex":
+                fresh = SupplierRetrievalIndex(self.field_weights)
+                for key, supplier in live:
+                    fresh._append(key, supplier)
+                return fresh
+
+            fresh = self._rebuild(build)
+            with self._lock:
+                self._swap_in(fresh)
+        finally:
+            self._rebuild_lock.release()
+
+    # -- searching ------------------------------------------------------
+
+    def _expand(self, term: str) -> list[tuple[str, float]]:
+        expansions = [(term, 1.0)] if term in self._postings else []
+        if len(term) < RETRIEVAL_PREFIX_MIN_LENGTH:
+            return expansions
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        position = bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and len(expansions) < RETRIEVAL_PREFIX_EXPANSIONS:
+            candidate = self._vocabulary[position]
+            if not candidate.startswith(term):
+                break
+            if candidate != term:
+                expansions.append((candidate, RETRIEVAL_PREFIX_WEIGHT))
+            position += 1
+        return expansions
+
+    def _score(self, query: str) -> dict[int, float]:
+        scores: dict[int, float] = {}
+        if not self._live_count:
+            return scores
+        average_length = self._total_length / self._live_count or 1.0
+        k1, b = RETRIEVAL_BM25_K1, RETRIEVAL_BM25_B
+        for term in dict.fromkeys(tokenize(query)):
+            for token, boost in self._expand(term):
+                doc_ids, tfs = self._postings[token]
+                # Tombstoned ids are counted in df until the next compaction
+                idf = math.log(1 + (self._live_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                for doc_id, tf in zip(doc_ids, tfs):
+                    if self._docs[doc_id] is None:
+                        continue
+                    norm = k1 * (1 - b + b * self._doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + boost * idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    def _matches_filters(self, doc_id: int, search_query: SupplierSearchIndexQuery) -> bool:
+        # Same filters as SupplierSearchIndexQuery.build_filter, strings compared case-insensitively
+        supplier, numeric = self._docs[doc_id], self._numeric[doc_id]
+        for field, limit in (
+            ("price_min_usd", search_query.max_price_usd),
+            ("lead_time_max_days", search_query.max_lead_time_days),
+            ("moq_units", search_query.max_moq_units),
+        ):
+            if limit is not None and (numeric.get(field) is None or numeric[field] > limit):
+                return False
+        for field in ("price_range", "location", "lead_time"):
+            wanted = getattr(search_query, field)
+            if wanted and _normalized(supplier.get(field)) != _normalized(wanted):
+                return False
+        for field in ("specialties", "certifications"):
+            wanted = getattr(search_query, field)
+            if wanted:
+                have = {_normalized(value) for value in supplier.get(field) or []}
+                if not have & {_normalized(value) for value in wanted}:
+                    return False
+        return True
+
+    def search(self, search_query: SupplierSearchIndexQuery, offset: int, limit: int) -> tuple[list[dict], bool]:
+        """
+        Rank matching suppliers and return one page plus whether more exist.
+        """
+        with self._lock:
+            if search_query.query:
+                scored = self._score(search_query.query)
+                ranked = sorted(scored.items(), key=lambda item: (-item[1], item[0]))
+            else:
+                ranked = [(doc_id, None) for doc_id, doc in enumerate(self._docs) if doc is not None]
+
+            page, matched = [], 0
+            for doc_id, score in ranked:
+                if not self._matches_filters(doc_id, search_query):
+                    continue
+                matched += 1
+                if matched <= offset:
+                    continue
+                if len(page) == limit:
+                    return page, True
+                result = dict(self._docs[doc_id])
+                if score is not None:
+                    result["score"] = round(score, 3)
+                page.append(result)
+            return page, False
+
+
+@lru_cache
+def get_retrieval_index() -> SupplierRetrievalIndex:
+    return SupplierRetrievalIndex()
+
+
+def _index_projection() -> dict:
+    projection = {field: 1 for field in Supplier.model_fields}
+    projection.update({"supplier_key": 1, "last_seen_at": 1, "_id": 0})
+    return projection
+
+
+def load_retrieval_index() -> int:
+    """
+    Build the retrieval index from the supplier collection and subscribe it to future writes.
+    Blocking; run it in a worker thread from async code.
+    """
+    if not RETRIEVAL_INDEX_ENABLED:
+        return 0
+    index = get_retrieval_index()
+    try:
+        db, collection = get_supplier_db_and_collection()
+        count = index.load(collection.find({}, _index_projection()))
+        add_supplier_write_listener(index.add)
+        logger.info(f"Supplier retrieval index loaded with {count} suppliers")
+        return count
+    except Exception as e:
+        # query_mongodb falls back to MongoDB while the index is not ready
+        logger.error(f"Failed to load supplier retrieval index: {str(e)}", exc_info=True)
+        return 0
+
+
+def refresh_retrieval_index() -> int:
+    """
+    Merge suppliers written since the last load or refresh, by any process, into the index.
+    Blocking; run it in a worker thread from async code.
+    """
+    index = get_retrieval_index()
+    if not RETRIEVAL_INDEX_ENABLED or not index.ready:
+        return 0
+    db, collection = get_supplier_db_and_collection()
+    count = index.refresh(collection.find(index.refresh_filter(), _index_projection()))
+    logger.debug("Retrieval index refreshed with {} suppliers", count)
+    return count
+
+
+class RetrievalIndexRefresher:
+    """
+    Background task that refreshes the retrieval index every RETRIEVAL_INDEX_REFRESH_SECONDS.
+    A failed refresh is logged and retried on the next tick. If refreshes keep
+    failing, the index goes stale and query_mongodb falls back to MongoDB.
+    """
+
+    def __init__(self, interval: float = RETRIEVAL_INDEX_REFRESH_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running or not RETRIEVAL_INDEX_ENABLED or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run(), name="retrieval-index-refresh")
+        logger.info(f"Retrieval index refresh started (every {self.interval:g}s)")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(refresh_retrieval_index)
+            except Exception as e:
+                logger.warning(f"Retrieval index refresh failed: {str(e)}")
+
+
+@lru_cache
+def get_retrieval_index_refresher() -> RetrievalIndexRefresher:
+    return RetrievalIndexRefresher()
@@ -0,0 +1,224 @@
+import asyncio
+from typing import Any, Optional
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from .agents import get_supply_chain_agent
+from .models import AgentConfig, SupplierExplorationAgentResponse
+from .cache import get_recommendation_cache, recommendation_cache_key
+from .fast_path import try_fast_path
+from .history import compact_chat_history
+from .frontier import frontier_scope
+from .admission import get_admission_controller
+from .persistence import get_write_behind_queue
+from .telemetry import TelemetryCallbackHandler, current_request
+from .utils import get_logger, save_suppliers_to_mongodb, asave_suppliers_to_mongodb
+from .config import (
+    AGENT_RECURSION_LIMIT,
+    AGENT_ASYNC_MODE,
+    WRITE_BEHIND_ENABLED,
+    RESULT_CACHE_ENABLED,
+    FAST_PATH_ENABLED,
+)
+
+logger = get_logger()
+
+
+class AgentRunFailed(Exception):
+    """
+    The agent run raised before producing a response.
+    """
+
+
+def build_input_payload(requirements: AgentConfig, chat_history: Optional[list[dict]] = None) -> dict:
+    # Build input payload with proper message structure and state tracking
+    input_payload = {
+        "query": requirements.query,
+        "chat_history": chat_history if chat_history is not None else requirements.chat_history,
+        "messages": [HumanMessage(content=requirements.query)],
+    }
+    logger.info("Built input payload for agent")
+    logger.debug("Messages count: {}", len(input_payload["messages"]))
+    return input_payload
+
+
+async def abuild_input_payload(requirements: AgentConfig) -> dict:
+    """
+    Input payload with the chat history compacted to its token budget.
+    """
+    return build_input_payload(requirements, await compact_chat_history(requirements.chat_history))
+
+
+def build_agent() -> tuple[Runnable, RunnableConfig]:
+    """
+    Return the shared, pre-compiled supply chain agent and the runnable config for a request.
+    Per-request context (query, chat history) travels in the input payload, not the graph.
+    """
+    agent = get_supply_chain_agent()
+
+    # Create runnable config for additional control; the callback times LLM and tool runs
+    config = RunnableConfig(
+        recursion_limit=AGENT_RECURSION_LIMIT,
+        callbacks=[TelemetryCallbackHandler(current_request())],
+    )
+    return agent, config
+
+
+def extract_agent_response(raw_output: Any) -> Optional[SupplierExplorationAgentResponse]:
+    """
+    Pull the structured supplier response out of the final graph state, if there is one.
+    """
+    logger.info("--- PROCESSING AGENT RESPONSE ---")
+    # Check if we have a structured response
+    if isinstance(raw_output, dict) and "structured_response" in raw_output:
+        logger.debug("Found structured_response in raw output")
+        structured_response = raw_output["structured_response"]
+        if (
+            hasattr(structured_response, "suppliers")
+            and structured_response.suppliers
+        ):
+            logger.info(
+                f"Found response with {len(structured_response.suppliers)} suppliers"
+            )
+            return structured_response
+        elif (
+            isinstance(structured_response, dict)
+            and "suppliers" in structured_response
+        ):
+            supplier_count = len(structured_response.get("suppliers", []))
+            logger.info(f"Found dict response with {supplier_count} suppliers")
+            return SupplierExplorationAgentResponse(
+                suppliers=structured_response["suppliers"]
+            )
+    return None
+
+
+async def save_suppliers(suppliers: list) -> dict:
+    # Prefer the write-behind queue; write directly if it is disabled, stopped or full
+    if WRITE_BEHIND_ENABLED and get_write_behind_queue().enqueue(suppliers):
+        return {"success": True, "queued": len(suppliers)}
+    if AGENT_ASYNC_MODE:
+        return await asave_suppliers_to_mongodb(suppliers)
+    return save_suppliers_to_mongodb(suppliers)
+
+
+async def finalize_agent_output(raw_output: Any) -> SupplierExplorationAgentResponse:
+    """
+    Turn the final graph state into the API response, persisting any suppliers found.
+    """
+    response = extract_agent_response(raw_output)
+    if response is not None:
+        logger.debug("Saving suppliers to MongoDB...")
+        # Save suppliers to MongoDB after getting response
+        save_result = await save_suppliers(response.suppliers)
+        logger.info(f"MongoDB save result: {save_result}")
+        logger.info("=== REQUEST COMPLETED SUCCESSFULLY ===")
+        return response
+
+    # Return empty response if no results found
+    logger.warning("No supplier results found in agent response")
+    # Formatting the whole agent state is expensive, so it only happens if the record is kept
+    logger.opt(lazy=True).debug("Raw output structure: {}", lambda: raw_output)
+    logger.warning("=== REQUEST COMPLETED WITH NO RESULTS ===")
+    return SupplierExplorationAgentResponse(suppliers=[])
+
+
+async def run_supply_chain_agent(
+    requirements: AgentConfig,
+) -> SupplierExplorationAgentResponse:
+    """
+    Run the agent and persist what it found. Raises AgentRunFailed if the run errors.
+    """
+    input_payload = await abuild_input_payload(requirements)
+
+    try:
+        agent, config = build_agent()
+
+        # Invoke the agent with configuration
+        logger.info("--- INVOKING SUPPLY CHAIN AGENT ---")
+        logger.info(
+            f"Starting supply chain agent invocation with recursion limit: {AGENT_RECURSION_LIMIT}"
+        )
+
+        # The run's tools share one frontier, so repeated searches and extractions are skipped
+        with frontier_scope():
+            if AGENT_ASYNC_MODE:
+                # Native async graph execution: no executor thread is held while the agent runs
+                raw_output = await agent.ainvoke(input_payload, config=config)
+            else:
+                raw_output = await asyncio.to_thread(agent.invoke, input_payload, config=config)
+        logger.info("Agent invocation completed")
+        logger.opt(lazy=True).debug(
+            "Raw output keys: {}",
+            lambda: list(raw_output.keys()) if isinstance(raw_output, dict) else type(raw_output).__name__,
+        )
+
+        return await finalize_agent_output(raw_output)
+
+    except Exception as e:
+        logger.error(
+            "Error processing recommendation request: {}", str(e), exc_info=True
+        )
+        logger.error("Error type: {}", type(e).__name__)
+        logger.error("=== REQUEST FAILED ===")
+        telemetry = current_request()
+        if telemetry is not None:
+            telemetry.outcome = "error"
+        raise AgentRunFailed(str(e)) from e
+
+
+async def answer_recommendation(
+    requirements: AgentConfig, wait_for_slot: bool = False
+) -> tuple[SupplierExplorationAgentResponse, str]:
+    """
+    Serve from stored suppliers when there are enough complete matches, else run the agent.
+    Returns the response and the path that produced it ("database" or "agent").
+    Agent runs go through admission control; see AdmissionController for `wait_for_slot`.
+    """
+    if FAST_PATH_ENABLED:
+        response = await try_fast_path(requirements)
+        if response is not None:
+            return response, "database"
+    async with get_admission_controller().slot(wait=wait_for_slot):
+        return await run_supply_chain_agent(requirements), "agent"
+
+
+async def recommend(
+    requirements: AgentConfig, bypass_cache: bool = False, wait_for_slot: bool = False
+) -> tuple[SupplierExplorationAgentResponse, str]:
+    """
+    Answer a recommendation request through the result cache.
+    Returns the response and the path that served it: "cache", "database" or "agent",
+    or "coalesced" when it joined an identical request that was already running.
+    Raises AdmissionRejected when the agent has to run but no slot is available,
+    unless `wait_for_slot` is set (background work that should queue instead).
+    Raises AgentRunFailed when the agent run, or the run this request joined, failed.
+    """
+    logger.info("=== NEW RECOMMENDATION REQUEST ===")
+    logger.info(
+        f"Received recommendation request for query: {requirements.query[:100]}..."
+    )
+    logger.debug("Full query: {}", requirements.query)
+    logger.debug("Chat history length: {}", len(requirements.chat_history or []))
+
+    if not RESULT_CACHE_ENABLED:
+        return await answer_recommendation(requirements, wait_for_slot)
+
+    # Set by compute when this request produces the result itself
+    served_by = None
+
+    async def compute() -> dict:
+        nonlocal served_by
+        response, served_by = await answer_recommendation(requirements, wait_for_slot)
+        return response.model_dump()
+
+    if bypass_cache:
+        logger.info("Result cache bypassed for this request")
+
+    result, source = await get_recommendation_cache().aget_or_compute_with_source(
+        recommendation_cache_key(requirements),
+        compute,
+        bypass=bypass_cache,
+        # Empty results usually mean the agent failed; don't pin them in the cache
+        should_cache=lambda value: bool(value.get("suppliers")),
+    )
+    return SupplierExplorationAgentResponse(**result), served_by or source
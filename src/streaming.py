@@ -0,0 +1,192 @@
+import json
+import time
+from typing import Any, AsyncIterator, Iterable
+from pydantic import ValidationError
+from .models import AgentConfig, Supplier, SupplierExplorationAgentResponse
+from .runner import abuild_input_payload, build_agent, finalize_agent_output
+from .cache import get_recommendation_cache, recommendation_cache_key
+from .telemetry import track_request, current_request
+from .frontier import frontier_scope
+from .admission import AdmissionRejected, get_admission_controller
+from .utils import get_logger, supplier_to_dict
+from .config import RESULT_CACHE_ENABLED
+
+logger = get_logger()
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    Encode one server-sent event frame.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _summarize_tool_input(tool_input: Any) -> dict:
+    # Keep progress events small: long strings are truncated and lists are counted
+    if not isinstance(tool_input, dict):
+        return {}
+    summary = {}
+    for key, value in tool_input.items():
+        if isinstance(value, str):
+            summary[key] = value[:200]
+        elif isinstance(value, (list, dict)):
+            summary[key] = f"{len(value)} items"
+        else:
+            summary[key] = value
+    return summary
+
+
+def _candidate_suppliers(tool_name: str, tool_input: Any) -> list:
+    if not isinstance(tool_input, dict):
+        return []
+    if tool_name == "validate_supplier_data":
+        return [tool_input.get("supplier_data")]
+    if tool_name == "validate_suppliers_batch":
+        return tool_input.get("suppliers") or []
+    if tool_name == "finalize_supplier_search":
+        return tool_input.get("suppliers") or []
+    return []
+
+
+class SupplierCollector:
+    """
+    Tracks suppliers that have already been streamed so each is emitted once.
+    """
+
+    def __init__(self):
+        self._seen: set[str] = set()
+
+    def collect(self, candidates: Iterable[Any]) -> list[dict]:
+        new_suppliers = []
+        for candidate in candidates:
+            if candidate is None:
+                continue
+            try:
+                supplier = Supplier.model_validate(supplier_to_dict(candidate))
+            except ValidationError:
+                # Only fully valid suppliers are streamed
+                continue
+            key = supplier.company_name.strip().lower()
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            new_suppliers.append(supplier.model_dump())
+        return new_suppliers
+
+
+async def stream_supply_chain_agent(
+    requirements: AgentConfig, bypass_cache: bool = False
+) -> AsyncIterator[str]:
+    """
+    Run the supply chain agent and yield SSE frames for its progress.
+
+    Events: `queued` (while waiting for an agent slot), `started`, `llm_turn_started`,
+    `llm_turn_finished`, `tool_started`, `tool_finished`, `supplier` (once per validated
+    supplier), `error` and `final`.
+    """
+    with track_request("stream") as telemetry:
+        async for frame in _stream_events(requirements, bypass_cache):
+            yield frame
+    logger.info(f"Request timing summary: {telemetry.summary()}")
+
+
+async def _stream_events(requirements: AgentConfig, bypass_cache: bool) -> AsyncIterator[str]:
+    started_at = time.monotonic()
+    cache_key = recommendation_cache_key(requirements)
+
+    if RESULT_CACHE_ENABLED and not bypass_cache:
+        cached = await get_recommendation_cache().aget(cache_key)
+        if cached is not None:
+            logger.info("Serving streaming request from result cache")
+            for supplier in cached.get("suppliers", []):
+                yield format_sse("supplier", supplier)
+            yield format_sse("final", {**cached, "cached": True, "elapsed_seconds": 0.0})
+            return
+
+    admission = get_admission_controller()
+    if admission.saturated:
+        yield format_sse("queued", {"in_flight": admission.in_flight, "waiting": admission.waiting})
+    try:
+        async with admission.slot():
+            async for frame in _stream_agent_run(requirements, cache_key, started_at):
+                yield frame
+    except AdmissionRejected as e:
+        current_request().outcome = "rejected"
+        yield format_sse(
+            "error",
+            {"message": e.reason, "type": type(e).__name__, "retry_after": e.retry_after},
+        )
+
+
+async def _stream_agent_run(requirements: AgentConfig, cache_key: str, started_at: float) -> AsyncIterator[str]:
+    yield format_sse("started", {"query": requirements.query[:100]})
+
+    collector = SupplierCollector()
+    # Set once the agent starts; a run that fails before then has no frontier to report
+    frontier = None
+    final_state = None
+    llm_turns = 0
+
+    try:
+        agent, config = build_agent()
+        input_payload = await abuild_input_payload(requirements)
+
+        logger.info("--- STREAMING SUPPLY CHAIN AGENT ---")
+        with frontier_scope() as frontier:
+            async for event in agent.astream_events(input_payload, config=config, version="v2"):
+                kind = event["event"]
+                if kind == "on_chat_model_start":
+                    llm_turns += 1
+                    yield format_sse("llm_turn_started", {"turn": llm_turns})
+                elif kind == "on_chat_model_end":
+                    output = event["data"].get("output")
+                    tool_calls = [call["name"] for call in getattr(output, "tool_calls", None) or []]
+                    yield format_sse(
+                        "llm_turn_finished", {"turn": llm_turns, "tool_calls": tool_calls}
+                    )
+                elif kind == "on_tool_start":
+                    tool_input = event["data"].get("input")
+                    yield format_sse(
+                        "tool_started",
+                        {
+                            "tool": event["name"],
+                            "run_id": event["run_id"],
+                            "input": _summarize_tool_input(tool_input),
+                        },
+                    )
+                    for supplier in collector.collect(_candidate_suppliers(event["name"], tool_input)):
+                        yield format_sse("supplier", supplier)
+                elif kind == "on_tool_end":
+                    yield format_sse("tool_finished", {"tool": event["name"], "run_id": event["run_id"]})
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    # Root graph finished: this is the final state
+                    final_state = event["data"].get("output")
+
+        response = await finalize_agent_output(final_state)
+
+    except Exception as e:
+        logger.error(f"Streaming recommendation request failed: {str(e)}", exc_info=True)
+        yield format_sse("error", {"message": str(e), "type": type(e).__name__})
+        current_request().outcome = "error"
+        response = SupplierExplorationAgentResponse(suppliers=[])
+
+    # Suppliers that only appeared in the structured response
+    for supplier in collector.collect(response.suppliers):
+        yield format_sse("supplier", supplier)
+
+    result = response.model_dump()
+    if RESULT_CACHE_ENABLED and result["suppliers"]:
+        await get_recommendation_cache().aset(cache_key, result)
+
+    final = {
+        **result,
+        "cached": False,
+        "llm_turns": llm_turns,
+        "elapsed_seconds": round(time.monotonic() - started_at, 2),
+    }
+    if frontier is not None:
+        # Repeated searches, results and extractions the crawl frontier skipped
+        final["frontier"] = frontier.summary()
+    yield format_sse("final", final)
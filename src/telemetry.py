@@ -0,0 +1,414 @@
+"""
+Performance telemetry: Prometheus metrics and per-request timing summaries.
+
+Metrics are kept in-process and rendered in the Prometheus text format by
+`render_metrics()` (served at `/metrics`). `track_request()` scopes a
+`RequestTelemetry` to the current request through a context variable, so
+spans recorded anywhere below it (LLM calls, tools, MongoDB operations, cache
+hits) also land in that request's summary. LLM and tool spans come from
+`TelemetryCallbackHandler`, which is passed in the agent's run config; other
+code paths use `timed` as a context manager or decorator.
+
+This module must not import from the rest of the package: utils and cache
+depend on it.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+_registry: list["_Metric"] = []
+_collectors: list[Callable[[], list[tuple[str, str, str, dict, float]]]] = []
+
+
+def _escape_label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(dict(zip(self.labelnames, key)), value))
+        return lines
+
+    def _render_value(self, labels: dict, value: Any) -> list[str]:
+        return [f"{self.name}{_format_labels(labels)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last slot is +Inf), then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, labels: dict, value: Any) -> list[str]:
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+def register_collector(collector: Callable[[], list[tuple[str, str, str, dict, float]]]) -> None:
+    """
+    Register a callable evaluated at scrape time. It returns
+    (name, type, help, labels, value) samples, e.g. counters kept elsewhere.
+    """
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    described = set()
+    for collector in _collectors:
+        for name, kind, documentation, labels, value in collector():
+            if name not in described:
+                lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"])
+                described.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_SECONDS = Histogram(
+    "supply_chain_request_seconds",
+    "End-to-end recommendation request latency.",
+    ("endpoint", "outcome"),
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600),
+)
+AGENT_ITERATIONS = Histogram(
+    "supply_chain_agent_iterations",
+    "ReAct iterations (LLM calls) per request.",
+    ("endpoint",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+LLM_CALL_SECONDS = Histogram(
+    "supply_chain_llm_call_seconds",
+    "Latency of individual LLM calls.",
+    ("model", "outcome"),
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 40, 80),
+)
+LLM_TOKENS = Counter(
+    "supply_chain_llm_tokens_total",
+    "LLM tokens by kind (prompt, completion, cached_prompt).",
+    ("model", "kind"),
+)
+TOOL_SECONDS = Histogram(
+    "supply_chain_tool_seconds",
+    "Latency of agent tool calls.",
+    ("tool", "outcome"),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+MONGO_SECONDS = Histogram(
+    "supply_chain_mongo_operation_seconds",
+    "Latency of MongoDB operations.",
+    ("operation", "outcome"),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+RECOMMENDATIONS_SERVED = Counter(
+    "supply_chain_recommendations_served_total",
+    "Recommendation responses by the path that produced them (cache, coalesced, database, agent).",
+    ("endpoint", "path"),
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "supply_chain_admission_wait_seconds",
+    "Time agent runs waited for an admission slot.",
+    ("outcome",),
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+ADMISSION_REJECTED = Counter(
+    "supply_chain_admission_rejected_total",
+    "Agent runs turned away by admission control.",
+    ("reason",),
+)
+FRONTIER_DUPLICATES = Counter(
+    "supply_chain_frontier_duplicates_total",
+    "Repeated searches, search results and extractions skipped within an agent run.",
+    ("kind",),
+)
+
+
+class RequestTelemetry:
+    """
+    Timing summary for one request: spans by name, LLM calls, tokens and cache hits.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.outcome = "ok"
+        self.started_at = time.perf_counter()
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.cache_hits = 0
+        self._spans: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def record_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            span = self._spans.setdefault(name, [0, 0.0])
+            span[0] += 1
+            span[1] += seconds
+
+    def record_llm_call(self, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0) -> None:
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cached_prompt_tokens += cached_prompt_tokens
+
+    def record_cache_hits(self, count: int = 1) -> None:
+        with self._lock:
+            self.cache_hits += count
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def summary(self) -> dict:
+        with self._lock:
+            spans = {
+                name: {"count": count, "seconds": round(seconds, 3)}
+                for name, (count, seconds) in sorted(self._spans.items(), key=lambda item: -item[1][1])
+            }
+        return {
+            "endpoint": self.endpoint,
+            "outcome": self.outcome,
+            "elapsed_seconds": round(self.elapsed(), 3),
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            # Prompt tokens served from the provider's prefix cache (a subset of prompt_tokens)
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "cache_hits": self.cache_hits,
+            "spans": spans,
+        }
+
+
+_current_request: ContextVar[Optional[RequestTelemetry]] = ContextVar("request_telemetry", default=None)
+
+
+def current_request() -> Optional[RequestTelemetry]:
+    return _current_request.get()
+
+
+@contextmanager
+def track_request(endpoint: str) -> Iterator[RequestTelemetry]:
+    """
+    Scope a RequestTelemetry to the enclosed block and export its totals on exit.
+    """
+    telemetry = RequestTelemetry(endpoint)
+    token = _current_request.set(telemetry)
+    try:
+        yield telemetry
+    except BaseException:
+        # Keep a more specific outcome (e.g. "rejected") set by the caller
+        if telemetry.outcome == "ok":
+            telemetry.outcome = "error"
+        raise
+    finally:
+        try:
+            _current_request.reset(token)
+        except ValueError:
+            # Exited from another context, e.g. a streaming generator finalized by the server
+            _current_request.set(None)
+        REQUEST_SECONDS.observe(telemetry.elapsed(), endpoint=endpoint, outcome=telemetry.outcome)
+        AGENT_ITERATIONS.observe(telemetry.llm_calls, endpoint=endpoint)
+
+
+def record_cache_hits(count: int = 1) -> None:
+    # Process-wide cache counters are exported from the caches' own stats
+    telemetry = current_request()
+    if telemetry is not None and count:
+        telemetry.record_cache_hits(count)
+
+
+class timed:
+    """
+    Time a block (`with` / `async with`) or a function (decorator) as a span.
+
+    The duration goes to `histogram` with the given labels plus an `outcome`
+    label, and into the current request's summary under `span`.
+    """
+
+    def __init__(self, span: str, histogram: Optional[Histogram] = None, **labels):
+        self.span = span
+        self.histogram = histogram
+        self.labels = labels
+        self._started_at = 0.0
+
+    def __enter__(self) -> "timed":
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        seconds = time.perf_counter() - self._started_at
+        if self.histogram is not None:
+            outcome = "error" if exc_type else "ok"
+            self.histogram.observe(seconds, outcome=outcome, **self.labels)
+        telemetry = current_request()
+        if telemetry is not None:
+            telemetry.record_span(self.span, seconds)
+
+    async def __aenter__(self) -> "timed":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.__exit__(exc_type, exc, tb)
+
+    def __call__(self, func: Callable) -> Callable:
+        # Each call gets its own timer so concurrent calls don't share start times
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed(self.span, self.histogram, **self.labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.span, self.histogram, **self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def _usage_from_result(response: LLMResult) -> tuple[int, int, int]:
+    # (prompt, completion, cached prompt) tokens; cached tokens are a subset of prompt tokens
+    prompt_tokens = completion_tokens = cached_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += usage.get("input_tokens", 0)
+            completion_tokens += usage.get("output_tokens", 0)
+            cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    if not prompt_tokens and not completion_tokens:
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens", 0)
+        completion_tokens = token_usage.get("completion_tokens", 0)
+        cached_tokens = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+    return prompt_tokens, completion_tokens, cached_tokens
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback that turns LLM and tool runs into spans and token counts.
+    Pass one per request in the run config's `callbacks`.
+    """
+
+    # Bookkeeping only; no need to hop to an executor on async runs
+    run_inline = True
+
+    def __init__(self, telemetry: Optional[RequestTelemetry] = None):
+        self.telemetry = telemetry
+        self._runs: dict[UUID, tuple[str, float]] = {}
+
+    def _start(self, run_id: UUID, name: str) -> None:
+        self._runs[run_id] = (name, time.perf_counter())
+
+    def _finish(self, run_id: UUID) -> tuple[Optional[str], float]:
+        name, started_at = self._runs.pop(run_id, (None, time.perf_counter()))
+        return name, time.perf_counter() - started_at
+
+    def _record_span(self, span: str, seconds: float) -> None:
+        if self.telemetry is not None:
+            self.telemetry.record_span(span, seconds)
+
+    @staticmethod
+    def _model_name(serialized: dict, metadata: Optional[dict]) -> str:
+        model = (metadata or {}).get("ls_model_name")
+        if not model:
+            model = ((serialized or {}).get("kwargs") or {}).get("model_name", "unknown")
+        return model
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        self._start(run_id, self._model_name(serialized, metadata))
+
+    def on_llm_start(self, serialized: dict, prompts: list, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        self._start(run_id, self._model_name(serialized, metadata))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        model, seconds = self._finish(run_id)
+        model = model or "unknown"
+        prompt_tokens, completion_tokens, cached_tokens = _usage_from_result(response)
+        LLM_CALL_SECONDS.observe(seconds, model=model, outcome="ok")
+        LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+        LLM_TOKENS.inc(cached_tokens, model=model, kind="cached_prompt")
+        self._record_span("llm", seconds)
+        if self.telemetry is not None:
+            self.telemetry.record_llm_call(prompt_tokens, completion_tokens, cached_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        model, seconds = self._finish(run_id)
+        LLM_CALL_SECONDS.observe(seconds, model=model or "unknown", outcome="error")
+        self._record_span("llm", seconds)
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, (serialized or {}).get("name") or kwargs.get("name") or "unknown")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        tool, seconds = self._finish(run_id)
+        TOOL_SECONDS.observe(seconds, tool=tool or "unknown", outcome="ok")
+        self._record_span(f"tool.{tool}", seconds)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        tool, seconds = self._finish(run_id)
+        TOOL_SECONDS.observe(seconds, tool=tool or "unknown", outcome="error")
+        self._record_span(f"tool.{tool}", seconds)
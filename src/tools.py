@@ -1,21 +1,61 @@
-from langchain_core.tools import tool
+from langchain_core.tools import tool, StructuredTool
 from .utils import (
     get_tavily_extract,
     get_tavily_search,
     get_mongo_client,
     get_logger,
-    create_search_index_if_not_exists,
     get_supplier_db_and_collection,
+    get_async_supplier_db_and_collection,
+    encode_cursor,
+    decode_cursor,
+    score_supplier_completeness,
+    score_supplier_batch,
 )
-from typing import List
+from bson import ObjectId
+from typing import Callable, List, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+import asyncio
+import contextvars
+import math
+import time
 from .models import (
     SupplierSearchIndexQuery,
     WebSearchQuery,
+    WebSearchManyQuery,
     WebExtractQuery,
     Supplier,
     SupplierDataValidationQuery,
+    SupplierBatchValidationQuery,
+)
+from .indexes import ensure_supplier_indexes, aensure_supplier_indexes
+from .retrieval import get_retrieval_index
+from .telemetry import timed, MONGO_SECONDS
+from .logs import debug_enabled
+from .distill import distill_search_response, distill_extract_results
+from .fanout import merge_search_responses
+from .frontier import current_frontier
+from .cache import (
+    TieredCache,
+    get_tavily_search_cache,
+    get_tavily_extract_cache,
+    tavily_search_cache_key,
+    tavily_extract_cache_key,
+    make_cache_key,
+    current_batch,
+)
+from .config import (
+    AGENT_MAX_SUPPLIERS,
+    RETRIEVAL_INDEX_ENABLED,
+    DISTILL_ENABLED,
+    TAVILY_CACHE_ENABLED,
+    EXTRACT_CHUNK_SIZE,
+    EXTRACT_MAX_WORKERS,
+    EXTRACT_CHUNK_TIMEOUT,
+    WEB_SEARCH_MANY_CONCURRENCY,
+    WEB_SEARCH_MANY_QUERY_TIMEOUT,
+    WEB_SEARCH_MANY_TOKEN_BUDGET,
 )
-from .config import AGENT_MAX_SUPPLIERS
 import json
 
 logger = get_logger()
@@ -24,24 +64,85 @@ tavily_extract = get_tavily_extract()
 mongo_client = get_mongo_client()
 
 
-@tool(
-    description="Query MongoDB for existing suppliers matching the requirements.",
-    args_schema=SupplierSearchIndexQuery,
-)
-def query_mongodb(
+def _run_with_timeouts(
+    calls: List[Callable[[], object]], max_workers: int, timeout: float, thread_name_prefix: str
+) -> List[tuple[str, object]]:
+    """
+    Run `calls` on a pool of their own, at most `max_workers` at a time, each allowed
+    `timeout` seconds from when it starts. Returns, in order, ("ok", result),
+    ("error", exception) or ("timeout", None) per call.
+    Overrunning calls are abandoned, not interrupted: the Tavily client sets no HTTP
+    timeout, so their threads finish in the background. Calls still waiting for a worker
+    after one timeout per wave of workers are abandoned too.
+    """
+    if not calls:
+        return []
+    started: dict[int, float] = {}
+
+    def run(index: int, call: Callable[[], object]) -> object:
+        started[index] = time.monotonic()
+        return call()
+
+    # A pool per call, like the per-call semaphores of the async paths: a shared pool
+    # would let one request's calls queue behind other requests'
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(calls)), thread_name_prefix=thread_name_prefix)
+    try:
+        futures = {
+            # Copy the context so per-request state reaches the worker thread
+            executor.submit(contextvars.copy_context().run, run, index, call): index
+            for index, call in enumerate(calls)
+        }
+        give_up = time.monotonic() + timeout * math.ceil(len(calls) / max_workers)
+        pending, abandoned = set(futures), set()
+        while pending:
+            now = time.monotonic()
+            deadlines = {future: started[futures[future]] + timeout for future in pending if futures[future] in started}
+            expired = {future for future, deadline in deadlines.items() if now >= deadline and not future.done()}
+            pending -= expired
+            abandoned |= expired
+            if not pending or now >= give_up:
+                break
+            wake = min([deadline for deadline in deadlines.values() if deadline > now] + [give_up])
+            # An abandoned call that finishes frees a worker for a queued one, so wake for it too
+            done, _ = wait(pending | abandoned, timeout=wake - now, return_when=FIRST_COMPLETED)
+            pending -= done
+            abandoned -= done
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    outcomes: List[tuple[str, object]] = [("timeout", None)] * len(calls)
+    for future, index in futures.items():
+        if not future.done() or future.cancelled():
+            continue
+        error = future.exception()
+        outcomes[index] = ("error", error) if error is not None else ("ok", future.result())
+    return outcomes
+
+
+def _build_supplier_search_query(
     query: str = None,
     location: str = None,
     price_range: str = None,
     specialties: List[str] = None,
     certifications: List[str] = None,
     lead_time: str = None,
-) -> List[dict]:
+    max_price_usd: float = None,
+    max_lead_time_days: float = None,
+    max_moq_units: int = None,
+    limit: int = None,
+    cursor: str = None,
+) -> SupplierSearchIndexQuery:
     logger.info("Starting MongoDB query for suppliers")
     logger.info(
         f"Query parameters - query: {query}, location: {location}, price_range: {price_range}"
     )
     logger.debug(
-        f"Additional filters - specialties: {specialties}, certifications: {certifications}, lead_time: {lead_time}"
+        "Additional filters - specialties: {}, certifications: {}, lead_time: {}",
+        specialties, certifications, lead_time,
+    )
+    logger.debug(
+        "Range filters - max_price_usd: {}, max_lead_time_days: {}, max_moq_units: {}",
+        max_price_usd, max_lead_time_days, max_moq_units,
     )
 
     # Create the query object
@@ -52,119 +153,760 @@ def query_mongodb(
         specialties=specialties,
         certifications=certifications,
         lead_time=lead_time,
+        max_price_usd=max_price_usd,
+        max_lead_time_days=max_lead_time_days,
+        max_moq_units=max_moq_units,
+        limit=limit,
+        cursor=cursor,
     )
 
-    logger.debug(f"Query parameters: {search_query.dict()}")
+    logger.opt(lazy=True).debug("Query parameters: {}", lambda: search_query.model_dump())
+    return search_query
 
-    try:
-        create_search_index_if_not_exists()
-        logger.debug("Search index verified/created")
 
-        db, collection = get_supplier_db_and_collection()
-        query_filter = search_query.build_filter()
-        logger.debug(f"Built MongoDB filter: {query_filter}")
+def _search_retrieval_index(search_query: SupplierSearchIndexQuery) -> dict | None:
+    """
+    Serve the query from the in-process retrieval index.
+    Returns None to fall back to MongoDB: index not loaded or stale, a MongoDB cursor, or no local hits.
+    """
+    index = get_retrieval_index()
+    if not RETRIEVAL_INDEX_ENABLED or not index.ready or not search_query.build_filter():
+        return None
+    if index.is_stale():
+        # Suppliers written by other processes may be missing until the next refresh succeeds
+        logger.warning("Retrieval index is stale, falling back to MongoDB")
+        return None
+    position = decode_cursor(search_query.cursor)
+    if search_query.cursor and "local_offset" not in position:
+        return None
+
+    offset = int(position.get("local_offset", 0))
+    limit = search_query.page_size()
+    with timed("retrieval_index.search"):
+        suppliers, has_more = index.search(search_query, offset, limit)
+    if not suppliers and not offset:
+        logger.info("No retrieval index hits, falling back to MongoDB")
+        return None
+
+    logger.info("Served supplier query from the in-process retrieval index")
+    _log_mongodb_results(suppliers)
+    return {
+        "suppliers": suppliers,
+        "count": len(suppliers),
+        "next_cursor": encode_cursor({"local_offset": offset + limit}) if has_more else None,
+        "source": "retrieval_index",
+    }
 
-        if not query_filter:
-            logger.info("No search criteria provided, returning empty results")
-            return []
 
-        logger.info("Executing MongoDB find query...")
-        results = list(collection.find(query_filter))
-        logger.info(f"Found {len(results)} suppliers in MongoDB")
+def _build_find_args(search_query: SupplierSearchIndexQuery) -> dict | None:
+    """
+    Translate a search query into bounded, projected and ranked find() arguments.
+    Returns None when the query has no search criteria.
+    """
+    query_filter = search_query.build_filter()
+    logger.debug("Built MongoDB filter: {}", query_filter)
+    if not query_filter:
+        return None
+
+    position = decode_cursor(search_query.cursor)
+    skip = 0
+    if search_query.query:
+        # Text-ranked pages can't be keyed on score, so the cursor carries an offset
+        skip = int(position.get("offset", 0))
+    elif position.get("after"):
+        query_filter["_id"] = {"$gt": ObjectId(position["after"])}
+
+    return {
+        "filter": query_filter,
+        "projection": search_query.build_projection(),
+        "sort": search_query.build_sort(),
+        "skip": skip,
+        "limit": search_query.page_size(),
+    }
 
-        if results:
-            logger.debug(
-                f"Sample result keys: {list(results[0].keys()) if results else 'N/A'}"
-            )
+
+def _build_results_page(docs: List[dict], find_args: dict, search_query: SupplierSearchIndexQuery) -> dict:
+    # One extra document is fetched to tell whether another page exists
+    limit = find_args["limit"]
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    next_cursor = None
+    if has_more:
+        if search_query.query:
+            next_cursor = encode_cursor({"offset": find_args["skip"] + limit})
+        else:
+            next_cursor = encode_cursor({"after": str(docs[-1]["_id"])})
+
+    for doc in docs:
+        doc.pop("_id", None)
+        if "score" in doc:
+            doc["score"] = round(doc["score"], 3)
+
+    _log_mongodb_results(docs)
+    return {"suppliers": docs, "count": len(docs), "next_cursor": next_cursor, "source": "mongodb"}
+
+
+def _empty_results_page(error: str = None) -> dict:
+    page = {"suppliers": [], "count": 0, "next_cursor": None}
+    if error:
+        page["error"] = error
+    return page
+
+
+def _log_mongodb_results(results: List[dict]) -> None:
+    logger.info(f"Found {len(results)} suppliers in MongoDB")
+
+    if results:
+        if debug_enabled():
+            logger.debug(f"Sample result keys: {list(results[0].keys())}")
             for i, result in enumerate(results[:3]):  # Log first 3 results
                 company_name = result.get("company_name", "Unknown")
                 location = result.get("location", "Unknown")
                 logger.debug(f"  {i+1}. {company_name} - {location}")
-        else:
-            logger.warning("No suppliers found matching the criteria")
+    else:
+        logger.warning("No suppliers found matching the criteria")
+
+
+def _supplier_query_key(search_query: SupplierSearchIndexQuery) -> str:
+    return make_cache_key("query_mongodb", search_query.model_dump())
 
-        return results
+
+def _is_cacheable_page(page) -> bool:
+    return isinstance(page, dict) and "error" not in page
+
+
+def _run_supplier_query(search_query: SupplierSearchIndexQuery) -> dict:
+    local_page = _search_retrieval_index(search_query)
+    if local_page is not None:
+        return local_page
+
+    try:
+        # Memoized: only touches MongoDB if the startup bootstrap did not succeed
+        ensure_supplier_indexes()
+
+        db, collection = get_supplier_db_and_collection()
+        find_args = _build_find_args(search_query)
+
+        if find_args is None:
+            logger.info("No search criteria provided, returning empty results")
+            return _empty_results_page()
+
+        logger.info("Executing MongoDB find query...")
+        with timed("mongo.find_suppliers", MONGO_SECONDS, operation="find_suppliers"):
+            docs = list(
+                collection.find(find_args["filter"], find_args["projection"])
+                .sort(find_args["sort"])
+                .skip(find_args["skip"])
+                .limit(find_args["limit"] + 1)
+            )
+        return _build_results_page(docs, find_args, search_query)
 
     except Exception as e:
         logger.error(f"MongoDB query failed: {str(e)}", exc_info=True)
         logger.error(f"Error type: {type(e).__name__}")
-        return []
+        return _empty_results_page(str(e))
 
 
-@tool(
+async def _arun_supplier_query(search_query: SupplierSearchIndexQuery) -> dict:
+    local_page = _search_retrieval_index(search_query)
+    if local_page is not None:
+        return local_page
+
+    try:
+        await aensure_supplier_indexes()
+
+        db, collection = get_async_supplier_db_and_collection()
+        find_args = _build_find_args(search_query)
+
+        if find_args is None:
+            logger.info("No search criteria provided, returning empty results")
+            return _empty_results_page()
+
+        logger.info("Executing async MongoDB find query...")
+        with timed("mongo.find_suppliers", MONGO_SECONDS, operation="find_suppliers"):
+            docs = await (
+                collection.find(find_args["filter"], find_args["projection"])
+                .sort(find_args["sort"])
+                .skip(find_args["skip"])
+                .limit(find_args["limit"] + 1)
+                .to_list(length=find_args["limit"] + 1)
+            )
+        return _build_results_page(docs, find_args, search_query)
+
+    except Exception as e:
+        logger.error(f"MongoDB query failed: {str(e)}", exc_info=True)
+        logger.error(f"Error type: {type(e).__name__}")
+        return _empty_results_page(str(e))
+
+
+def _query_mongodb(
+    query: str = None,
+    location: str = None,
+    price_range: str = None,
+    specialties: List[str] = None,
+    certifications: List[str] = None,
+    lead_time: str = None,
+    max_price_usd: float = None,
+    max_lead_time_days: float = None,
+    max_moq_units: int = None,
+    limit: int = None,
+    cursor: str = None,
+) -> dict:
+    search_query = _build_supplier_search_query(
+        query,
+        location,
+        price_range,
+        specialties,
+        certifications,
+        lead_time,
+        max_price_usd,
+        max_lead_time_days,
+        max_moq_units,
+        limit,
+        cursor,
+    )
+
+    batch = current_batch()
+    if batch is None:
+        return _run_supplier_query(search_query)
+    # Identical lookups from other items of the same batch share one query
+    return batch.mongo.get_or_compute(
+        _supplier_query_key(search_query),
+        lambda: _run_supplier_query(search_query),
+        should_cache=_is_cacheable_page,
+    )
+
+
+async def _aquery_mongodb(
+    query: str = None,
+    location: str = None,
+    price_range: str = None,
+    specialties: List[str] = None,
+    certifications: List[str] = None,
+    lead_time: str = None,
+    max_price_usd: float = None,
+    max_lead_time_days: float = None,
+    max_moq_units: int = None,
+    limit: int = None,
+    cursor: str = None,
+) -> dict:
+    search_query = _build_supplier_search_query(
+        query,
+        location,
+        price_range,
+        specialties,
+        certifications,
+        lead_time,
+        max_price_usd,
+        max_lead_time_days,
+        max_moq_units,
+        limit,
+        cursor,
+    )
+
+    batch = current_batch()
+    if batch is None:
+        return await _arun_supplier_query(search_query)
+    return await batch.mongo.aget_or_compute(
+        _supplier_query_key(search_query),
+        lambda: _arun_supplier_query(search_query),
+        should_cache=_is_cacheable_page,
+    )
+
+
+query_mongodb = StructuredTool.from_function(
+    func=_query_mongodb,
+    coroutine=_aquery_mongodb,
+    name="query_mongodb",
     description=(
-        "Use the Tavily API to search online for potential supplier leads. "
-        "Accepts a free-form query string describing the desired supplier characteristics "
-        "and returns structured JSON results containing search snippets and URLs."
+        "Query MongoDB for existing suppliers matching the requirements. "
+        "Free-text `query` terms match partial words and plurals. "
+        "Use max_price_usd, max_lead_time_days and max_moq_units for budget, lead time and MOQ limits. "
+        "Returns at most `limit` suppliers ranked by text relevance when `query` is set; "
+        "pass the returned next_cursor as `cursor` to fetch the next page."
     ),
-    args_schema=WebSearchQuery,
+    args_schema=SupplierSearchIndexQuery,
 )
-def web_search(query: str) -> dict:
+
+
+def _is_cacheable_search(response) -> bool:
+    return isinstance(response, dict) and "error" not in response and bool(response.get("results"))
+
+
+def _search_cache() -> Optional[TieredCache]:
+    # The process-wide cache when enabled, otherwise the memo of the current batch, if any
+    if TAVILY_CACHE_ENABLED:
+        return get_tavily_search_cache()
+    batch = current_batch()
+    return batch.search if batch is not None else None
+
+
+def _extract_cache() -> Optional[TieredCache]:
+    if TAVILY_CACHE_ENABLED:
+        return get_tavily_extract_cache()
+    batch = current_batch()
+    return batch.extract if batch is not None else None
+
+
+def _fetch_search(query: str) -> dict:
+    cache = _search_cache()
+    if cache is None:
+        return tavily_search.invoke({"query": query})
+    return cache.get_or_compute(
+        tavily_search_cache_key(query),
+        lambda: tavily_search.invoke({"query": query}),
+        should_cache=_is_cacheable_search,
+    )
+
+
+async def _afetch_search(query: str) -> dict:
+    cache = _search_cache()
+    if cache is None:
+        return await tavily_search.ainvoke({"query": query})
+    return await cache.aget_or_compute(
+        tavily_search_cache_key(query),
+        lambda: tavily_search.ainvoke({"query": query}),
+        should_cache=_is_cacheable_search,
+    )
+
+
+def _process_search_response(response) -> dict:
+    result_count = (
+        len(response.get("results", [])) if isinstance(response, dict) else 0
+    )
+    logger.info(f"Tavily web search completed - found {result_count} results")
+
+    if isinstance(response, dict) and "results" in response and debug_enabled():
+        logger.debug(
+            f"Response contains {len(response['results'])} results with keys: {list(response.keys())}"
+        )
+        # Log some sample results for debugging
+        for i, result in enumerate(response["results"][:2]):  # First 2 results
+            title = result.get("title", "No title")[:50]
+            url = result.get("url", "No URL")
+            logger.debug(f"  Result {i+1}: {title}... - {url}")
+
+    if not isinstance(response, dict):
+        return {"results": []}
+    # The response may be the cached object: distillation and the frontier build new dicts
+    processed = distill_search_response(response) if DISTILL_ENABLED else response
+    frontier = current_frontier()
+    return frontier.collapse_search_results(processed) if frontier is not None else processed
+
+
+def _repeated_search_response(queries: List[str]) -> dict:
+    logger.info(f"Skipping search already run in this agent run: {queries}")
+    return {
+        "results": [],
+        "already_searched": queries,
+        "note": "These queries were already searched in this run. Use the earlier results or try different keywords.",
+    }
+
+
+def _claim_queries(queries: List[str]) -> List[str]:
+    # Queries not yet searched in this run (all of them outside an agent run)
+    frontier = current_frontier()
+    if frontier is None:
+        return queries
+    return [query for query in queries if frontier.claim_query(query)]
+
+
+def _release_queries(queries: List[str]) -> None:
+    # Failed searches stay retryable; they must not be reported as already_searched
+    frontier = current_frontier()
+    if frontier is not None:
+        for query in queries:
+            frontier.release_query(query)
+
+
+def _web_search(query: str) -> dict:
     logger.info("Starting Tavily web search")
     logger.info(f"Search query: '{query}'")
-    logger.debug(f"Query length: {len(query)} characters")
+    logger.debug("Query length: {} characters", len(query))
+    if not _claim_queries([query]):
+        return _repeated_search_response([query])
 
     try:
         logger.debug("Invoking Tavily search API...")
-        response = tavily_search.invoke({"query": query})
+        response = _fetch_search(query)
         logger.debug("Tavily API call completed")
+        return _process_search_response(response)
 
-        result_count = (
-            len(response.get("results", [])) if isinstance(response, dict) else 0
-        )
-        logger.info(f"Tavily web search completed - found {result_count} results")
+    except Exception as e:
+        _release_queries([query])
+        logger.error(f"Tavily web search failed: {str(e)}", exc_info=True)
+        logger.error(f"Error type: {type(e).__name__}")
+        return {"results": [], "error": str(e)}
 
-        if isinstance(response, dict) and "results" in response:
-            logger.debug(
-                f"Response contains {len(response['results'])} results with keys: {list(response.keys())}"
-            )
-            # Log some sample results for debugging
-            for i, result in enumerate(response["results"][:2]):  # First 2 results
-                title = result.get("title", "No title")[:50]
-                url = result.get("url", "No URL")
-                logger.debug(f"  Result {i+1}: {title}... - {url}")
 
-        return response if isinstance(response, dict) else {"results": []}
+async def _aweb_search(query: str) -> dict:
+    logger.info("Starting async Tavily web search")
+    logger.info(f"Search query: '{query}'")
+    logger.debug("Query length: {} characters", len(query))
+    if not _claim_queries([query]):
+        return _repeated_search_response([query])
 
+    try:
+        logger.debug("Invoking Tavily search API (async)...")
+        response = await _afetch_search(query)
+        logger.debug("Tavily API call completed")
+        return _process_search_response(response)
+
+    except asyncio.CancelledError:
+        _release_queries([query])
+        raise
     except Exception as e:
+        _release_queries([query])
         logger.error(f"Tavily web search failed: {str(e)}", exc_info=True)
         logger.error(f"Error type: {type(e).__name__}")
         return {"results": [], "error": str(e)}
 
 
-@tool(
-    description="Extract detailed supplier information from URLs using Tavily API. Enhanced with intelligent analysis to identify missing data and provide extraction guidance.",
-    args_schema=WebExtractQuery,
+web_search = StructuredTool.from_function(
+    func=_web_search,
+    coroutine=_aweb_search,
+    name="web_search",
+    description=(
+        "Use the Tavily API to search online for potential supplier leads. "
+        "Accepts a free-form query string describing the desired supplier characteristics "
+        "and returns structured JSON results containing search snippets and URLs."
+    ),
+    args_schema=WebSearchQuery,
 )
-def web_extract(urls: List[str]) -> dict:
+
+
+def _fetch_search_or_error(query: str) -> dict:
+    # One failed variant must not fail the whole fan-out
+    try:
+        return _fetch_search(query)
+    except Exception as e:
+        logger.warning(f"Fan-out search query failed ({query[:80]}): {str(e)}")
+        return {"results": [], "error": str(e)}
+
+
+async def _afetch_search_or_error(query: str) -> dict:
+    try:
+        return await _afetch_search(query)
+    except Exception as e:
+        logger.warning(f"Fan-out search query failed ({query[:80]}): {str(e)}")
+        return {"results": [], "error": str(e)}
+
+
+def _process_search_many_responses(queries: List[str], responses: List[dict]) -> dict:
+    results = merge_search_responses(list(zip(queries, responses)))
+    failed = [
+        {"query": query, "error": response["error"]}
+        for query, response in zip(queries, responses)
+        if isinstance(response, dict) and response.get("error")
+    ]
+    found = sum(len(response.get("results") or []) for response in responses if isinstance(response, dict))
+    logger.info(
+        f"Fan-out web search completed - {len(queries)} queries, {found} results, {len(results)} after deduplication"
+    )
+
+    merged = {"queries": queries, "results": results}
+    if DISTILL_ENABLED:
+        distilled = distill_search_response(merged, WEB_SEARCH_MANY_TOKEN_BUDGET)
+        # Distillation keeps the standard search fields; restore which queries found each page
+        for entry, result in zip(distilled["results"], results):
+            entry["queries"] = result["queries"]
+        merged = {"queries": queries, **distilled}
+    if failed:
+        merged["failed_queries"] = failed
+    frontier = current_frontier()
+    return frontier.collapse_search_results(merged) if frontier is not None else merged
+
+
+def _search_many_response(queries: List[str], fresh: List[str], responses: List[dict]) -> dict:
+    _release_queries([
+        query for query, response in zip(fresh, responses)
+        if not isinstance(response, dict) or response.get("error")
+    ])
+    result = _process_search_many_responses(fresh, responses)
+    repeated = [query for query in queries if query not in fresh]
+    if repeated:
+        result["already_searched"] = repeated
+    return result
+
+
+def _search_timeout_response(query: str) -> dict:
+    logger.warning(f"Fan-out search query timed out ({query[:80]})")
+    return {"results": [], "error": f"Timed out after {WEB_SEARCH_MANY_QUERY_TIMEOUT}s"}
+
+
+def _web_search_many(queries: List[str]) -> dict:
+    logger.info(f"Starting fan-out Tavily web search with {len(queries)} queries")
+    fresh = _claim_queries(queries)
+    if not fresh:
+        return _repeated_search_response(queries)
+    outcomes = _run_with_timeouts(
+        [partial(_fetch_search_or_error, query) for query in fresh],
+        WEB_SEARCH_MANY_CONCURRENCY,
+        WEB_SEARCH_MANY_QUERY_TIMEOUT,
+        "web-search",
+    )
+    # Queries that timed out are reported as failed and released for a later retry
+    responses = [
+        value if status == "ok" else _search_timeout_response(query)
+        for query, (status, value) in zip(fresh, outcomes)
+    ]
+    return _search_many_response(queries, fresh, responses)
+
+
+async def _aweb_search_many(queries: List[str]) -> dict:
+    logger.info(f"Starting async fan-out Tavily web search with {len(queries)} queries")
+    fresh = _claim_queries(queries)
+    if not fresh:
+        return _repeated_search_response(queries)
+    semaphore = asyncio.Semaphore(WEB_SEARCH_MANY_CONCURRENCY)
+
+    async def search(query: str) -> dict:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(_afetch_search_or_error(query), timeout=WEB_SEARCH_MANY_QUERY_TIMEOUT)
+            except asyncio.TimeoutError:
+                return _search_timeout_response(query)
+
+    try:
+        responses = await asyncio.gather(*(search(query) for query in fresh))
+    except asyncio.CancelledError:
+        _release_queries(fresh)
+        raise
+    return _search_many_response(queries, fresh, list(responses))
+
+
+web_search_many = StructuredTool.from_function(
+    func=_web_search_many,
+    coroutine=_aweb_search_many,
+    name="web_search_many",
+    description=(
+        "Run several Tavily web searches in parallel and get one merged result list. "
+        "Prefer this over repeated web_search calls when exploring keyword variants, synonyms, "
+        "regions or B2B directories. Results are deduplicated by URL, limited per website and "
+        "ranked by how well they score across all queries; each result lists the queries that found it."
+    ),
+    args_schema=WebSearchManyQuery,
+)
+
+
+def _index_extract_response(response, keys: List[str], failed: List[dict]) -> dict:
+    """
+    Map a raw Tavily extract response onto cache keys, collecting per-URL failures.
+    """
+    if isinstance(response, dict) and "error" in response:
+        raise RuntimeError(response["error"])
+    if not isinstance(response, dict) or "results" not in response:
+        raise ValueError("Invalid extraction response")
+
+    failed.extend(response.get("failed_results") or [])
+    wanted = set(keys)
+    indexed = {}
+    for result in response["results"]:
+        key = tavily_extract_cache_key(result.get("url", ""))
+        if key in wanted:
+            indexed[key] = result
+    return indexed
+
+
+def _collect_extract_results(cached: dict, key_to_url: dict, failed: List[dict]) -> dict:
+    failed_urls = {failure.get("url") for failure in failed}
+    for key, url in key_to_url.items():
+        if cached.get(key) is None and url not in failed_urls:
+            failed.append({"url": url, "error": "No content extracted"})
+    return {
+        "results": [cached[key] for key in key_to_url if cached.get(key) is not None],
+        "failed_results": failed,
+    }
+
+
+def _chunk_keys(keys: List[str]) -> List[List[str]]:
+    return [keys[i:i + EXTRACT_CHUNK_SIZE] for i in range(0, len(keys), EXTRACT_CHUNK_SIZE)]
+
+
+def _mark_chunk_failed(chunk: List[str], key_to_url: dict, failed: List[dict], error: str) -> None:
+    logger.warning(f"Extraction chunk of {len(chunk)} URLs failed: {error}")
+    failed.extend({"url": key_to_url[key], "error": error} for key in chunk)
+
+
+def _extract_chunks(keys: List[str], key_to_url: dict, failed: List[dict]) -> dict:
+    """
+    Extract URLs in chunks, at most EXTRACT_MAX_WORKERS at a time.
+    A chunk that fails or overruns EXTRACT_CHUNK_TIMEOUT only loses its own URLs.
+    """
+    chunks = _chunk_keys(keys)
+    logger.debug("Extracting {} URLs in {} chunks", len(keys), len(chunks))
+    outcomes = _run_with_timeouts(
+        [partial(tavily_extract.invoke, {"urls": [key_to_url[key] for key in chunk]}) for chunk in chunks],
+        EXTRACT_MAX_WORKERS,
+        EXTRACT_CHUNK_TIMEOUT,
+        "web-extract",
+    )
+
+    indexed = {}
+    for chunk, (status, value) in zip(chunks, outcomes):
+        if status == "timeout":
+            _mark_chunk_failed(chunk, key_to_url, failed, f"Timed out after {EXTRACT_CHUNK_TIMEOUT}s")
+        elif status == "error":
+            _mark_chunk_failed(chunk, key_to_url, failed, str(value))
+        else:
+            indexed.update(_index_extract_response(value, chunk, failed))
+    return indexed
+
+
+async def _aextract_chunks(keys: List[str], key_to_url: dict, failed: List[dict]) -> dict:
+    """
+    Async counterpart of _extract_chunks, bounded by a semaphore instead of a thread pool.
+    """
+    chunks = _chunk_keys(keys)
+    logger.debug("Extracting {} URLs in {} chunks (async)", len(keys), len(chunks))
+    semaphore = asyncio.Semaphore(EXTRACT_MAX_WORKERS)
+
+    async def extract_chunk(chunk: List[str]) -> dict:
+        async with semaphore:
+            response = await asyncio.wait_for(
+                tavily_extract.ainvoke({"urls": [key_to_url[key] for key in chunk]}),
+                timeout=EXTRACT_CHUNK_TIMEOUT,
+            )
+        return _index_extract_response(response, chunk, failed)
+
+    outcomes = await asyncio.gather(
+        *(extract_chunk(chunk) for chunk in chunks), return_exceptions=True
+    )
+
+    indexed = {}
+    for chunk, outcome in zip(chunks, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            _mark_chunk_failed(chunk, key_to_url, failed, f"Timed out after {EXTRACT_CHUNK_TIMEOUT}s")
+        elif isinstance(outcome, Exception):
+            _mark_chunk_failed(chunk, key_to_url, failed, str(outcome))
+        else:
+            indexed.update(outcome)
+    return indexed
+
+
+def _fetch_extract(urls: List[str]) -> dict:
+    # Pages are cached per URL so overlapping URL lists only fetch what is new
+    key_to_url = {tavily_extract_cache_key(url): url for url in urls}
+    failed: List[dict] = []
+
+    def compute_many(keys: List[str]) -> dict:
+        return _extract_chunks(keys, key_to_url, failed)
+
+    cache = _extract_cache()
+    if cache is not None:
+        cached = cache.get_or_compute_many(list(key_to_url), compute_many)
+    else:
+        cached = compute_many(list(key_to_url))
+    return _collect_extract_results(cached, key_to_url, failed)
+
+
+async def _afetch_extract(urls: List[str]) -> dict:
+    key_to_url = {tavily_extract_cache_key(url): url for url in urls}
+    failed: List[dict] = []
+
+    async def compute_many(keys: List[str]) -> dict:
+        return await _aextract_chunks(keys, key_to_url, failed)
+
+    cache = _extract_cache()
+    if cache is not None:
+        cached = await cache.aget_or_compute_many(list(key_to_url), compute_many)
+    else:
+        cached = await compute_many(list(key_to_url))
+    return _collect_extract_results(cached, key_to_url, failed)
+
+
+def _process_extract_response(response) -> dict:
+    if not isinstance(response, dict) or "results" not in response:
+        logger.error("Invalid response from Tavily extraction")
+        return {"results": [], "error": "Invalid extraction response"}
+
+    # Partial results are returned alongside the URLs that could not be extracted
+    results = response.get("results", [])
+    failed_results = response.get("failed_results") or []
+    logger.info(f"Extraction completed - {len(results)} pages processed, {len(failed_results)} failed")
+    result = {"results": results, "success": bool(results)}
+    if DISTILL_ENABLED and results:
+        result["results"], result["distillation"] = distill_extract_results(results)
+    if failed_results:
+        result["failed_results"] = failed_results
+    return result
+
+
+def _split_known_urls(urls: List[str]) -> tuple[List[str], List[dict]]:
+    # URLs this agent run still has to fetch, and references for the ones it already extracted
+    frontier = current_frontier()
+    if frontier is None:
+        return urls, []
+    return frontier.split_extract_urls(urls)
+
+
+def _with_known_pages(result: dict, known: List[dict]) -> dict:
+    frontier = current_frontier()
+    if frontier is not None:
+        frontier.record_extracted(result.get("results") or [])
+    if known:
+        logger.info(f"Skipped {len(known)} URLs already extracted in this run")
+        result["results"] = list(result.get("results") or []) + known
+        result["note"] = "Pages marked already_extracted were extracted earlier in this run; reuse that content."
+    return result
+
+
+def _web_extract(urls: List[str]) -> dict:
     logger.info(f"Starting enhanced Tavily URL extraction for {len(urls)} URLs")
-    logger.debug(f"URLs to extract: {urls}")
+    logger.debug("URLs to extract: {}", urls)
 
     if not urls:
         logger.warning("No URLs provided for extraction")
         return {"results": [], "error": "No URLs provided", "extraction_guidance": "Please provide URLs to extract from"}
 
-    # Key fields we need
-    key_fields = ["company_name", "location", "price_range", "lead_time", "certifications", "specialties"]
+    urls, known = _split_known_urls(urls)
+    if not urls:
+        return _with_known_pages({"results": [], "success": True}, known)
 
     try:
         logger.debug("Invoking Tavily extract API...")
-        response = tavily_extract.invoke({"urls": urls})
+        response = _fetch_extract(urls)
         logger.info("Tavily extraction completed successfully")
+        return _with_known_pages(_process_extract_response(response), known)
 
-        if not isinstance(response, dict) or "results" not in response:
-            logger.error("Invalid response from Tavily extraction")
-            return {"results": [], "error": "Invalid extraction response"}
+    except Exception as e:
+        logger.error(f"Extraction failed: {str(e)}", exc_info=True)
+        return {"results": [], "error": str(e)}
+
+
+async def _aweb_extract(urls: List[str]) -> dict:
+    logger.info(f"Starting async Tavily URL extraction for {len(urls)} URLs")
+    logger.debug("URLs to extract: {}", urls)
 
-        # Simple response without excessive analysis
-        logger.info(f"Extraction completed - {len(response.get('results', []))} pages processed")
-        return {"results": response.get("results", []), "success": True}
+    if not urls:
+        logger.warning("No URLs provided for extraction")
+        return {"results": [], "error": "No URLs provided", "extraction_guidance": "Please provide URLs to extract from"}
+
+    urls, known = _split_known_urls(urls)
+    if not urls:
+        return _with_known_pages({"results": [], "success": True}, known)
+
+    try:
+        logger.debug("Invoking Tavily extract API (async)...")
+        response = await _afetch_extract(urls)
+        logger.info("Tavily extraction completed successfully")
+        return _with_known_pages(_process_extract_response(response), known)
 
     except Exception as e:
         logger.error(f"Extraction failed: {str(e)}", exc_info=True)
         return {"results": [], "error": str(e)}
 
 
+web_extract = StructuredTool.from_function(
+    func=_web_extract,
+    coroutine=_aweb_extract,
+    name="web_extract",
+    description="Extract detailed supplier information from URLs using Tavily API. Enhanced with intelligent analysis to identify missing data and provide extraction guidance.",
+    args_schema=WebExtractQuery,
+)
+
+
 @tool(
     description="Validate supplier data completeness and provide specific improvement recommendations for incomplete fields.",
     args_schema=SupplierDataValidationQuery
@@ -178,21 +920,46 @@ def validate_supplier_data(supplier_data: dict) -> dict:
     """
     logger.info("Starting supplier data validation")
     
-    required_fields = ["company_name", "location", "rating", "price_range", "lead_time", "moq", "certifications", "specialties", "response_time", "stock", "time_zone", "contact"]
-    
-    missing_fields = [field for field in required_fields if not supplier_data.get(field)]
-    
-    validation_result = {
-        "is_valid": len(missing_fields) == 0,
-        "missing_fields": missing_fields,
-        "completeness_score": round(((len(required_fields) - len(missing_fields)) / len(required_fields)) * 100, 1)
-    }
+    validation_result = score_supplier_completeness(supplier_data)
     
     logger.info(f"Validation completed - Completeness: {validation_result['completeness_score']}%, Valid: {validation_result['is_valid']}")
     
     return validation_result
 
 
+@tool(
+    description="Validate the completeness of several suppliers in one call. Returns each supplier's missing fields and completeness score, and flags repeated company names.",
+    args_schema=SupplierBatchValidationQuery
+)
+def validate_suppliers_batch(suppliers: List[dict]) -> dict:
+    """
+    Validates a list of candidate suppliers with the same rules as validate_supplier_data.
+
+    Args:
+        suppliers: Supplier dictionaries to validate
+    """
+    validation = score_supplier_batch(suppliers)
+    logger.info(
+        f"Batch validation completed - {validation['valid_count']}/{len(suppliers)} valid, "
+        f"average completeness: {validation['average_completeness']}%"
+    )
+    return validation
+
+
+def _validation_summary(validation: dict) -> dict:
+    # Totals plus only the suppliers that need attention, to keep the tool result short
+    return {
+        "valid_count": validation["valid_count"],
+        "invalid_count": validation["invalid_count"],
+        "average_completeness": validation["average_completeness"],
+        "incomplete": [
+            {"company_name": result["company_name"], "missing_fields": result["missing_fields"]}
+            for result in validation["results"]
+            if not result["is_valid"]
+        ],
+    }
+
+
 @tool(description=f"Complete the supplier search and return the final results. Target: {AGENT_MAX_SUPPLIERS} suppliers, but will accept fewer if context limits are reached or thorough searching yields fewer results.")
 def finalize_supplier_search(suppliers: List[Supplier]) -> dict:
     logger.info(f"Finalizing supplier search with {len(suppliers)} suppliers")
@@ -203,17 +970,37 @@ def finalize_supplier_search(suppliers: List[Supplier]) -> dict:
         logger.error(error_msg)
         raise ValueError(error_msg)
     
+    # Validate here rather than in separate agent turns
+    validation = score_supplier_batch(suppliers)
+    duplicates = [result for result in validation["results"] if "duplicate_of" in result]
+    if duplicates:
+        logger.info(f"Dropping {len(duplicates)} repeated suppliers")
+        suppliers = [supplier for supplier, result in zip(suppliers, validation["results"]) if "duplicate_of" not in result]
+        validation = score_supplier_batch(suppliers)
+
     if len(suppliers) < AGENT_MAX_SUPPLIERS:
         logger.warning(f"Found {len(suppliers)} suppliers (target was {AGENT_MAX_SUPPLIERS}). Proceeding with available suppliers to avoid context overflow.")
     
-    # Trim to exact number if more than required
+    # Trim to exact number if more than required, keeping the most complete suppliers
     if len(suppliers) > AGENT_MAX_SUPPLIERS:
         logger.info(f"Trimming {len(suppliers)} suppliers to exactly {AGENT_MAX_SUPPLIERS}")
-        suppliers = suppliers[:AGENT_MAX_SUPPLIERS]
+        ranked = sorted(
+            range(len(suppliers)),
+            key=lambda index: -validation["results"][index]["completeness_score"],
+        )
+        keep = sorted(ranked[:AGENT_MAX_SUPPLIERS])
+        suppliers = [suppliers[index] for index in keep]
+        validation = score_supplier_batch(suppliers)
+
+    if validation["invalid_count"]:
+        logger.warning(
+            f"{validation['invalid_count']} of {len(suppliers)} final suppliers are incomplete "
+            f"(average completeness: {validation['average_completeness']}%)"
+        )
 
     if not suppliers:
         logger.warning("No suppliers provided for finalization")
-    else:
+    elif debug_enabled():
         logger.debug("Supplier summary:")
         for i, supplier in enumerate(suppliers[:5]):  # Log first 5
             name = (
@@ -228,10 +1015,9 @@ def finalize_supplier_search(suppliers: List[Supplier]) -> dict:
     result = {
         "suppliers": [supplier.dict() for supplier in suppliers],
         "count": len(suppliers),
+        "validation": _validation_summary(validation),
     }
 
     logger.info(f"Search completed successfully with exactly {len(suppliers)} suppliers")
-    logger.debug(
-        f"Result structure: count={result['count']}, suppliers_type={type(result['suppliers'])}"
-    )
+    logger.debug("Result structure: count={}", result["count"])
     return result
@@ -1,6 +1,14 @@
+import base64
+import json
+import re
+from datetime import datetime, timezone
 from functools import lru_cache
-from pymongo import MongoClient
+from typing import Callable
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
 from pymongo.collection import Collection
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
 from .config import (
     OPENAI_API_KEY,
     MONGO_URI,
@@ -16,7 +24,12 @@ from langchain_openai import ChatOpenAI
 from langchain_tavily import TavilyExtract
 from langchain_tavily import TavilySearch
 from loguru import logger
-from .config import SEARCH_INDEX_NAME, SEARCH_INDEX_SPEC
+from .telemetry import timed, MONGO_SECONDS
+from .normalization import (
+    NORMALIZATION_VERSION,
+    normalized_supplier_fields,
+    stale_normalized_fields,
+)
 
 
 @lru_cache
@@ -29,6 +42,11 @@ def get_mongo_client() -> MongoClient:
     return MongoClient(MONGO_URI)
 
 
+@lru_cache
+def get_async_mongo_client() -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(MONGO_URI)
+
+
 @lru_cache
 def get_llm() -> ChatOpenAI:
     return ChatOpenAI(
@@ -62,72 +80,398 @@ def get_supplier_db_and_collection() -> tuple[MongoClient, Collection]:
     return db, collection
 
 
-def create_search_index_if_not_exists() -> None:
+@lru_cache
+def get_async_supplier_db_and_collection() -> tuple[AsyncIOMotorDatabase, AsyncIOMotorCollection]:
+    """
+    Returns the async (motor) MongoDB database and collection for suppliers.
+    """
+    client = get_async_mongo_client()
+    db = client["supplier_db"]
+    collection = db["suppliers"]
+    return db, collection
+
+
+def supplier_to_dict(supplier) -> dict:
+    """
+    Convert a supplier (Pydantic model, plain object or dict) to a dictionary.
+    """
+    if hasattr(supplier, 'dict'):
+        # Pydantic model
+        return supplier.dict()
+    elif hasattr(supplier, '__dict__'):
+        # Regular object
+        return supplier.__dict__
+    # Already a dict
+    return supplier
+
+
+# Fields a supplier record needs to count as complete (supplier validation tools and the fast path)
+REQUIRED_SUPPLIER_FIELDS = [
+    "company_name", "location", "rating", "price_range", "lead_time", "moq",
+    "certifications", "specialties", "response_time", "stock", "time_zone", "contact",
+]
+
+
+def score_supplier_completeness(supplier_data: dict) -> dict:
+    """
+    Missing required fields and the share present, as a percentage.
+    """
+    missing_fields = [field for field in REQUIRED_SUPPLIER_FIELDS if not supplier_data.get(field)]
+    return {
+        "is_valid": len(missing_fields) == 0,
+        "missing_fields": missing_fields,
+        "completeness_score": round(((len(REQUIRED_SUPPLIER_FIELDS) - len(missing_fields)) / len(REQUIRED_SUPPLIER_FIELDS)) * 100, 1),
+    }
+
+
+def score_supplier_batch(suppliers: list) -> dict:
+    """
+    Completeness of each supplier in a list, plus totals, scored like score_supplier_completeness.
+    Repeated company names are reported as duplicates of the first occurrence.
+    """
+    results = []
+    first_seen: dict[str, int] = {}
+    for index, supplier in enumerate(suppliers):
+        supplier_data = supplier_to_dict(supplier)
+        if not isinstance(supplier_data, dict):
+            supplier_data = {}
+        result = {"index": index, "company_name": supplier_data.get("company_name"), **score_supplier_completeness(supplier_data)}
+        name = str(supplier_data.get("company_name") or "").strip().lower()
+        if name and name in first_seen:
+            result["duplicate_of"] = first_seen[name]
+        elif name:
+            first_seen[name] = index
+        results.append(result)
+    return {
+        "results": results,
+        "valid_count": sum(1 for result in results if result["is_valid"]),
+        "invalid_count": sum(1 for result in results if not result["is_valid"]),
+        "duplicate_count": sum(1 for result in results if "duplicate_of" in result),
+        "average_completeness": round(sum(result["completeness_score"] for result in results) / len(results), 1) if results else 0.0,
+    }
+
+
+def encode_cursor(position: dict) -> str:
+    """
+    Encode a pagination position as an opaque, URL-safe cursor string.
+    """
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str | None) -> dict:
+    """
+    Decode a cursor produced by encode_cursor. Invalid cursors restart from the first page.
+    """
+    if not cursor:
+        return {}
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return position if isinstance(position, dict) else {}
+    except Exception:
+        logger.warning(f"Ignoring invalid pagination cursor: {cursor[:40]}")
+        return {}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so trivially different spellings of the same page compare equal.
+    Scheme is forced to https, `www.`, fragments, trailing slashes and utm_* parameters are dropped.
+    """
+    parts = urlsplit(url.strip())
+    if not parts.netloc and parts.path:
+        # Bare domains like "example.com/about"
+        parts = urlsplit(f"https://{url.strip()}")
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(
+        [(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")]
+    )
+    return urlunsplit(("https", netloc, path, query, ""))
+
+
+def url_domain(url: str) -> str:
+    """
+    Registrable host of a URL without `www.` or port, e.g. "https://www.acme.com/x" -> "acme.com".
+    """
+    if not url:
+        return ""
+    netloc = urlsplit(canonicalize_url(url)).netloc
+    return netloc.split(":")[0]
+
+
+# Legal-form suffixes ignored when comparing company names
+COMPANY_NAME_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "co", "corp", "corporation",
+    "company", "gmbh", "ag", "sa", "srl", "bv", "plc", "pvt", "pte", "oy", "ab",
+}
+SUPPLIER_LIST_FIELDS = ("certifications", "specialties")
+
+# Callbacks notified with the supplier dicts after each successful write
+_supplier_write_listeners: list[Callable[[list[dict]], None]] = []
+
+
+def add_supplier_write_listener(listener: Callable[[list[dict]], None]) -> None:
+    if listener not in _supplier_write_listeners:
+        _supplier_write_listeners.append(listener)
+
+
+def notify_supplier_writes(suppliers: list) -> None:
+    if not _supplier_write_listeners or not suppliers:
+        return
+    supplier_dicts = [supplier_to_dict(supplier) for supplier in suppliers]
+    for listener in _supplier_write_listeners:
+        try:
+            listener(supplier_dicts)
+        except Exception as e:
+            # A listener must never fail the write that triggered it
+            logger.error(f"Supplier write listener failed: {str(e)}", exc_info=True)
+
+
+def supplier_key(supplier: dict) -> str:
     """
-    Create a text index on the collection if it does not already exist.
-    Fixed: Get collection within function to match usage in tools.py
+    Stable identity for a supplier: normalized company name plus website domain.
     """
-    db, collection = get_supplier_db_and_collection()
-    if SEARCH_INDEX_NAME not in collection.index_information():
-        collection.create_index(
-            SEARCH_INDEX_SPEC, name=SEARCH_INDEX_NAME, default_language="english"
-        )
+    name = re.sub(r"[^a-z0-9]+", " ", str(supplier.get("company_name", "")).lower())
+    tokens = [token for token in name.split() if token not in COMPANY_NAME_SUFFIXES]
+    normalized_name = " ".join(tokens) or name.strip()
+    contact = supplier.get("contact") or {}
+    website = contact.get("website", "") if isinstance(contact, dict) else ""
+    return f"{normalized_name}|{url_domain(website)}"
+
+
+def merge_supplier_dicts(existing: dict, incoming: dict) -> dict:
+    # Later non-empty values win; list fields are unioned
+    merged = dict(existing)
+    for field, value in incoming.items():
+        if field in SUPPLIER_LIST_FIELDS:
+            merged[field] = list(dict.fromkeys((merged.get(field) or []) + (value or [])))
+        elif field == "contact" and isinstance(value, dict):
+            contact = dict(merged.get("contact") or {})
+            contact.update({k: v for k, v in value.items() if v})
+            merged["contact"] = contact
+        elif value not in (None, "", []):
+            merged[field] = value
+    return merged
+
+
+def build_supplier_upserts(suppliers: list) -> list[UpdateOne]:
+    """
+    Build idempotent upserts keyed on supplier_key.
+
+    Non-empty scalar fields are set, list fields are merged with $addToSet and
+    contact sub-fields are set individually, so a sparse re-recommendation never
+    erases data an earlier one found. Suppliers repeated within the batch are
+    merged first.
+    """
+    by_key: dict[str, dict] = {}
+    for supplier in suppliers:
+        supplier_dict = supplier_to_dict(supplier)
+        key = supplier_key(supplier_dict)
+        by_key[key] = merge_supplier_dicts(by_key.get(key, {}), supplier_dict)
+
+    now = datetime.now(timezone.utc)
+    operations = []
+    for key, supplier_dict in by_key.items():
+        set_fields = {"supplier_key": key, "last_seen_at": now}
+        add_to_set = {}
+        for field, value in supplier_dict.items():
+            if field in ("_id", "supplier_key"):
+                continue
+            if field in SUPPLIER_LIST_FIELDS:
+                if value:
+                    add_to_set[field] = {"$each": list(value)}
+            elif field == "contact" and isinstance(value, dict):
+                for contact_field, contact_value in value.items():
+                    if contact_value:
+                        set_fields[f"contact.{contact_field}"] = contact_value
+            elif value not in (None, "", []):
+                set_fields[field] = value
+        # Numeric price/lead time/MOQ for range queries, parsed from the strings above
+        normalized = normalized_supplier_fields(supplier_dict)
+        set_fields.update(normalized)
+        set_fields["normalized_version"] = NORMALIZATION_VERSION
+
+        update = {
+            "$set": set_fields,
+            "$setOnInsert": {"first_seen_at": now},
+            "$inc": {"seen_count": 1},
+        }
+        stale = stale_normalized_fields(supplier_dict, normalized)
+        if stale:
+            update["$unset"] = {field: "" for field in stale}
+        if add_to_set:
+            update["$addToSet"] = add_to_set
+        operations.append(UpdateOne({"supplier_key": key}, update, upsert=True))
+    return operations
+
+
+def supplier_shape_repairs(doc: dict) -> dict:
+    """
+    Fields to $set so a legacy document has array list fields and an object contact.
+
+    $addToSet and `contact.*` updates fail on documents where those fields are
+    null or scalar, so the backfill repairs them. A scalar list value becomes a
+    one-item list; a scalar contact is kept under `legacy_contact`.
+    """
+    repairs = {}
+    for field in SUPPLIER_LIST_FIELDS:
+        if field in doc and not isinstance(doc[field], list):
+            value = doc[field]
+            repairs[field] = [] if value in (None, "") else [value]
+    if "contact" in doc and not isinstance(doc["contact"], dict):
+        repairs["contact"] = {}
+        if doc["contact"] not in (None, ""):
+            repairs["legacy_contact"] = doc["contact"]
+    return repairs
+
+
+# Documents whose list or contact fields cannot take the upsert's $addToSet / contact.* updates
+_MALFORMED_SHAPE_FILTERS = [
+    {field: {"$exists": True, "$not": {"$type": "array"}}} for field in SUPPLIER_LIST_FIELDS
+] + [{"contact": {"$exists": True, "$not": {"$type": "object"}}}]
+
+
+def _bulk_write_summary(result, supplier_count: int) -> dict:
+    return {
+        "success": True,
+        "supplier_count": supplier_count,
+        "upserted_count": result.upserted_count,
+        "modified_count": result.modified_count,
+        "matched_count": result.matched_count,
+    }
+
+
+def _bulk_write_error_summary(error: BulkWriteError, supplier_count: int) -> dict:
+    # Unordered bulk writes keep going past failures; report what did get written
+    details = error.details or {}
+    logger.error(f"Bulk supplier upsert finished with {len(details.get('writeErrors', []))} errors")
+    return {
+        "success": False,
+        "supplier_count": supplier_count,
+        "upserted_count": details.get("nUpserted", 0),
+        "modified_count": details.get("nModified", 0),
+        "matched_count": details.get("nMatched", 0),
+        "error": str(error),
+    }
 
 
 def save_suppliers_to_mongodb(suppliers: list) -> dict:
     """
     Save suppliers to MongoDB for future retrieval and analysis.
-    
+
+    Suppliers are upserted on their supplier_key, so recommending the same
+    supplier again refreshes its record instead of inserting a duplicate.
+
     Args:
         suppliers: List of supplier dictionaries or objects
-        
+
     Returns:
         dict: Result of the save operation
     """
     try:
         logger.info(f"Saving {len(suppliers)} suppliers to MongoDB")
-        
+
+        operations = []
         # Get database and collection
         db, collection = get_supplier_db_and_collection()
-        
-        # Ensure search index exists
-        create_search_index_if_not_exists()
-        
-        # Convert suppliers to dictionaries if they're Pydantic models
-        supplier_dicts = []
-        for supplier in suppliers:
-            if hasattr(supplier, 'dict'):
-                # Pydantic model
-                supplier_dict = supplier.dict()
-            elif hasattr(supplier, '__dict__'):
-                # Regular object
-                supplier_dict = supplier.__dict__
-            else:
-                # Already a dict
-                supplier_dict = supplier
-            
-            supplier_dicts.append(supplier_dict)
-        
-        if supplier_dicts:
-            # Insert suppliers into MongoDB
-            result = collection.insert_many(supplier_dicts)
-            logger.info(f"Successfully saved {len(result.inserted_ids)} suppliers to MongoDB")
-            return {
-                "success": True,
-                "inserted_count": len(result.inserted_ids),
-                "inserted_ids": [str(id) for id in result.inserted_ids]
-            }
+
+        operations = build_supplier_upserts(suppliers)
+
+        if operations:
+            with timed("mongo.save_suppliers", MONGO_SECONDS, operation="save_suppliers"):
+                result = collection.bulk_write(operations, ordered=False)
+            notify_supplier_writes(suppliers)
+            logger.info(
+                f"Upserted {len(operations)} suppliers to MongoDB "
+                f"({result.upserted_count} new, {result.modified_count} updated)"
+            )
+            return _bulk_write_summary(result, len(operations))
         else:
             logger.warning("No suppliers to save")
-            return {"success": True, "inserted_count": 0, "message": "No suppliers to save"}
-            
+            return {"success": True, "supplier_count": 0, "message": "No suppliers to save"}
+
+    except BulkWriteError as e:
+        # Counts refer to the deduplicated upserts, not the suppliers passed in
+        return _bulk_write_error_summary(e, len(operations))
     except Exception as e:
         logger.error(f"Error saving suppliers to MongoDB: {str(e)}", exc_info=True)
         return {
             "success": False,
             "error": str(e),
-            "inserted_count": 0
+            "supplier_count": 0
         }
 
 
-# TODO: Timer Logger Decorator
+async def asave_suppliers_to_mongodb(suppliers: list) -> dict:
+    """
+    Async variant of save_suppliers_to_mongodb using the motor client.
+    """
+    try:
+        logger.info(f"Saving {len(suppliers)} suppliers to MongoDB (async)")
+
+        operations = []
+        db, collection = get_async_supplier_db_and_collection()
+
+        operations = build_supplier_upserts(suppliers)
+
+        if operations:
+            with timed("mongo.save_suppliers", MONGO_SECONDS, operation="save_suppliers"):
+                result = await collection.bulk_write(operations, ordered=False)
+            notify_supplier_writes(suppliers)
+            logger.info(
+                f"Upserted {len(operations)} suppliers to MongoDB "
+                f"({result.upserted_count} new, {result.modified_count} updated)"
+            )
+            return _bulk_write_summary(result, len(operations))
+        else:
+            logger.warning("No suppliers to save")
+            return {"success": True, "supplier_count": 0, "message": "No suppliers to save"}
+
+    except BulkWriteError as e:
+        # Counts refer to the deduplicated upserts, not the suppliers passed in
+        return _bulk_write_error_summary(e, len(operations))
+    except Exception as e:
+        logger.error(f"Error saving suppliers to MongoDB: {str(e)}", exc_info=True)
+        return {
+            "success": False,
+            "error": str(e),
+            "supplier_count": 0
+        }
+
+
+async def abackfill_normalized_fields(batch_size: int = 500) -> int:
+    """
+    Parse numeric price/lead time/MOQ fields for documents written before
+    normalization (or by an older NORMALIZATION_VERSION), and repair null or
+    scalar list and contact fields that upserts cannot update. Returns the number updated.
+    """
+    db, collection = get_async_supplier_db_and_collection()
+    cursor = collection.find(
+        {"$or": [{"normalized_version": {"$ne": NORMALIZATION_VERSION}}, *_MALFORMED_SHAPE_FILTERS]},
+        {"price_range": 1, "lead_time": 1, "moq": 1, "contact": 1, **{field: 1 for field in SUPPLIER_LIST_FIELDS}},
+    )
+    updated = 0
+    operations = []
+    async for doc in cursor:
+        normalized = normalized_supplier_fields(doc)
+        update = {
+            "$set": {**normalized, **supplier_shape_repairs(doc), "normalized_version": NORMALIZATION_VERSION}
+        }
+        stale = stale_normalized_fields(doc, normalized)
+        if stale:
+            update["$unset"] = {field: "" for field in stale}
+        operations.append(UpdateOne({"_id": doc["_id"]}, update))
+        if len(operations) >= batch_size:
+            await collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+        updated += len(operations)
+    if updated:
+        logger.info(f"Backfilled normalized fields and repaired shapes on {updated} suppliers")
+    return updated
+
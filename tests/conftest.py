@@ -0,0 +1,5 @@
+import os
+
+# Config is read at import time; the unit tests never call the APIs
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-test")
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from src.admission import AdmissionController, AdmissionRejected
+from src.config import ADMISSION_RETRY_AFTER_MAX
+
+
+async def test_runs_within_the_cap_are_admitted_immediately():
+    controller = AdmissionController(max_concurrent=2, max_queue=1, queue_timeout=1)
+
+    await controller.acquire()
+    await controller.acquire()
+
+    assert controller.in_flight == 2
+    assert controller.stats["admitted"] == 2
+    assert controller.saturated
+
+
+async def test_full_queue_is_rejected_with_429_and_retry_after():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    await controller.acquire()
+    queued = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire()
+
+    assert rejected.value.status_code == 429
+    assert 1 <= rejected.value.retry_after <= ADMISSION_RETRY_AFTER_MAX
+    assert controller.stats["rejected_queue_full"] == 1
+
+    controller.release(run_seconds=1)
+    await queued
+    assert controller.in_flight == 1
+
+
+async def test_wait_timeout_is_rejected_with_503():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    await controller.acquire()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire()
+
+    assert rejected.value.status_code == 503
+    assert controller.waiting == 0
+    assert controller.stats["rejected_timeout"] == 1
+
+
+async def test_background_runs_queue_without_rejection():
+    controller = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=0.01)
+    await controller.acquire()
+    background = asyncio.create_task(controller.acquire(wait=True))
+    await asyncio.sleep(0.05)
+
+    assert not background.done()
+    assert controller.background_waiting == 1
+    controller.release(run_seconds=1)
+    await asyncio.wait_for(background, timeout=1)
+    assert controller.background_waiting == 0
+
+
+def test_retry_after_grows_with_the_backlog_and_is_capped():
+    controller = AdmissionController(max_concurrent=2, max_queue=10, queue_timeout=1)
+    controller._average_run_seconds = 10
+    controller.in_flight, controller.waiting = 2, 2
+    assert controller.retry_after() == 20
+
+    controller.waiting = 1000
+    assert controller.retry_after() == ADMISSION_RETRY_AFTER_MAX
+
+    controller.in_flight = controller.waiting = 0
+    assert controller.retry_after() == 1
+
+
+async def test_slot_releases_on_error():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1)
+
+    with pytest.raises(RuntimeError):
+        async with controller.slot():
+            raise RuntimeError("agent failed")
+
+    assert controller.in_flight == 0
+    assert not controller.saturated
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from src.batch import batch_concurrency, stream_batch_recommendations
+from src.models import AgentConfig, BatchRecommendationRequest, SupplierExplorationAgentResponse
+
+
+def parse(frame: str) -> tuple[str, dict]:
+    event, data = frame.strip().split("\n")
+    return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+def request(*queries: str, concurrency: int = None) -> BatchRecommendationRequest:
+    return BatchRecommendationRequest(items=[AgentConfig(query=query) for query in queries], concurrency=concurrency)
+
+
+class ItemRunner:
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.cancelled: list[str] = []
+
+    async def __call__(self, item: AgentConfig):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if item.query == "hang":
+                await asyncio.Event().wait()
+            await asyncio.sleep(self.delay)
+            if item.query == "fail":
+                raise RuntimeError("agent failed")
+            return SupplierExplorationAgentResponse(suppliers=[]), "cache" if item.query == "cached" else "agent"
+        except asyncio.CancelledError:
+            self.cancelled.append(item.query)
+            raise
+        finally:
+            self.active -= 1
+
+
+async def collect(batch: BatchRecommendationRequest, runner: ItemRunner) -> list[tuple[str, dict]]:
+    return [parse(frame) async for frame in stream_batch_recommendations(batch, runner)]
+
+
+def test_concurrency_is_clamped_to_the_item_count():
+    assert batch_concurrency(request("a", "b", concurrency=8)) == 2
+    assert batch_concurrency(request("a", "b", "c", concurrency=1)) == 1
+
+
+async def test_items_run_at_most_concurrency_at_a_time():
+    runner = ItemRunner()
+
+    frames = await collect(request(*[f"query {number}" for number in range(6)], concurrency=2), runner)
+
+    assert runner.peak == 2
+    assert frames[0] == ("started", {"items": 6, "concurrency": 2})
+    assert sorted(data["index"] for event, data in frames if event == "item") == list(range(6))
+
+
+async def test_failing_item_is_reported_without_aborting_the_batch():
+    frames = await collect(request("a", "fail", "cached"), ItemRunner())
+
+    events = [event for event, _ in frames]
+    assert events[0] == "started" and events[-1] == "final"
+    assert sorted(events[1:-1]) == ["item", "item", "item_error"]
+    error = next(data for event, data in frames if event == "item_error")
+    assert (error["index"], error["message"], error["type"]) == (1, "agent failed", "RuntimeError")
+
+
+async def test_final_event_totals_the_items():
+    frames = await collect(request("a", "fail", "cached", "b"), ItemRunner())
+
+    final = frames[-1][1]
+    assert (final["items"], final["failed"]) == (4, 1)
+    assert final["served_by"] == {"agent": 2, "cache": 1}
+    assert final["item_seconds"] >= 0.04
+    assert final["llm_calls"] == 0 and set(final["calls_saved"].values()) == {0}
+
+
+async def test_client_disconnect_cancels_unfinished_items():
+    runner = ItemRunner()
+    stream = stream_batch_recommendations(request("a", "hang", "hang", concurrency=3), runner)
+
+    assert parse(await anext(stream))[0] == "started"
+    assert parse(await anext(stream))[1]["index"] == 0
+    # What the server does when the client goes away mid-stream
+    await stream.aclose()
+    await asyncio.sleep(0)
+
+    assert runner.cancelled == ["hang", "hang"]
+    assert runner.active == 0
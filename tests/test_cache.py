@@ -0,0 +1,224 @@
+import asyncio
+import gc
+import threading
+
+import pytest
+
+from src.cache import TieredCache
+from src.telemetry import track_request
+
+
+def make_cache(store=None) -> TieredCache:
+    return TieredCache("test", max_entries=100, ttl_seconds=60, store=store)
+
+
+class CancellingStore:
+    """
+    Store whose writes are cancelled, as when the event loop cancels the compute task mid-write.
+    """
+
+    async def aget_many(self, keys):
+        return {}
+
+    async def aset_many(self, items, ttl_seconds):
+        raise asyncio.CancelledError()
+
+
+async def test_concurrent_callers_share_one_computation():
+    cache = make_cache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    results = await asyncio.gather(*(cache.aget_or_compute("key", compute) for _ in range(5)))
+
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert cache.stats["coalesced"] == 4
+    assert await cache.aget("key") == "value"
+
+
+async def test_failure_reaches_every_waiter_and_is_not_cached():
+    cache = make_cache()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        *(cache.aget_or_compute("key", compute) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache._inflight == {}
+    assert await cache.aget("key") is None
+
+
+async def test_none_is_not_cached():
+    cache = make_cache()
+
+    async def compute():
+        return None
+
+    assert await cache.aget_or_compute("key", compute) is None
+    assert "key" not in cache._inflight
+    assert await cache.aget("key") is None
+
+
+async def test_many_keys_only_computes_missing_ones():
+    cache = make_cache()
+    await cache.aset("a", 1)
+    requested = []
+
+    async def compute_many(keys):
+        requested.extend(keys)
+        return {key: key.upper() for key in keys}
+
+    results = await cache.aget_or_compute_many(["a", "b", "c", "b"], compute_many)
+
+    assert results == {"a": 1, "b": "B", "c": "C"}
+    assert requested == ["b", "c"]
+
+
+async def test_cancelled_store_write_does_not_strand_waiters():
+    cache = make_cache(store=CancellingStore())
+    started = asyncio.Event()
+
+    async def compute():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "value"
+
+    leader = asyncio.create_task(cache.aget_or_compute("key", compute))
+    await started.wait()
+    follower = asyncio.create_task(cache.aget_or_compute("key", compute))
+
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await asyncio.wait_for(follower, timeout=1) == "value"
+    assert cache._inflight == {}
+
+
+async def test_cancelled_computation_cancels_waiters_and_releases_key():
+    cache = make_cache()
+    started = asyncio.Event()
+
+    async def compute():
+        started.set()
+        await asyncio.sleep(10)
+
+    leader = asyncio.create_task(cache.aget_or_compute("key", compute))
+    await started.wait()
+    follower = asyncio.create_task(cache.aget_or_compute("key", compute))
+    await asyncio.sleep(0)
+    compute_task = next(
+        task for task in asyncio.all_tasks() if task.get_coro().__name__ == "_compute_many_and_store"
+    )
+    compute_task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(follower, timeout=1)
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert cache._inflight == {}
+
+    async def recompute():
+        return "fresh"
+
+    assert await cache.aget_or_compute("key", recompute) == "fresh"
+
+
+def test_threaded_callers_share_one_computation_and_report_coalescing():
+    cache = make_cache()
+    release = threading.Event()
+    computing = threading.Event()
+    calls = 0
+
+    def compute():
+        nonlocal calls
+        calls += 1
+        computing.set()
+        release.wait(timeout=5)
+        return "value"
+
+    results = {}
+    leader = threading.Thread(target=lambda: results.setdefault("leader", cache.get_or_compute("key", compute)))
+    leader.start()
+    computing.wait(timeout=5)
+
+    def follow():
+        with track_request("test") as telemetry:
+            results["follower"] = cache.get_or_compute("key", compute)
+            results["cache_hits"] = telemetry.cache_hits
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    # Let the follower join the flight before the leader finishes
+    for _ in range(100):
+        if cache.stats["coalesced"]:
+            break
+        threading.Event().wait(0.01)
+    release.set()
+    leader.join(timeout=5)
+    follower.join(timeout=5)
+
+    assert results["leader"] == results["follower"] == "value"
+    assert calls == 1
+    assert cache.stats["coalesced"] == 1
+    assert results["cache_hits"] == 1
+
+
+def test_threaded_failure_releases_key():
+    cache = make_cache()
+
+    def compute():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("key", compute)
+    assert cache._flights == {}
+    assert cache.get_or_compute("key", lambda: "value") == "value"
+
+
+async def test_source_tells_cached_coalesced_and_computed_values_apart():
+    cache = make_cache()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    leader, follower = await asyncio.gather(
+        cache.aget_or_compute_with_source("key", compute),
+        cache.aget_or_compute_with_source("key", compute),
+    )
+
+    assert leader == ("value", "computed")
+    assert follower == ("value", "coalesced")
+    assert await cache.aget_or_compute_with_source("key", compute) == ("value", "cache")
+
+
+async def test_failed_computation_of_a_cancelled_caller_is_not_reported_unhandled():
+    cache = make_cache()
+    loop = asyncio.get_running_loop()
+    unhandled = []
+    loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("boom")
+
+    caller = asyncio.create_task(cache.aget_or_compute("key", compute))
+    await asyncio.sleep(0.01)
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    # Let the computation finish and fail with nobody awaiting it
+    await asyncio.sleep(0.1)
+    gc.collect()
+
+    assert unhandled == []
+    loop.set_exception_handler(None)
@@ -0,0 +1,97 @@
+import json
+
+import src.distill as distill
+
+PAGE = "\n".join([
+    "Home",
+    "[Products](https://example.com/products) [About](https://example.com/about)",
+    "We use cookies to improve your experience. Accept all",
+    "Nova Sensors is an ISO 9001 certified manufacturer of industrial sensors in Shenzhen.",
+    "Nova Sensors is an ISO 9001 certified manufacturer of industrial sensors in Shenzhen.",
+    "---",
+    "",
+    "MOQ is 1,000 units at $12 per unit, with a lead time of 2-4 weeks.",
+    "© 2024 Nova Sensors. All rights reserved.",
+])
+
+
+def filler(sentences: int) -> str:
+    return " ".join(f"Our team enjoys sentence number {number} about company history." for number in range(sentences))
+
+
+def test_boilerplate_markup_and_repeated_lines_are_stripped():
+    assert distill.strip_boilerplate(PAGE) == (
+        "Nova Sensors is an ISO 9001 certified manufacturer of industrial sensors in Shenzhen.\n"
+        "\n"
+        "MOQ is 1,000 units at $12 per unit, with a lead time of 2-4 weeks."
+    )
+
+
+def test_text_within_budget_is_returned_unchanged():
+    assert distill.distill_text(PAGE, token_budget=10_000) == (PAGE, False)
+
+
+def test_high_signal_passages_are_kept_within_the_budget():
+    facts = "MOQ is 1,000 units at $12 per unit, with a lead time of 2-4 weeks."
+    text = "\n\n".join([filler(5), filler(6), facts, filler(7)])
+    budget = distill.count_tokens(facts) + 5
+
+    distilled, truncated = distill.distill_text(text, token_budget=budget)
+
+    assert truncated is True
+    assert facts in distilled
+    assert distill.count_tokens(distilled) <= budget
+
+
+def test_each_search_result_gets_its_share_of_the_budget():
+    response = {
+        "query": "sensor suppliers",
+        "images": ["https://example.com/logo.png"],
+        "results": [
+            {"title": f"Supplier {number}", "url": f"https://example{number}.com", "content": filler(80), "raw_content": "x"}
+            for number in range(4)
+        ],
+    }
+
+    distilled = distill.distill_search_response(response, token_budget=400)
+
+    assert set(distilled) == {"query", "results", "distillation"}
+    for result in distilled["results"]:
+        assert set(result) == {"title", "url", "content", "truncated"}
+        assert distill.count_tokens(result["content"]) <= 100
+    # The input is shared with the Tavily cache and must not change
+    assert response["results"][0]["raw_content"] == "x" and "images" in response
+
+
+def test_per_page_floor_applies_when_many_pages_share_the_budget():
+    pages = [{"url": f"https://example{number}.com", "raw_content": filler(200)} for number in range(10)]
+
+    distilled, _ = distill.distill_extract_results(pages, token_budget=1000)
+
+    assert len(distilled) == 10
+    assert all(distill.count_tokens(page["raw_content"]) <= distill.EXTRACT_PAGE_MIN_TOKENS for page in distilled)
+    assert any(distill.count_tokens(page["raw_content"]) > 100 for page in distilled)
+
+
+def test_report_counts_original_and_distilled_tokens():
+    pages = [{"url": "https://example.com", "raw_content": filler(200)}]
+
+    distilled, report = distill.distill_extract_results(pages, token_budget=300)
+
+    assert report["original_tokens"] == distill.count_tokens(json.dumps({"results": pages}))
+    assert report["distilled_tokens"] == distill.count_tokens(json.dumps({"results": distilled}))
+    assert report["distilled_tokens"] < report["original_tokens"]
+
+
+def test_chars_over_four_estimate_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(distill, "_get_encoding", lambda: None)
+
+    assert distill.count_tokens("") == 0
+    assert distill.count_tokens("x" * 400) == 101
+    assert distill.truncate_to_tokens("x" * 400, 10) == "x" * 39
+    assert distill.count_tokens(distill.truncate_to_tokens("x" * 400, 10)) == 10
+    # Over-budget text with no passage that fits keeps the head of the best one
+    text = "Price $12 per unit " * 200
+    distilled, truncated = distill.distill_text(text, token_budget=20)
+    assert truncated is True
+    assert len(distilled) == 79 and distilled in text
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+import src.tools as tools
+
+URLS = [f"https://supplier{index}.com/" for index in range(6)]
+SLOW_URL = "https://supplier4.com/"
+
+
+def extracted(urls: list[str]) -> dict:
+    return {"results": [{"url": url, "raw_content": f"page {url}"} for url in urls]}
+
+
+class FakeExtract:
+    """
+    Tavily extract stand-in; a chunk containing SLOW_URL overruns the timeout.
+    """
+
+    def invoke(self, payload: dict) -> dict:
+        if SLOW_URL in payload["urls"]:
+            time.sleep(1)
+        if "https://supplier0.com/" in payload["urls"]:
+            raise RuntimeError("Tavily unavailable")
+        return extracted(payload["urls"])
+
+    async def ainvoke(self, payload: dict) -> dict:
+        if SLOW_URL in payload["urls"]:
+            await asyncio.sleep(1)
+        if "https://supplier0.com/" in payload["urls"]:
+            raise RuntimeError("Tavily unavailable")
+        return extracted(payload["urls"])
+
+
+@pytest.fixture(autouse=True)
+def fake_extract(monkeypatch):
+    monkeypatch.setattr(tools, "tavily_extract", FakeExtract())
+    monkeypatch.setattr(tools, "_extract_cache", lambda: None)
+    monkeypatch.setattr(tools, "EXTRACT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(tools, "EXTRACT_CHUNK_TIMEOUT", 0.2)
+
+
+def assert_partial_results(result: dict) -> None:
+    # Chunks: [0, 1] fails, [2, 3] succeeds, [4, 5] times out
+    assert [page["url"] for page in result["results"]] == ["https://supplier2.com/", "https://supplier3.com/"]
+    errors = {failure["url"]: failure["error"] for failure in result["failed_results"]}
+    assert errors == {
+        "https://supplier0.com/": "Tavily unavailable",
+        "https://supplier1.com/": "Tavily unavailable",
+        "https://supplier4.com/": "Timed out after 0.2s",
+        "https://supplier5.com/": "Timed out after 0.2s",
+    }
+
+
+def test_sync_extract_keeps_chunks_that_finish_in_time():
+    started = time.monotonic()
+
+    result = tools._fetch_extract(URLS)
+
+    assert time.monotonic() - started < 0.8
+    assert_partial_results(result)
+
+
+async def test_async_extract_keeps_chunks_that_finish_in_time():
+    assert_partial_results(await tools._afetch_extract(URLS))
+
+
+def test_sync_extract_times_queued_chunks_from_when_they_start(monkeypatch):
+    class SteadyExtract:
+        def invoke(self, payload: dict) -> dict:
+            time.sleep(0.15)
+            return extracted(payload["urls"])
+
+    monkeypatch.setattr(tools, "tavily_extract", SteadyExtract())
+    monkeypatch.setattr(tools, "EXTRACT_MAX_WORKERS", 1)
+    monkeypatch.setattr(tools, "EXTRACT_CHUNK_TIMEOUT", 0.3)
+
+    result = tools._fetch_extract(URLS)
+
+    assert len(result["results"]) == len(URLS)
+    assert result["failed_results"] == []
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import src.tools as tools
+from src.fanout import merge_search_responses
+from src.frontier import frontier_scope
+
+
+def response(*urls: str) -> dict:
+    return {"results": [{"url": url, "title": url, "content": f"about {url}"} for url in urls]}
+
+
+def test_pages_found_by_several_queries_rank_first():
+    merged = merge_search_responses(
+        [
+            ("q1", response("https://a.com/1", "https://b.com/1", "https://c.com/1")),
+            ("q2", response("https://d.com/1", "https://c.com/1")),
+            ("q3", response("https://c.com/1")),
+        ],
+        max_results=10,
+        per_domain=2,
+    )
+
+    assert merged[0]["url"] == "https://c.com/1"
+    assert merged[0]["queries"] == ["q1", "q2", "q3"]
+    assert merged[0]["score"] > merged[1]["score"]
+
+
+def test_url_spellings_are_merged_and_keep_best_ranked_fields():
+    merged = merge_search_responses(
+        [
+            ("q1", response("https://example.com/page", "http://www.example.com/page/")),
+            ("q2", response("https://www.example.com/page?utm_source=x")),
+        ],
+        max_results=10,
+        per_domain=5,
+    )
+
+    assert len(merged) == 1
+    assert merged[0]["url"] == "https://example.com/page"
+    assert merged[0]["queries"] == ["q1", "q2"]
+
+
+def test_per_domain_cap_and_result_limit():
+    urls = [f"https://directory.com/{index}" for index in range(5)] + ["https://other.com/1", "https://third.com/1"]
+    merged = merge_search_responses([("q", response(*urls))], max_results=3, per_domain=2)
+
+    assert [item["url"] for item in merged] == [
+        "https://directory.com/0",
+        "https://directory.com/1",
+        "https://other.com/1",
+    ]
+
+
+def test_failed_and_empty_responses_are_ignored():
+    merged = merge_search_responses(
+        [
+            ("q1", {"error": "timeout"}),
+            ("q2", None),
+            ("q3", {"results": [{"title": "no url"}]}),
+            ("q4", response("https://a.com/1")),
+        ],
+        max_results=10,
+        per_domain=2,
+    )
+
+    assert [item["url"] for item in merged] == ["https://a.com/1"]
+
+
+def test_sync_fan_out_returns_other_results_when_one_query_times_out(monkeypatch):
+    def fetch(query):
+        if query == "slow":
+            time.sleep(1)
+        return response(f"https://{query}.com/1")
+
+    monkeypatch.setattr(tools, "_fetch_search", fetch)
+    monkeypatch.setattr(tools, "WEB_SEARCH_MANY_QUERY_TIMEOUT", 0.2)
+    started = time.monotonic()
+    with frontier_scope() as frontier:
+        result = tools._web_search_many(["fast", "slow", "quick"])
+
+        # The timed-out query can be searched again later in the run
+        assert frontier.claim_query("slow")
+        assert not frontier.claim_query("fast")
+
+    assert time.monotonic() - started < 0.8
+    assert {item["url"] for item in result["results"]} == {"https://fast.com/1", "https://quick.com/1"}
+    assert result["failed_queries"] == [{"query": "slow", "error": "Timed out after 0.2s"}]
+
+
+def test_sync_fan_out_times_queued_queries_from_when_they_start(monkeypatch):
+    def fetch(query):
+        time.sleep(0.15)
+        return response(f"https://{query}.com/1")
+
+    monkeypatch.setattr(tools, "_fetch_search", fetch)
+    monkeypatch.setattr(tools, "WEB_SEARCH_MANY_QUERY_TIMEOUT", 0.3)
+    monkeypatch.setattr(tools, "WEB_SEARCH_MANY_CONCURRENCY", 1)
+
+    # Three queries one at a time take longer than one timeout, but none overruns its own
+    result = tools._web_search_many(["a", "b", "c"])
+
+    assert "failed_queries" not in result
+    assert len(result["results"]) == 3
+
+
+async def test_async_fan_out_returns_other_results_when_one_query_times_out(monkeypatch):
+    async def fetch(query):
+        if query == "slow":
+            await asyncio.sleep(1)
+        return response(f"https://{query}.com/1")
+
+    monkeypatch.setattr(tools, "_afetch_search", fetch)
+    monkeypatch.setattr(tools, "WEB_SEARCH_MANY_QUERY_TIMEOUT", 0.2)
+    with frontier_scope() as frontier:
+        result = await tools._aweb_search_many(["fast", "slow"])
+
+        assert frontier.claim_query("slow")
+
+    assert [item["url"] for item in result["results"]] == ["https://fast.com/1"]
+    assert result["failed_queries"] == [{"query": "slow", "error": "Timed out after 0.2s"}]
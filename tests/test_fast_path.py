@@ -0,0 +1,62 @@
+import pytest
+
+from src.fast_path import FastPathQuery, _is_relevant, extract_query_filters, location_matches
+
+
+@pytest.mark.parametrize(
+    "query, location",
+    [
+        ("Organic cotton fabric manufacturers in India, GOTS certified", "India"),
+        ("CNC machining suppliers in the United States", "United States"),
+        ("PCB assembly in the USA under $5 per unit", "USA"),
+        ("Corrugated boxes from the UK", "UK"),
+        ("Flower bulbs from The Netherlands", "Netherlands"),
+        ("Injection molding based in Shenzhen", "Shenzhen"),
+        ("Lithium battery packs with UL certification", None),
+    ],
+)
+def test_location_extraction(query, location):
+    assert extract_query_filters(query).location == location
+
+
+def test_location_words_do_not_leak_into_the_subject():
+    extracted = extract_query_filters("CNC machining suppliers in the United States")
+
+    assert extracted.subject == ["CNC", "machining"]
+
+
+def test_filters_are_extracted_alongside_the_location():
+    extracted = extract_query_filters(
+        "ISO 9001 certified PCB assembly in the USA under $5 per unit, lead time within 3 weeks, MOQ 500 units"
+    )
+
+    assert extracted.location == "USA"
+    assert extracted.certifications == ["ISO 9001"]
+    assert extracted.max_price_usd == 5
+    assert extracted.max_lead_time_days == 21
+    assert extracted.max_moq_units == 500
+    assert extracted.subject == ["PCB", "assembly"]
+
+
+@pytest.mark.parametrize(
+    "wanted, have, expected",
+    [
+        ("United States", "Austin, Texas, USA", True),
+        ("USA", "Detroit, Michigan, United States", True),
+        ("U.S.", "Ohio, US", True),
+        ("US", "Houston, Texas", False),
+        ("UK", "Manchester, United Kingdom", True),
+        ("India", "Tiruppur, India", True),
+        ("India", "Indianapolis, USA", False),
+    ],
+)
+def test_location_matches_aliases(wanted, have, expected):
+    assert location_matches(wanted, have) is expected
+
+
+def test_relevance_uses_location_aliases():
+    fast_query = FastPathQuery(subject=["CNC", "machining"], location="United States")
+    supplier = {"company_name": "Apex Precision", "location": "Ohio, USA", "specialties": ["CNC Machining"]}
+
+    assert _is_relevant(supplier, fast_query)
+    assert not _is_relevant({**supplier, "location": "Ontario, Canada"}, fast_query)
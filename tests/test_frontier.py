@@ -0,0 +1,97 @@
+import contextvars
+
+import src.tools as tools
+from src.frontier import CrawlFrontier, current_frontier, frontier_scope
+
+
+def response(*urls: str) -> dict:
+    return {"results": [{"url": url, "title": url, "content": f"about {url}"} for url in urls]}
+
+
+def test_repeated_query_is_claimed_once():
+    frontier = CrawlFrontier()
+
+    assert frontier.claim_query("Steel  Bolts")
+    assert not frontier.claim_query("steel bolts")
+    assert frontier.stats["searches_skipped"] == 1
+
+
+def test_released_query_can_be_claimed_again():
+    frontier = CrawlFrontier()
+    frontier.claim_query("steel bolts")
+    frontier.release_query("Steel Bolts")
+
+    assert frontier.claim_query("steel bolts")
+
+
+def test_only_exact_pages_are_collapsed():
+    frontier = CrawlFrontier()
+    frontier.record_extracted([{"url": "https://www.alibaba.com/product/1"}])
+    frontier.collapse_search_results(response("https://example.com/a"))
+
+    collapsed = frontier.collapse_search_results(
+        response(
+            "https://alibaba.com/product/1/",
+            "https://www.alibaba.com/product/2",
+            "https://example.com/a?utm_source=x",
+        )
+    )["results"]
+
+    assert collapsed[0] == {"url": "https://alibaba.com/product/1/", "title": "https://alibaba.com/product/1/", "already_seen": True}
+    # Another listing on the same marketplace keeps its snippet
+    assert collapsed[1]["content"] == "about https://www.alibaba.com/product/2"
+    assert collapsed[2]["already_seen"] is True
+    assert frontier.stats["results_collapsed"] == 2
+
+
+def test_split_extract_urls_skips_extracted_pages():
+    frontier = CrawlFrontier()
+    frontier.record_extracted([{"url": "https://example.com/a"}])
+
+    fetch, known = frontier.split_extract_urls(["https://www.example.com/a/", "https://example.com/b"])
+
+    assert fetch == ["https://example.com/b"]
+    assert known == [{"url": "https://www.example.com/a/", "already_extracted": True}]
+
+
+def test_failed_search_is_not_reported_as_already_searched(monkeypatch):
+    calls = []
+
+    def fetch(query):
+        calls.append(query)
+        if len(calls) == 1:
+            raise RuntimeError("Tavily unavailable")
+        return response("https://example.com/a")
+
+    monkeypatch.setattr(tools, "_fetch_search", fetch)
+    with frontier_scope():
+        assert tools._web_search("steel bolts")["error"] == "Tavily unavailable"
+        retried = tools._web_search("steel bolts")
+        repeated = tools._web_search("steel bolts")
+
+    assert calls == ["steel bolts", "steel bolts"]
+    assert retried["results"]
+    assert repeated["already_searched"] == ["steel bolts"]
+
+
+async def test_failed_fan_out_variants_stay_retryable(monkeypatch):
+    async def fetch(query):
+        if query == "bad":
+            raise RuntimeError("Tavily unavailable")
+        return response(f"https://example.com/{query}")
+
+    monkeypatch.setattr(tools, "_afetch_search", fetch)
+    with frontier_scope() as frontier:
+        result = await tools._aweb_search_many(["good", "bad"])
+
+        assert result["failed_queries"][0]["query"] == "bad"
+        assert not frontier.claim_query("good")
+        assert frontier.claim_query("bad")
+
+
+def test_scope_exited_from_another_context_does_not_raise():
+    scope = frontier_scope()
+    contextvars.copy_context().run(scope.__enter__)
+    scope.__exit__(None, None, None)
+
+    assert current_frontier() is None
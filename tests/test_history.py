@@ -0,0 +1,113 @@
+import pytest
+
+import src.history as history
+from src.cache import TieredCache
+from src.prompts import SUMMARY_ROLE
+
+
+def conversation(length: int) -> list[dict]:
+    return [
+        {"role": "user" if number % 2 == 0 else "assistant", "content": f"message {number} " + "detail " * 30}
+        for number in range(length)
+    ]
+
+
+class RecordingSummarizer:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls: list[tuple] = []
+
+    async def __call__(self, previous_summary, messages):
+        self.calls.append((previous_summary, [message["content"].split()[1] for message in messages]))
+        if self.fail:
+            raise RuntimeError("LLM unavailable")
+        return f"summary of {len(messages)} after {previous_summary}"
+
+
+class CountingStore:
+    def __init__(self):
+        self.reads: list[list[str]] = []
+        self.values: dict = {}
+
+    async def aget_many(self, keys):
+        self.reads.append(keys)
+        return {key: self.values[key] for key in keys if key in self.values}
+
+    async def aset_many(self, items, ttl_seconds):
+        self.values.update(items)
+
+
+@pytest.fixture
+def store():
+    return CountingStore()
+
+
+@pytest.fixture
+def summarizer(monkeypatch, store):
+    summarizer = RecordingSummarizer()
+    cache = TieredCache("history_summaries", max_entries=100, ttl_seconds=60, store=store)
+    monkeypatch.setattr(history, "_summarize", summarizer)
+    monkeypatch.setattr(history, "get_history_summary_cache", lambda: cache)
+    monkeypatch.setattr(history, "HISTORY_TOKEN_BUDGET", 200)
+    monkeypatch.setattr(history, "HISTORY_SUMMARY_MAX_TOKENS", 50)
+    monkeypatch.setattr(history, "HISTORY_KEEP_TURNS", 2)
+    return summarizer
+
+
+async def test_history_under_budget_is_unchanged(summarizer):
+    messages = conversation(2)
+
+    assert await history.compact_chat_history(messages) is messages
+    assert summarizer.calls == []
+
+
+async def test_long_history_becomes_a_summary_and_the_recent_turns(summarizer):
+    messages = conversation(10)
+
+    compacted = await history.compact_chat_history(messages)
+
+    assert compacted[0] == {"role": SUMMARY_ROLE, "content": "summary of 8 after None"}
+    assert compacted[1:] == messages[-2:]
+    assert summarizer.calls == [(None, [str(number) for number in range(8)])]
+
+
+async def test_extended_history_reuses_the_cached_prefix_summary(summarizer, store):
+    cache = history.get_history_summary_cache()
+    await history.compact_chat_history(conversation(10))
+    store.reads.clear()
+
+    compacted = await history.compact_chat_history(conversation(12))
+
+    # Only the two messages added since the last summary are summarized
+    assert summarizer.calls[-1] == ("summary of 8 after None", ["8", "9"])
+    assert compacted[0]["content"] == "summary of 2 after summary of 8 after None"
+    # The exact prefix, then only the one longer prefix ahead of the summary found in memory
+    assert [len(keys) for keys in store.reads] == [1, 1]
+    assert cache.stats["hits"] == 0 and cache.stats["misses"] == 2
+
+    # The same history again is an exact hit
+    await history.compact_chat_history(conversation(12))
+    assert len(summarizer.calls) == 2
+    assert cache.stats["hits"] == 1
+
+
+async def test_earlier_summaries_are_probed_longest_first_within_the_limit(summarizer, store, monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_SUMMARY_PROBE_LIMIT", 3)
+    await history.compact_chat_history(conversation(10))
+    history.get_history_summary_cache().memory.clear()
+    store.reads.clear()
+
+    await history.compact_chat_history(conversation(12))
+
+    # Exact prefix of 10 messages, then prefixes of 9, 8 and 7 in one read; 8 has a summary
+    assert [len(keys) for keys in store.reads] == [1, 3]
+    assert summarizer.calls[-1] == ("summary of 8 after None", ["8", "9"])
+
+
+async def test_summarizer_failure_drops_the_older_turns(summarizer):
+    summarizer.fail = True
+    messages = conversation(10)
+
+    compacted = await history.compact_chat_history(messages)
+
+    assert compacted == messages[-2:]
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+import src.jobs as jobs
+from src.jobs import RecommendationJobWorker
+from src.models import SupplierExplorationAgentResponse
+from src.runner import AgentRunFailed
+
+JOB = {"_id": "job-1", "request": {"query": "CNC machining suppliers in Germany"}}
+SUPPLIER = {
+    "company_name": "Apex Precision GmbH",
+    "location": "Stuttgart, Germany",
+    "rating": 4.6,
+    "price_range": "$10-20 USD",
+    "lead_time": "2-4 weeks",
+    "moq": "100 units",
+    "certifications": ["ISO 9001"],
+    "specialties": ["CNC Machining"],
+    "response_time": "1-2 days",
+    "stock": "In stock",
+    "time_zone": "GMT+1",
+    "contact": {"website": "https://apex.example.com", "phone": "+49 711", "email": "sales@apex.example.com"},
+}
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    worker = RecommendationJobWorker(concurrency=1)
+    worker.finished = []
+    worker.released = []
+
+    async def finish(job_id, telemetry, result=None, served_by=None, error=None):
+        worker.finished.append({"result": result, "served_by": served_by, "error": error})
+
+    async def release(job_id):
+        worker.released.append(job_id)
+
+    async def update_owned(job_id, update):
+        return True
+
+    monkeypatch.setattr(worker, "_finish", finish)
+    monkeypatch.setattr(worker, "_release", release)
+    monkeypatch.setattr(worker, "_update_owned", update_owned)
+    return worker
+
+
+def use_recommend(monkeypatch, recommend):
+    monkeypatch.setattr(jobs, "recommend", recommend)
+
+
+async def test_successful_run_stores_the_result(worker, monkeypatch):
+    async def recommend(requirements, bypass_cache, wait_for_slot):
+        return SupplierExplorationAgentResponse(suppliers=[SUPPLIER]), "agent"
+
+    use_recommend(monkeypatch, recommend)
+    await worker._execute(JOB)
+
+    assert worker.finished[0]["error"] is None
+    assert worker.finished[0]["served_by"] == "agent"
+    assert worker.finished[0]["result"]["suppliers"][0]["company_name"] == "Apex Precision GmbH"
+
+
+async def test_failed_agent_run_fails_the_job(worker, monkeypatch):
+    async def recommend(requirements, bypass_cache, wait_for_slot):
+        raise AgentRunFailed("rate limited")
+
+    use_recommend(monkeypatch, recommend)
+    await worker._execute(JOB)
+
+    assert worker.finished == [{"result": None, "served_by": None, "error": "Agent run failed: rate limited"}]
+
+
+async def test_empty_response_fails_the_job(worker, monkeypatch):
+    async def recommend(requirements, bypass_cache, wait_for_slot):
+        return SupplierExplorationAgentResponse(suppliers=[]), "agent"
+
+    use_recommend(monkeypatch, recommend)
+    await worker._execute(JOB)
+
+    assert worker.finished[0]["error"] == "No suppliers found"
+
+
+async def test_lost_lease_cancels_the_run(worker, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.04)
+    cancelled = asyncio.Event()
+
+    async def recommend(requirements, bypass_cache, wait_for_slot):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def update_owned(job_id, update):
+        return False
+
+    use_recommend(monkeypatch, recommend)
+    monkeypatch.setattr(worker, "_update_owned", update_owned)
+    await asyncio.wait_for(worker._execute(JOB), timeout=1)
+
+    assert cancelled.is_set()
+    assert worker.finished == []
+    assert worker.released == []
+    assert worker.stats["lease_lost"] == 1
+
+
+async def test_transient_renewal_errors_do_not_stop_the_run(worker, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.2)
+    renewals = []
+
+    async def recommend(requirements, bypass_cache, wait_for_slot):
+        await asyncio.sleep(0.25)
+        return SupplierExplorationAgentResponse(suppliers=[SUPPLIER]), "agent"
+
+    async def update_owned(job_id, update):
+        renewals.append(update)
+        if len(renewals) == 1:
+            raise ConnectionError("mongo unavailable")
+        return True
+
+    use_recommend(monkeypatch, recommend)
+    monkeypatch.setattr(worker, "_update_owned", update_owned)
+    await worker._execute(JOB)
+
+    assert len(renewals) >= 2
+    assert worker.finished[0]["error"] is None
+
+
+async def test_shutdown_hands_the_job_back(worker, monkeypatch):
+    started = asyncio.Event()
+
+    async def recommend(requirements, bypass_cache, wait_for_slot):
+        started.set()
+        await asyncio.sleep(10)
+
+    use_recommend(monkeypatch, recommend)
+    execute = asyncio.create_task(worker._execute(JOB))
+    await started.wait()
+    execute.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await execute
+    assert worker.released == ["job-1"]
+    assert worker.finished == []
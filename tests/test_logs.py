@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+import src.logs as logs
+from src.config import REQUEST_ID_HEADER
+from src.utils import get_logger
+
+logger = get_logger()
+
+
+@pytest.fixture
+def records():
+    records = []
+    logger.configure(patcher=logs._add_request_id)
+    handler_id = logger.add(lambda message: records.append(message.record), level="DEBUG", filter=logs._keep_record)
+    yield records
+    logger.remove(handler_id)
+    logger.configure(patcher=None)
+
+
+async def call(app, headers: list[tuple[bytes, bytes]] = ()) -> dict:
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": list(headers)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await logs.RequestIdMiddleware(app)(scope, receive, send)
+    return dict(messages[0]["headers"])
+
+
+async def app(scope, receive, send):
+    logger.info("handling request")
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    # Records from a task the request starts carry the same id
+    await asyncio.create_task(log_in_task())
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def log_in_task():
+    logger.info("working in a task")
+
+
+async def test_request_id_reaches_log_records_and_the_response_header(records):
+    headers = await call(app)
+
+    request_id = headers[REQUEST_ID_HEADER.lower().encode()].decode()
+    assert len(request_id) == 16
+    assert [record["extra"]["request_id"] for record in records] == [request_id, request_id]
+    # Outside a request records fall back to a placeholder
+    logger.info("between requests")
+    assert records[-1]["extra"]["request_id"] == "-"
+
+
+async def test_caller_supplied_request_id_is_reused(records):
+    header = REQUEST_ID_HEADER.lower().encode()
+
+    headers = await call(app, [(header, b"upstream-1234")])
+
+    assert headers[header] == b"upstream-1234"
+    assert {record["extra"]["request_id"] for record in records} == {"upstream-1234"}
+
+
+async def test_unprintable_or_long_request_ids_are_replaced(records):
+    header = REQUEST_ID_HEADER.lower().encode()
+
+    for incoming in (b"x" * 65, b"bad\nid"):
+        headers = await call(app, [(header, incoming)])
+        assert headers[header] != incoming and len(headers[header]) == 16
+
+
+def test_debug_sampling_is_deterministic_per_request_id(monkeypatch):
+    monkeypatch.setattr(logs, "LOG_DEBUG_SAMPLE_RATE", 0.25)
+    request_ids = [f"request-{number}" for number in range(2000)]
+
+    first = [logs.new_log_context(request_id).debug for request_id in request_ids]
+
+    assert first == [logs.new_log_context(request_id).debug for request_id in request_ids]
+    assert 0.2 < sum(first) / len(first) < 0.3
+
+    monkeypatch.setattr(logs, "LOG_DEBUG_SAMPLE_RATE", 0.0)
+    assert not any(logs.new_log_context(request_id).debug for request_id in request_ids)
+    monkeypatch.setattr(logs, "LOG_DEBUG_SAMPLE_RATE", 1.0)
+    assert all(logs.new_log_context(request_id).debug for request_id in request_ids)
+
+
+def test_debug_records_are_kept_only_for_sampled_requests(records, monkeypatch):
+    monkeypatch.setattr(logs, "_min_level_no", logger.level("INFO").no)
+
+    for request_id, debug in (("traced", True), ("untraced", False)):
+        token = logs.bind_log_context(logs.LogContext(request_id, debug=debug))
+        try:
+            logger.debug("verbose detail")
+            logger.info("summary")
+        finally:
+            logs.reset_log_context(token)
+
+    assert [(record["extra"]["request_id"], record["level"].name) for record in records] == [
+        ("traced", "DEBUG"),
+        ("traced", "INFO"),
+        ("untraced", "INFO"),
+    ]
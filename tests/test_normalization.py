@@ -0,0 +1,106 @@
+import pytest
+
+from src.models import SupplierSearchIndexQuery
+from src.normalization import (
+    normalized_supplier_fields,
+    parse_lead_time_days,
+    parse_moq_units,
+    parse_price_range,
+    stale_normalized_fields,
+)
+from src.retrieval import SupplierRetrievalIndex
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("$10-20 USD", (10, 20)),
+        ("$10 to $20", (10, 20)),
+        ("$1.5k - 2k", (1500, 2000)),
+        ("$10-20k", (10000, 20000)),
+        ("$500 - $1.2k", (500, 1200)),
+        ("$1,500-2k", (1500, 2000)),
+        ("under $15", (0, 15)),
+        ("Under $2.5k per batch", (0, 2500)),
+        ("less than $8 USD", (0, 8)),
+        ("Up to $15 per unit", (0, 15)),
+        ("from $8", (8, None)),
+        ("$50+", (50, None)),
+        ("$12", (12, 12)),
+        ("€10-20", (None, None)),
+        ("10-20 EUR", (None, None)),
+        ("¥50-80", (None, None)),
+        ("RMB 50-80 per piece", (None, None)),
+        ("under £15", (None, None)),
+        ("CA$10-20", (None, None)),
+        ("HK$ 100", (None, None)),
+        ("US$10-20", (10, 20)),
+        ("Contact for pricing", (None, None)),
+        (None, (None, None)),
+    ],
+)
+def test_parse_price_range(text, expected):
+    assert parse_price_range(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2-4 weeks", (14, 28)),
+        ("10-15 business days", (14, 21)),
+        ("48 hours", (2, 2)),
+        ("1 month", (30, 30)),
+        ("2 weeks - 1 month", (14, 30)),
+        ("10 days to 3 weeks", (10, 21)),
+        ("1-2 months", (30, 60)),
+        ("5 business days - 2 weeks", (7, 14)),
+        ("24 hours to 3 days", (1, 3)),
+        ("1 month - 2 weeks", (14, 30)),
+        ("within 3 weeks", (None, 21)),
+        ("15", (15, 15)),
+        ("Ask supplier", (None, None)),
+    ],
+)
+def test_parse_lead_time_days(text, expected):
+    assert parse_lead_time_days(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("1,000 pcs", 1000),
+        ("5k units", 5000),
+        ("500-1000 units", 500),
+        ("No MOQ", 0),
+        ("Negotiable", None),
+    ],
+)
+def test_parse_moq_units(text, expected):
+    assert parse_moq_units(text) == expected
+
+
+def test_normalized_fields_skip_unparsed_values():
+    fields = normalized_supplier_fields({"price_range": "€10", "lead_time": "2-4 weeks", "moq": "1,000 pcs"})
+
+    assert fields == {"lead_time_min_days": 14, "lead_time_max_days": 28, "moq_units": 1000}
+
+
+def test_stale_fields_are_cleared_only_for_written_sources():
+    supplier = {"price_range": "Contact us", "lead_time": "2 weeks"}
+    parsed = normalized_supplier_fields(supplier)
+
+    assert stale_normalized_fields(supplier, parsed) == ["price_min_usd", "price_max_usd"]
+
+
+@pytest.mark.parametrize("price_range", ["under $5", "up to $3 per unit", "below USD 10"])
+def test_upper_bound_only_prices_pass_max_price_filters(price_range):
+    supplier = {"company_name": "Nova Sensors", "price_range": price_range, "contact": {"website": "https://nova.example.com"}}
+    search_query = SupplierSearchIndexQuery(max_price_usd=12)
+
+    # MongoDB compares price_min_usd against the budget
+    assert normalized_supplier_fields(supplier)["price_min_usd"] <= search_query.build_filter()["price_min_usd"]["$lte"]
+
+    index = SupplierRetrievalIndex()
+    index.load([supplier])
+    suppliers, _ = index.search(search_query, offset=0, limit=10)
+    assert [item["company_name"] for item in suppliers] == ["Nova Sensors"]
@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+import src.persistence as persistence
+from src.persistence import SupplierWriteBehindQueue
+
+
+def supplier(name: str) -> dict:
+    return {"company_name": name, "location": "Shenzhen, China", "price_range": "$10-20 USD"}
+
+
+class FakeCollection:
+    def __init__(self):
+        self.writes: list[int] = []
+        self.errors: list[Exception] = []
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.writes.append(len(operations))
+        return SimpleNamespace(upserted_count=len(operations), modified_count=0)
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(persistence, "get_async_supplier_db_and_collection", lambda: (None, collection))
+    return collection
+
+
+def suppliers(start: int, count: int) -> list[dict]:
+    return [supplier(f"Supplier {number}") for number in range(start, start + count)]
+
+
+async def test_full_batch_is_flushed_without_waiting_for_the_interval(collection):
+    queue = SupplierWriteBehindQueue(batch_size=4, flush_interval=60)
+    queue.start()
+
+    queue.enqueue(suppliers(0, 2))
+    queue.enqueue(suppliers(2, 2))
+    await asyncio.sleep(0.05)
+
+    assert collection.writes == [4]
+    assert queue.stats["flushed"] == 4 and queue.stats["batches"] == 1
+    await queue.stop()
+
+
+async def test_partial_batch_is_flushed_when_the_interval_elapses(collection):
+    queue = SupplierWriteBehindQueue(batch_size=100, flush_interval=0.05)
+    queue.start()
+
+    queue.enqueue(suppliers(0, 1))
+    queue.enqueue(suppliers(1, 1))
+    await asyncio.sleep(0.01)
+    assert collection.writes == []
+
+    await asyncio.sleep(0.1)
+    # Both requests went out as one bulk write
+    assert collection.writes == [2]
+    await queue.stop()
+
+
+async def test_transient_errors_are_retried(collection):
+    collection.errors = [AutoReconnect("primary stepped down"), AutoReconnect("primary stepped down")]
+    queue = SupplierWriteBehindQueue(batch_size=1, flush_interval=60, retry_backoff=0.01)
+    queue.start()
+
+    queue.enqueue(suppliers(0, 1))
+    await asyncio.sleep(0.1)
+
+    assert collection.writes == [1]
+    assert queue.stats["retries"] == 2 and queue.stats["failed"] == 0
+    await queue.stop()
+
+
+async def test_permanent_errors_are_not_retried(collection):
+    collection.errors = [OperationFailure("not authorized")]
+    queue = SupplierWriteBehindQueue(batch_size=1, flush_interval=60, retry_backoff=0.01)
+    queue.start()
+
+    queue.enqueue(suppliers(0, 1))
+    await asyncio.sleep(0.05)
+
+    assert collection.writes == []
+    assert queue.stats["retries"] == 0 and queue.stats["failed"] == 1
+    await queue.stop()
+
+
+async def test_stop_drains_every_queued_batch(collection):
+    queue = SupplierWriteBehindQueue(batch_size=3, flush_interval=60)
+    queue.start()
+    for start in range(0, 10, 2):
+        assert queue.enqueue(suppliers(start, 2))
+
+    await queue.stop(timeout=1)
+
+    assert sum(collection.writes) == 10
+    assert queue.stats["flushed"] == queue.stats["enqueued"] == 10
+    assert not queue.running
+    # Once stopped, callers are told to write directly
+    assert queue.enqueue(suppliers(10, 1)) is False
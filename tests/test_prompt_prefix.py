@@ -0,0 +1,11 @@
+from benchmarks.prompt_prefix_check import measure_prefix
+
+# OpenAI only caches prompt prefixes of at least this many tokens
+MIN_CACHED_PREFIX_TOKENS = 1024
+
+
+def test_requests_share_the_full_static_prefix():
+    measured = measure_prefix()
+
+    assert measured["shared_bytes"] >= measured["static_bytes"]
+    assert measured["shared_tokens"] >= MIN_CACHED_PREFIX_TOKENS
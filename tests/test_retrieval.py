@@ -0,0 +1,127 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from src.models import SupplierSearchIndexQuery
+from src.retrieval import SupplierRetrievalIndex
+
+
+def supplier(name: str, specialties: list[str], location: str = "Shenzhen, China", **fields) -> dict:
+    return {
+        "company_name": name,
+        "location": location,
+        "specialties": specialties,
+        "certifications": ["ISO 9001"],
+        "contact": {"website": f"https://{name.split()[0].lower()}.example.com"},
+        **fields,
+    }
+
+
+def search(index: SupplierRetrievalIndex, query: str, **filters) -> list[str]:
+    suppliers, _ = index.search(SupplierSearchIndexQuery(query=query, **filters), offset=0, limit=10)
+    return [item["company_name"] for item in suppliers]
+
+
+def test_bm25_ranks_matching_suppliers_and_expands_prefixes():
+    index = SupplierRetrievalIndex()
+    index.load(
+        [
+            supplier("Nova Microcontrollers", ["Microcontrollers", "Sensors"]),
+            supplier("Apex Denim", ["Denim"]),
+            supplier("Harbor Sensors", ["Sensors"]),
+        ]
+    )
+
+    assert search(index, "micro") == ["Nova Microcontrollers"]
+    assert search(index, "sensors")[0] in {"Harbor Sensors", "Nova Microcontrollers"}
+    assert "Apex Denim" not in search(index, "sensors")
+
+
+def test_filters_are_case_insensitive():
+    index = SupplierRetrievalIndex()
+    index.load(
+        [
+            supplier("Nova Sensors", ["Sensors"], location="Shenzhen, China"),
+            supplier("Harbor Sensors", ["Sensors"], location="Ontario, Canada"),
+        ]
+    )
+
+    assert search(index, "sensors", location="ontario, canada") == ["Harbor Sensors"]
+
+
+def test_updates_replace_the_previous_version():
+    index = SupplierRetrievalIndex()
+    index.load([supplier("Nova Sensors", ["Sensors"])])
+    index.add([supplier("Nova Sensors", ["Lidar"])])
+
+    assert len(index) == 1
+    assert search(index, "lidar") == ["Nova Sensors"]
+
+
+def test_refresh_reads_from_the_watermark_and_merges_remote_writes():
+    seen_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    index = SupplierRetrievalIndex()
+    index.load([supplier("Nova Sensors", ["Sensors"], last_seen_at=seen_at.replace(tzinfo=None))])
+
+    assert index.watermark == seen_at
+    assert index.refresh_filter()["last_seen_at"]["$gte"] < seen_at
+
+    later = seen_at + timedelta(minutes=5)
+    assert index.refresh([supplier("Apex Lidar", ["Lidar"], last_seen_at=later)]) == 1
+    assert index.watermark == later
+    assert search(index, "lidar") == ["Apex Lidar"]
+
+
+def test_index_goes_stale_without_refreshes():
+    index = SupplierRetrievalIndex()
+    assert index.is_stale(max_age=60)
+
+    index.load([])
+    assert not index.is_stale(max_age=60)
+    index.refreshed_at -= 120
+    assert index.is_stale(max_age=60)
+    assert not index.is_stale(max_age=0)
+
+
+def test_searches_run_while_a_load_reads_its_cursor():
+    index = SupplierRetrievalIndex()
+    index.load([supplier("Nova Sensors", ["Sensors"])])
+    searched_during_load = []
+
+    def cursor():
+        # A search from another thread must not wait for the load; it sees the old contents
+        searcher = threading.Thread(target=lambda: searched_during_load.append(search(index, "sensors")))
+        searcher.start()
+        searcher.join(timeout=2)
+        yield supplier("Apex Lidar", ["Lidar"])
+
+    index.load(cursor())
+
+    assert searched_during_load == [["Nova Sensors"]]
+    assert search(index, "lidar") == ["Apex Lidar"]
+    assert search(index, "sensors") == []
+
+
+def test_writes_during_a_load_are_kept():
+    index = SupplierRetrievalIndex()
+
+    def cursor():
+        yield supplier("Nova Sensors", ["Sensors"])
+        index.add([supplier("Harbor Lidar", ["Lidar"])])
+
+    index.load(cursor())
+
+    assert len(index) == 2
+    assert search(index, "lidar") == ["Harbor Lidar"]
+
+
+def test_compaction_keeps_every_supplier():
+    index = SupplierRetrievalIndex()
+    names = [f"Vendor{number} Sensors" for number in range(10)]
+    index.load([supplier(name, ["Sensors"]) for name in names])
+    for _ in range(10):
+        index.add([supplier(name, ["Sensors", "Lidar"]) for name in names])
+
+    # Tombstones were compacted away
+    assert len(index._docs) < 10 * 11
+    assert len(index) == 10
+    assert sorted(search(index, "lidar")) == sorted(names)
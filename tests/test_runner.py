@@ -0,0 +1,24 @@
+import asyncio
+
+import src.runner as runner
+from src.cache import TieredCache
+from src.models import AgentConfig, SupplierExplorationAgentResponse
+
+
+async def test_coalesced_followers_report_their_own_path(monkeypatch):
+    cache = TieredCache("recommendations", max_entries=10, ttl_seconds=60)
+
+    async def answer(requirements, wait_for_slot=False):
+        await asyncio.sleep(0.05)
+        return SupplierExplorationAgentResponse(suppliers=[]), "agent"
+
+    monkeypatch.setattr(runner, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(runner, "get_recommendation_cache", lambda: cache)
+    monkeypatch.setattr(runner, "answer_recommendation", answer)
+    requirements = AgentConfig(query="ISO 9001 certified bolt suppliers")
+
+    results = await asyncio.gather(*(runner.recommend(requirements) for _ in range(3)))
+
+    assert sorted(served_by for _, served_by in results) == ["agent", "coalesced", "coalesced"]
+    # Nothing was cached (no suppliers), so none of them counts as served from cache
+    assert cache.stats["hits"] == 0
@@ -0,0 +1,141 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import src.streaming as streaming
+from src.admission import AdmissionController
+from src.cache import TieredCache
+from src.models import AgentConfig, SupplierExplorationAgentResponse
+
+
+def supplier(name: str) -> dict:
+    return {
+        "company_name": name,
+        "location": "Shenzhen, China",
+        "rating": 4.5,
+        "price_range": "$10-20 USD",
+        "lead_time": "2-4 weeks",
+        "moq": "1,000 units",
+        "certifications": ["ISO 9001"],
+        "specialties": ["Sensors"],
+        "response_time": "2-4 hours",
+        "stock": "500 units available",
+        "time_zone": "GMT+8",
+        "contact": {"website": "https://example.com", "phone": "+86 755 0000", "email": "sales@example.com"},
+    }
+
+
+class FakeAgent:
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.runs = 0
+
+    async def astream_events(self, payload, config=None, version=None):
+        self.runs += 1
+        yield {"event": "on_chat_model_start", "name": "model", "run_id": "m1"}
+        yield {
+            "event": "on_chat_model_end",
+            "name": "model",
+            "run_id": "m1",
+            "data": {"output": SimpleNamespace(tool_calls=[{"name": "validate_suppliers_batch"}])},
+        }
+        if self.error is not None:
+            raise self.error
+        yield {
+            "event": "on_tool_start",
+            "name": "validate_suppliers_batch",
+            "run_id": "t1",
+            # A duplicate (different case) and an invalid candidate are not streamed
+            "data": {"input": {"suppliers": [supplier("Nova Sensors"), supplier("NOVA SENSORS"), {"company_name": "Bad"}]}},
+        }
+        yield {"event": "on_tool_end", "name": "validate_suppliers_batch", "run_id": "t1", "data": {}}
+        yield {"event": "on_chain_end", "name": "graph", "run_id": "g1", "parent_ids": [], "data": {"output": {"done": True}}}
+
+
+@pytest.fixture
+def cache():
+    return TieredCache("recommendations", max_entries=10, ttl_seconds=60)
+
+
+@pytest.fixture
+def agent(monkeypatch, cache):
+    agent = FakeAgent()
+
+    async def finalize(final_state):
+        assert final_state == {"done": True}
+        return SupplierExplorationAgentResponse(suppliers=[supplier("Nova Sensors"), supplier("Harbor Lidar")])
+
+    async def build_payload(requirements):
+        return {"query": requirements.query}
+
+    monkeypatch.setattr(streaming, "build_agent", lambda: (agent, {}))
+    monkeypatch.setattr(streaming, "abuild_input_payload", build_payload)
+    monkeypatch.setattr(streaming, "finalize_agent_output", finalize)
+    monkeypatch.setattr(streaming, "get_recommendation_cache", lambda: cache)
+    monkeypatch.setattr(streaming, "get_admission_controller", lambda: AdmissionController(max_concurrent=1))
+    monkeypatch.setattr(streaming, "RESULT_CACHE_ENABLED", True)
+    return agent
+
+
+async def collect(requirements: AgentConfig) -> list[tuple[str, dict]]:
+    frames = []
+    async for frame in streaming.stream_supply_chain_agent(requirements):
+        event, data = frame.strip().split("\n")
+        frames.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return frames
+
+
+async def test_events_arrive_in_order_and_suppliers_stream_once(agent):
+    frames = await collect(AgentConfig(query="sensor suppliers"))
+
+    assert [event for event, _ in frames] == [
+        "started",
+        "llm_turn_started",
+        "llm_turn_finished",
+        "tool_started",
+        "supplier",
+        "tool_finished",
+        "supplier",
+        "final",
+    ]
+    assert frames[2][1] == {"turn": 1, "tool_calls": ["validate_suppliers_batch"]}
+    assert frames[3][1]["input"] == {"suppliers": "3 items"}
+    # Nova Sensors streamed while validated; only Harbor Lidar is added from the final response
+    assert [data["company_name"] for event, data in frames if event == "supplier"] == ["Nova Sensors", "Harbor Lidar"]
+    final = frames[-1][1]
+    assert final["cached"] is False and final["llm_turns"] == 1
+    assert len(final["suppliers"]) == 2 and "frontier" in final
+
+
+async def test_agent_error_yields_an_error_frame_and_an_empty_final(agent):
+    agent.error = RuntimeError("model unavailable")
+
+    frames = await collect(AgentConfig(query="sensor suppliers"))
+
+    assert [event for event, _ in frames][-2:] == ["error", "final"]
+    assert frames[-2][1] == {"message": "model unavailable", "type": "RuntimeError"}
+    assert frames[-1][1]["suppliers"] == []
+
+
+async def test_cached_result_is_replayed_without_running_the_agent(agent):
+    requirements = AgentConfig(query="sensor suppliers")
+    await collect(requirements)
+
+    frames = await collect(requirements)
+
+    assert agent.runs == 1
+    assert [event for event, _ in frames] == ["supplier", "supplier", "final"]
+    assert frames[-1][1]["cached"] is True
+
+
+async def test_run_that_fails_before_starting_reports_no_frontier(agent, monkeypatch):
+    def build_agent():
+        raise RuntimeError("graph not compiled")
+
+    monkeypatch.setattr(streaming, "build_agent", build_agent)
+
+    frames = await collect(AgentConfig(query="sensor suppliers"))
+
+    assert [event for event, _ in frames] == ["started", "error", "final"]
+    assert "frontier" not in frames[-1][1]
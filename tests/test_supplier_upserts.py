@@ -0,0 +1,58 @@
+from pymongo.errors import BulkWriteError
+
+import src.utils as utils
+from src.utils import build_supplier_upserts, save_suppliers_to_mongodb, supplier_shape_repairs
+
+
+def supplier(name: str, **fields) -> dict:
+    return {
+        "company_name": name,
+        "location": "Shenzhen, China",
+        "certifications": ["ISO 9001"],
+        "contact": {"website": f"https://{name.lower()}.example.com", "email": "", "phone": "+86 755"},
+        **fields,
+    }
+
+
+def test_repeated_suppliers_are_merged_into_one_upsert():
+    operations = build_supplier_upserts(
+        [supplier("Acme"), supplier("ACME", certifications=["RoHS"]), supplier("Beta")]
+    )
+
+    assert len(operations) == 2
+    update = operations[0]._doc
+    assert update["$addToSet"]["certifications"] == {"$each": ["ISO 9001", "RoHS"]}
+    assert "contact.email" not in update["$set"]
+    assert update["$set"]["contact.phone"] == "+86 755"
+
+
+def test_shape_repairs_for_legacy_documents():
+    assert supplier_shape_repairs({"certifications": None, "specialties": "PCB assembly", "contact": None}) == {
+        "certifications": [],
+        "specialties": ["PCB assembly"],
+        "contact": {},
+    }
+    assert supplier_shape_repairs({"contact": "sales@acme.example.com"}) == {
+        "contact": {},
+        "legacy_contact": "sales@acme.example.com",
+    }
+    assert supplier_shape_repairs({"certifications": ["ISO 9001"], "contact": {"email": "x"}}) == {}
+    assert supplier_shape_repairs({}) == {}
+
+
+class FailingCollection:
+    def bulk_write(self, operations, ordered):
+        raise BulkWriteError(
+            {"writeErrors": [{"index": 0, "code": 2, "errmsg": "Cannot apply $addToSet to non-array field"}],
+             "nUpserted": 1, "nModified": 0, "nMatched": 0}
+        )
+
+
+def test_partial_write_failure_reports_upsert_counts(monkeypatch):
+    monkeypatch.setattr(utils, "get_supplier_db_and_collection", lambda: (None, FailingCollection()))
+
+    result = save_suppliers_to_mongodb([supplier("Acme"), supplier("Acme Co., Ltd.", contact={"website": "https://acme.example.com"}), supplier("Beta")])
+
+    assert result["success"] is False
+    assert result["supplier_count"] == 2
+    assert result["upserted_count"] == 1
@@ -0,0 +1,84 @@
+import pytest
+
+import src.tools as tools
+
+
+def supplier(name: str, **overrides) -> dict:
+    return {
+        "company_name": name,
+        "location": "Shenzhen, China",
+        "rating": 4.5,
+        "price_range": "$10-20 USD",
+        "lead_time": "2-4 weeks",
+        "moq": "1,000 units",
+        "certifications": ["ISO 9001"],
+        "specialties": ["Sensors"],
+        "response_time": "2-4 hours",
+        "stock": "500 units available",
+        "time_zone": "GMT+8",
+        "contact": {"website": "https://example.com", "phone": "+86 755 0000", "email": "sales@example.com"},
+        **overrides,
+    }
+
+
+def test_batch_validation_flags_repeated_company_names():
+    validation = tools.validate_suppliers_batch.invoke(
+        {"suppliers": [supplier("Nova Sensors"), supplier("Harbor Lidar"), supplier(" NOVA SENSORS ")]}
+    )
+
+    assert validation["duplicate_count"] == 1
+    assert validation["results"][2]["duplicate_of"] == 0
+    assert "duplicate_of" not in validation["results"][1]
+
+
+def test_batch_validation_reports_incomplete_entries_instead_of_raising():
+    validation = tools.validate_suppliers_batch.invoke(
+        {"suppliers": [supplier("Nova Sensors"), supplier("Harbor Lidar", moq="", stock=None), {}]}
+    )
+
+    assert (validation["valid_count"], validation["invalid_count"]) == (1, 2)
+    assert validation["results"][1]["missing_fields"] == ["moq", "stock"]
+    assert validation["results"][2]["company_name"] is None
+    assert validation["results"][2]["completeness_score"] == 0.0
+    assert validation["average_completeness"] == round((100 + 83.3 + 0) / 3, 1)
+
+
+def test_finalize_drops_repeated_suppliers():
+    result = tools.finalize_supplier_search.invoke(
+        {"suppliers": [supplier("Nova Sensors"), supplier("nova sensors", location="Dongguan, China"), supplier("Harbor Lidar")]}
+    )
+
+    assert [entry["company_name"] for entry in result["suppliers"]] == ["Nova Sensors", "Harbor Lidar"]
+    # The first occurrence is the one kept
+    assert result["suppliers"][0]["location"] == "Shenzhen, China"
+    assert result["count"] == 2
+
+
+def test_finalize_trims_to_the_most_complete_suppliers_in_their_original_order(monkeypatch):
+    monkeypatch.setattr(tools, "AGENT_MAX_SUPPLIERS", 3)
+    suppliers = [
+        supplier("Sparse One", stock="", moq="", lead_time=""),
+        supplier("Complete One"),
+        supplier("Nearly Complete", stock=""),
+        supplier("Sparse Two", stock="", moq=""),
+        supplier("Complete Two"),
+    ]
+
+    result = tools.finalize_supplier_search.invoke({"suppliers": suppliers})
+
+    assert [entry["company_name"] for entry in result["suppliers"]] == ["Complete One", "Nearly Complete", "Complete Two"]
+    assert result["validation"]["incomplete"] == [{"company_name": "Nearly Complete", "missing_fields": ["stock"]}]
+
+
+def test_finalize_keeps_the_earlier_supplier_when_completeness_ties(monkeypatch):
+    monkeypatch.setattr(tools, "AGENT_MAX_SUPPLIERS", 2)
+    suppliers = [supplier("First"), supplier("Second", stock=""), supplier("Third"), supplier("Fourth")]
+
+    result = tools.finalize_supplier_search.invoke({"suppliers": suppliers})
+
+    assert [entry["company_name"] for entry in result["suppliers"]] == ["First", "Third"]
+
+
+def test_finalize_without_suppliers_is_an_error():
+    with pytest.raises(ValueError, match="No suppliers found"):
+        tools.finalize_supplier_search.invoke({"suppliers": []})
@@ -0,0 +1,126 @@
+from uuid import uuid4
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+import src.telemetry as telemetry
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    # Metrics register themselves on creation; keep the test ones out of the shared registry
+    monkeypatch.setattr(telemetry, "_registry", [])
+    monkeypatch.setattr(telemetry, "_collectors", [])
+
+
+def test_counter_lines_carry_help_type_and_labels():
+    counter = telemetry.Counter("test_requests_total", "Requests.", ("path",))
+    counter.inc(path="cache")
+    counter.inc(2, path="cache")
+    counter.inc(path="agent")
+
+    assert telemetry.render_metrics().splitlines() == [
+        "# HELP test_requests_total Requests.",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{path="cache"} 3',
+        'test_requests_total{path="agent"} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    histogram = telemetry.Histogram("test_seconds", "Latency.", ("outcome",), buckets=(1, 0.5))
+    for value in (0.2, 0.5, 0.7, 3):
+        histogram.observe(value, outcome="ok")
+
+    assert telemetry.render_metrics().splitlines()[2:] == [
+        'test_seconds_bucket{outcome="ok",le="0.5"} 2',
+        'test_seconds_bucket{outcome="ok",le="1"} 3',
+        'test_seconds_bucket{outcome="ok",le="+Inf"} 4',
+        'test_seconds_sum{outcome="ok"} 4.4',
+        'test_seconds_count{outcome="ok"} 4',
+    ]
+
+
+def test_collector_samples_are_rendered_at_scrape_time():
+    pending = [3]
+
+    def collector():
+        return [
+            ("test_pending", "gauge", "Pending batches.", {}, pending[0]),
+            ("test_events_total", "counter", "Events.", {"event": "hits"}, 5),
+            ("test_events_total", "counter", "Events.", {"event": "misses"}, 1),
+        ]
+
+    telemetry.register_collector(collector)
+    telemetry.register_collector(collector)
+    pending[0] = 7
+
+    assert telemetry.render_metrics().splitlines() == [
+        "# HELP test_pending Pending batches.",
+        "# TYPE test_pending gauge",
+        "test_pending 7",
+        "# HELP test_events_total Events.",
+        "# TYPE test_events_total counter",
+        'test_events_total{event="hits"} 5',
+        'test_events_total{event="misses"} 1',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = telemetry.Counter("test_tools_total", "Tools.", ("tool",))
+    counter.inc(tool='say "hi"\\\nbye')
+
+    assert telemetry.render_metrics().splitlines()[-1] == 'test_tools_total{tool="say \\"hi\\"\\\\\\nbye"} 1'
+
+
+def chat_result(message: AIMessage, llm_output: dict = None) -> LLMResult:
+    return LLMResult(generations=[[ChatGeneration(message=message)]], llm_output=llm_output)
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    counter = telemetry.Counter("test_llm_tokens_total", "Tokens.", ("model", "kind"))
+    monkeypatch.setattr(telemetry, "LLM_TOKENS", counter)
+    monkeypatch.setattr(telemetry, "LLM_CALL_SECONDS", telemetry.Histogram("test_llm_seconds", "LLM.", ("model", "outcome")))
+    return counter
+
+
+def run_llm(handler: telemetry.TelemetryCallbackHandler, response: LLMResult) -> None:
+    run_id = uuid4()
+    handler.on_chat_model_start({}, [], run_id=run_id, metadata={"ls_model_name": "gpt-test"})
+    handler.on_llm_end(response, run_id=run_id)
+
+
+def test_cached_prompt_tokens_come_from_usage_metadata(tokens):
+    request = telemetry.RequestTelemetry("recommendations")
+    handler = telemetry.TelemetryCallbackHandler(request)
+    message = AIMessage(
+        content="",
+        usage_metadata={
+            "input_tokens": 1200,
+            "output_tokens": 80,
+            "total_tokens": 1280,
+            "input_token_details": {"cache_read": 1024},
+        },
+    )
+
+    run_llm(handler, chat_result(message))
+
+    summary = request.summary()
+    assert (summary["llm_calls"], summary["prompt_tokens"], summary["completion_tokens"]) == (1, 1200, 80)
+    assert summary["cached_prompt_tokens"] == 1024
+    assert summary["spans"]["llm"]["count"] == 1
+    assert tokens._values[("gpt-test", "cached_prompt")] == 1024
+
+
+def test_cached_prompt_tokens_fall_back_to_the_provider_token_usage(tokens):
+    request = telemetry.RequestTelemetry("recommendations")
+    handler = telemetry.TelemetryCallbackHandler(request)
+    token_usage = {"prompt_tokens": 900, "completion_tokens": 40, "prompt_tokens_details": {"cached_tokens": 512}}
+
+    run_llm(handler, chat_result(AIMessage(content=""), {"token_usage": token_usage}))
+
+    summary = request.summary()
+    assert (summary["prompt_tokens"], summary["completion_tokens"], summary["cached_prompt_tokens"]) == (900, 40, 512)
+    assert tokens._values[("gpt-test", "prompt")] == 900